@@ -6,7 +6,7 @@ from typing import Optional
 
 import click
 from flask import current_app
-from sqlalchemy import select
+from sqlalchemy import select, update
 from werkzeug.exceptions import NotFound
 
 from configs import dify_config
@@ -23,7 +23,14 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models import Tenant
-from models.dataset import Dataset, DatasetCollectionBinding, DatasetMetadata, DatasetMetadataBinding, DocumentSegment
+from models.dataset import (
+    Dataset,
+    DatasetCollectionBinding,
+    DatasetMetadata,
+    DatasetMetadataBinding,
+    DocumentSegment,
+    Embedding,
+)
 from models.dataset import Document as DatasetDocument
 from models.model import Account, App, AppAnnotationSetting, AppMode, Conversation, MessageAnnotation
 from models.provider import Provider, ProviderModel
@@ -1155,3 +1162,58 @@ def remove_orphaned_files_on_storage(force: bool):
         click.echo(click.style(f"Removed {removed_files} orphaned files without errors.", fg="green"))
     else:
         click.echo(click.style(f"Removed {removed_files} orphaned files, with {error_files} errors.", fg="yellow"))
+
+
+@click.command("migrate-embedding-storage-format", help="Migrate cached embeddings to the compact storage format.")
+@click.option("--batch-size", default=1000, show_default=True, help="Number of embedding rows processed per batch.")
+@click.option(
+    "--dtype",
+    type=click.Choice(["float32", "float16"]),
+    default="float32",
+    show_default=True,
+    help="Storage precision of the migrated embeddings.",
+)
+def migrate_embedding_storage_format(batch_size: int, dtype: str):
+    """
+    Rewrite pickled rows of the embeddings table in the compact binary storage format.
+    """
+    click.echo(click.style("Starting embedding storage format migration.", fg="green"))
+
+    last_id = None
+    migrated_count = 0
+    skipped_count = 0
+    while True:
+        stmt = select(Embedding).order_by(Embedding.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(Embedding.id > last_id)
+        embeddings = db.session.scalars(stmt).all()
+        if not embeddings:
+            break
+        last_id = embeddings[-1].id
+
+        updates = []
+        for embedding in embeddings:
+            if embedding.is_compact_format:
+                skipped_count += 1
+                continue
+            try:
+                embedding.set_embedding(embedding.get_embedding_array(), dtype=dtype)
+            except Exception as e:
+                click.echo(click.style(f"Failed to migrate embedding {embedding.id}: {str(e)}", fg="red"))
+                continue
+            updates.append({"id": embedding.id, "embedding": embedding.embedding})
+
+        # expunge the loaded rows so that the bulk update below is the only write
+        db.session.expunge_all()
+        if updates:
+            db.session.execute(update(Embedding), updates)
+        db.session.commit()
+        migrated_count += len(updates)
+        click.echo(click.style(f"Migrated {migrated_count} embeddings, skipped {skipped_count}.", fg="white"))
+
+    click.echo(
+        click.style(
+            f"Embedding storage format migration completed. Migrated {migrated_count}, skipped {skipped_count}.",
+            fg="green",
+        )
+    )
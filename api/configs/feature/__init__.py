@@ -65,6 +65,11 @@ class AppExecutionConfig(BaseSettings):
         description="Maximum number of requests per app per day",
         default=5000,
     )
+    STREAM_MESSAGE_COALESCE_WINDOW_MS: NonNegativeInt = Field(
+        description="Time window (in milliseconds) within which consecutive message chunks of a streaming response"
+        " are merged into one event (0 to send every chunk as it is generated)",
+        default=0,
+    )
 
 
 class CodeExecutionSandboxConfig(BaseSettings):
@@ -175,6 +180,11 @@ class PluginConfig(BaseSettings):
         default=15728640 * 12,
     )
 
+    PLUGIN_DAEMON_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of keep-alive connections to the plugin daemon kept per worker process",
+        default=100,
+    )
+
 
 class MarketplaceConfig(BaseSettings):
     """
@@ -381,6 +391,26 @@ class HttpConfig(BaseSettings):
         default=5,
     )
 
+    SSRF_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections of the pooled network client (SSRF)",
+        default=100,
+    )
+
+    SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of idle keep-alive connections of the pooled network client (SSRF)",
+        default=20,
+    )
+
+    SSRF_POOL_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Time in seconds after which idle keep-alive connections are closed (SSRF)",
+        default=5.0,
+    )
+
+    SSRF_HTTP2_ENABLED: bool = Field(
+        description="Enable HTTP/2 for network requests (SSRF), requires the h2 package",
+        default=False,
+    )
+
     RESPECT_XFORWARD_HEADERS_ENABLED: bool = Field(
         description="Enable handling of X-Forwarded-For, X-Forwarded-Proto, and X-Forwarded-Port headers"
         " when the app is behind a single trusted reverse proxy.",
@@ -447,7 +477,7 @@ class LoggingConfig(BaseSettings):
 
 class ModelLoadBalanceConfig(BaseSettings):
     """
-    Configuration for model load balancing and token counting
+    Configuration for model load balancing, token counting and provider configurations
     """
 
     MODEL_LB_ENABLED: bool = Field(
@@ -460,6 +490,17 @@ class ModelLoadBalanceConfig(BaseSettings):
         default=False,
     )
 
+    PROVIDER_CONFIGURATIONS_CACHE_TTL: NonNegativeInt = Field(
+        description="Maximum time in seconds the model provider configurations of a workspace are cached in process"
+        " memory (0 to disable). Changes made through the model provider services take effect immediately",
+        default=300,
+    )
+
+    PROVIDER_CONFIGURATIONS_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of workspaces whose model provider configurations are cached in process memory",
+        default=1000,
+    )
+
 
 class BillingConfig(BaseSettings):
     """
@@ -471,6 +512,27 @@ class BillingConfig(BaseSettings):
         default=False,
     )
 
+    BILLING_INFO_CACHE_TTL: PositiveInt = Field(
+        description="Time (in seconds) billing information of tenants is used without refreshing it",
+        default=60,
+    )
+
+    BILLING_INFO_CACHE_STALE_TTL: PositiveInt = Field(
+        description="Time (in seconds) billing information of tenants is still used while it is refreshed in the"
+        " background",
+        default=600,
+    )
+
+    BILLING_API_TIMEOUT: PositiveFloat = Field(
+        description="Timeout (in seconds) of requests to the billing API",
+        default=5.0,
+    )
+
+    BILLING_API_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of pooled connections to the billing API",
+        default=20,
+    )
+
 
 class UpdateConfig(BaseSettings):
     """
@@ -524,11 +586,32 @@ class WorkflowNodeExecutionConfig(BaseSettings):
         default=100,
     )
 
+    WORKFLOW_PARALLEL_MAX_WORKERS: PositiveInt = Field(
+        description="Maximum number of worker threads in the ThreadPool for parallel node execution of a workflow run",
+        default=10,
+    )
+
     WORKFLOW_NODE_EXECUTION_STORAGE: str = Field(
         default="rdbms",
         description="Storage backend for WorkflowNodeExecution. Options: 'rdbms', 'hybrid'",
     )
 
+    WORKFLOW_NODE_EXECUTION_WRITE_MODE: Literal["sync", "write-behind"] = Field(
+        description="How workflow run node executions are written to the database. 'sync' commits every"
+        " state change, 'write-behind' buffers them and writes them in batches, at the latest when the run ends",
+        default="sync",
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL: PositiveFloat = Field(
+        description="Maximum seconds buffered node executions wait before being written in write-behind mode",
+        default=1.0,
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE: PositiveInt = Field(
+        description="Number of buffered node executions that triggers a write in write-behind mode",
+        default=100,
+    )
+
 
 class AuthConfig(BaseSettings):
     """
@@ -580,6 +663,32 @@ class AuthConfig(BaseSettings):
         default=86400,
     )
 
+    API_TOKEN_CACHE_TTL: PositiveInt = Field(
+        description="Time (in seconds) resolved Service API tokens and tenant owners are cached in Redis",
+        default=600,
+    )
+
+    API_TOKEN_CACHE_LOCAL_TTL: PositiveInt = Field(
+        description="Time (in seconds) resolved Service API tokens and tenant owners are cached in process."
+        " Deleted tokens may be accepted by other processes for up to this time.",
+        default=10,
+    )
+
+    API_TOKEN_LAST_USED_UPDATE_INTERVAL: PositiveInt = Field(
+        description="Interval (in seconds) at which the last used time of Service API tokens is written",
+        default=60,
+    )
+
+    END_USER_CACHE_TTL: PositiveInt = Field(
+        description="Time (in seconds) resolved end users of the Service API and web apps are cached in Redis",
+        default=3600,
+    )
+
+    END_USER_CACHE_LOCAL_TTL: PositiveInt = Field(
+        description="Time (in seconds) resolved end users of the Service API and web apps are cached in process",
+        default=300,
+    )
+
 
 class ModerationConfig(BaseSettings):
     """
@@ -681,11 +790,16 @@ class RagEtlConfig(BaseSettings):
     )
 
     KEYWORD_DATA_SOURCE_TYPE: str = Field(
-        description="Data source type for keyword extraction"
-        " ('database' or other supported types), default to 'database'",
+        description="Deprecated. Keyword tables are stored per keyword in the database,"
+        " and legacy keyword tables of any data source type are migrated on first use",
         default="database",
     )
 
+    KEYWORD_INDEX_CACHE_MAX_POSTINGS: PositiveInt = Field(
+        description="Maximum number of node ids in the process-local cache of keyword posting lists",
+        default=1000000,
+    )
+
     UNSTRUCTURED_API_URL: Optional[str] = Field(
         description="API URL for Unstructured.io service",
         default=None,
@@ -737,6 +851,49 @@ class DataSetConfig(BaseSettings):
         default=30,
     )
 
+    QUERY_EMBEDDING_CACHE_TTL: PositiveInt = Field(
+        description="Time-to-live in seconds for cached query embeddings",
+        default=600,
+    )
+
+    QUERY_EMBEDDING_CACHE_MAX_BYTES: NonNegativeInt = Field(
+        description="Maximum total size in bytes of query embeddings cached in process memory (0 to disable)",
+        default=64 * 1024 * 1024,
+    )
+
+    RETRIEVAL_SEGMENT_CACHE_TTL: NonNegativeInt = Field(
+        description="Time-to-live in seconds for segments of retrieved chunks cached in process memory (0 to disable)."
+        " Edited or disabled segments may be returned by retrieval until their cache entry expires",
+        default=0,
+    )
+
+    RETRIEVAL_SEGMENT_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of retrieved chunks whose segments are cached in process memory",
+        default=10000,
+    )
+
+    RETRIEVAL_ANALYTICS_ASYNC_ENABLED: bool = Field(
+        description="Accumulate segment hit counts and dataset queries of app retrievals in Redis and write them"
+        " to the database from a Celery beat task, instead of writing them during the request",
+        default=False,
+    )
+
+    RETRIEVAL_ANALYTICS_FLUSH_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds at which accumulated segment hit counts and dataset queries are flushed",
+        default=60,
+    )
+
+    VECTOR_PROCESSOR_CACHE_IDLE_TTL: NonNegativeInt = Field(
+        description="Time in seconds after which vector store clients of datasets cached in process memory are"
+        " evicted if not used (0 to disable)",
+        default=600,
+    )
+
+    VECTOR_PROCESSOR_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of vector store clients of datasets cached in process memory",
+        default=200,
+    )
+
 
 class WorkspaceConfig(BaseSettings):
     """
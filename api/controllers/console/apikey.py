@@ -7,6 +7,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 from werkzeug.exceptions import Forbidden
 
+from core.helper.api_token_cache import api_token_cache
 from extensions.ext_database import db
 from libs.helper import TimestampField
 from libs.login import login_required
@@ -130,6 +131,8 @@ class BaseApiKeyResource(Resource):
 
         db.session.query(ApiToken).filter(ApiToken.id == api_key_id).delete()
         db.session.commit()
+        assert key is not None, "API key not found"
+        api_token_cache.delete_api_token(key.type, key.token)
 
         return {"result": "success"}, 204
 
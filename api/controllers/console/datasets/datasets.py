@@ -17,6 +17,7 @@ from controllers.console.wraps import (
     setup_required,
 )
 from core.errors.error import LLMBadRequestError, ProviderTokenNotInitError
+from core.helper.api_token_cache import api_token_cache
 from core.indexing_runner import IndexingRunner
 from core.model_runtime.entities.model_entities import ModelType
 from core.plugin.entities.plugin import ModelProviderID
@@ -637,6 +638,8 @@ class DatasetApiDeleteApi(Resource):
 
         db.session.query(ApiToken).filter(ApiToken.id == api_key_id).delete()
         db.session.commit()
+        assert key is not None, "API key not found"
+        api_token_cache.delete_api_token(key.type, key.token)
 
         return {"result": "success"}, 204
 
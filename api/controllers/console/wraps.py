@@ -81,7 +81,7 @@ def cloud_edition_billing_resource_check(resource: str):
     def interceptor(view):
         @wraps(view)
         def decorated(*args, **kwargs):
-            features = FeatureService.get_features(current_user.current_tenant_id)
+            features = FeatureService.get_features(current_user.current_tenant_id, fresh=True)
             if features.billing.enabled:
                 members = features.members
                 apps = features.apps
@@ -122,7 +122,7 @@ def cloud_edition_billing_knowledge_limit_check(resource: str):
     def interceptor(view):
         @wraps(view)
         def decorated(*args, **kwargs):
-            features = FeatureService.get_features(current_user.current_tenant_id)
+            features = FeatureService.get_features(current_user.current_tenant_id, fresh=True)
             if features.billing.enabled:
                 if resource == "add_segment":
                     if features.billing.subscription.plan == "sandbox":
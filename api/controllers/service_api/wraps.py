@@ -1,6 +1,5 @@
 import time
 from collections.abc import Callable
-from datetime import UTC, datetime, timedelta
 from enum import Enum
 from functools import wraps
 from typing import Optional
@@ -9,16 +8,18 @@ from flask import current_app, request
 from flask_login import user_logged_in  # type: ignore
 from flask_restful import Resource
 from pydantic import BaseModel
-from sqlalchemy import select, update
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from werkzeug.exceptions import Forbidden, Unauthorized
 
+from core.helper.api_token_cache import api_token_cache, api_token_usage_recorder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from libs.login import _get_user
 from models.account import Account, Tenant, TenantAccountJoin, TenantStatus
 from models.dataset import RateLimitLog
 from models.model import ApiToken, App, EndUser
+from services.end_user_service import EndUserService
 from services.feature_service import FeatureService
 
 
@@ -59,17 +60,22 @@ def validate_app_token(view: Optional[Callable] = None, *, fetch_user_arg: Optio
             if tenant.status == TenantStatus.ARCHIVE:
                 raise Forbidden("The workspace's status is archived.")
 
-            tenant_account_join = (
-                db.session.query(Tenant, TenantAccountJoin)
-                .filter(Tenant.id == api_token.tenant_id)
-                .filter(TenantAccountJoin.tenant_id == Tenant.id)
-                .filter(TenantAccountJoin.role.in_(["owner"]))
-                .filter(Tenant.status == TenantStatus.NORMAL)
-                .one_or_none()
-            )  # TODO: only owner information is required, so only one is returned.
-            if tenant_account_join:
-                tenant, ta = tenant_account_join
-                account = db.session.query(Account).filter(Account.id == ta.account_id).first()
+            tenant_owner = api_token_cache.get_tenant_owner(api_token.tenant_id)
+            if tenant_owner is None:
+                tenant_account_join = (
+                    db.session.query(Tenant, TenantAccountJoin)
+                    .filter(Tenant.id == api_token.tenant_id)
+                    .filter(TenantAccountJoin.tenant_id == Tenant.id)
+                    .filter(TenantAccountJoin.role.in_(["owner"]))
+                    .filter(Tenant.status == TenantStatus.NORMAL)
+                    .one_or_none()
+                )  # TODO: only owner information is required, so only one is returned.
+                if tenant_account_join:
+                    tenant, ta = tenant_account_join
+                    tenant_owner = {"account_id": ta.account_id}
+                    api_token_cache.set_tenant_owner(api_token.tenant_id, tenant_owner)
+            if tenant_owner:
+                account = db.session.query(Account).filter(Account.id == tenant_owner["account_id"]).first()
                 # Login admin
                 if account:
                     account.current_tenant = tenant
@@ -120,7 +126,7 @@ def cloud_edition_billing_resource_check(resource: str, api_token_type: str):
     def interceptor(view):
         def decorated(*args, **kwargs):
             api_token = validate_and_get_api_token(api_token_type)
-            features = FeatureService.get_features(api_token.tenant_id)
+            features = FeatureService.get_features(api_token.tenant_id, fresh=True)
 
             if features.billing.enabled:
                 members = features.members
@@ -151,7 +157,7 @@ def cloud_edition_billing_knowledge_limit_check(resource: str, api_token_type: s
         @wraps(view)
         def decorated(*args, **kwargs):
             api_token = validate_and_get_api_token(api_token_type)
-            features = FeatureService.get_features(api_token.tenant_id)
+            features = FeatureService.get_features(api_token.tenant_id, fresh=True)
             if features.billing.enabled:
                 if resource == "add_segment":
                     if features.billing.subscription.plan == "sandbox":
@@ -210,17 +216,30 @@ def validate_dataset_token(view=None):
         @wraps(view)
         def decorated(*args, **kwargs):
             api_token = validate_and_get_api_token("dataset")
-            tenant_account_join = (
-                db.session.query(Tenant, TenantAccountJoin)
-                .filter(Tenant.id == api_token.tenant_id)
-                .filter(TenantAccountJoin.tenant_id == Tenant.id)
-                .filter(TenantAccountJoin.role.in_(["owner"]))
-                .filter(Tenant.status == TenantStatus.NORMAL)
-                .one_or_none()
-            )  # TODO: only owner information is required, so only one is returned.
-            if tenant_account_join:
-                tenant, ta = tenant_account_join
-                account = db.session.query(Account).filter(Account.id == ta.account_id).first()
+            tenant: Optional[Tenant] = None
+            tenant_owner = api_token_cache.get_tenant_owner(api_token.tenant_id)
+            if tenant_owner is not None:
+                # only the owner is cached, the workspace must still be active
+                tenant = (
+                    db.session.query(Tenant)
+                    .filter(Tenant.id == api_token.tenant_id, Tenant.status == TenantStatus.NORMAL)
+                    .first()
+                )
+            else:
+                tenant_account_join = (
+                    db.session.query(Tenant, TenantAccountJoin)
+                    .filter(Tenant.id == api_token.tenant_id)
+                    .filter(TenantAccountJoin.tenant_id == Tenant.id)
+                    .filter(TenantAccountJoin.role.in_(["owner"]))
+                    .filter(Tenant.status == TenantStatus.NORMAL)
+                    .one_or_none()
+                )  # TODO: only owner information is required, so only one is returned.
+                if tenant_account_join:
+                    tenant, ta = tenant_account_join
+                    tenant_owner = {"account_id": ta.account_id}
+                    api_token_cache.set_tenant_owner(api_token.tenant_id, tenant_owner)
+            if tenant and tenant_owner:
+                account = db.session.query(Account).filter(Account.id == tenant_owner["account_id"]).first()
                 # Login admin
                 if account:
                     account.current_tenant = tenant
@@ -256,29 +275,30 @@ def validate_and_get_api_token(scope: str | None = None):
     if auth_scheme != "bearer":
         raise Unauthorized("Authorization scheme must be 'Bearer'")
 
-    current_time = datetime.now(UTC).replace(tzinfo=None)
-    cutoff_time = current_time - timedelta(minutes=1)
-    with Session(db.engine, expire_on_commit=False) as session:
-        update_stmt = (
-            update(ApiToken)
-            .where(
-                ApiToken.token == auth_token,
-                (ApiToken.last_used_at.is_(None) | (ApiToken.last_used_at < cutoff_time)),
-                ApiToken.type == scope,
-            )
-            .values(last_used_at=current_time)
-            .returning(ApiToken)
-        )
-        result = session.execute(update_stmt)
-        api_token = result.scalar_one_or_none()
-
-        if not api_token:
+    cached_api_token = api_token_cache.get_api_token(scope, auth_token)
+    if cached_api_token is not None:
+        api_token = ApiToken(token=auth_token, **cached_api_token)
+    else:
+        with Session(db.engine, expire_on_commit=False) as session:
             stmt = select(ApiToken).where(ApiToken.token == auth_token, ApiToken.type == scope)
-            api_token = session.scalar(stmt)
-            if not api_token:
+            stored_api_token = session.scalar(stmt)
+            if not stored_api_token:
                 raise Unauthorized("Access token is invalid")
-        else:
-            session.commit()
+            api_token = stored_api_token
+
+        api_token_cache.set_api_token(
+            scope,
+            auth_token,
+            {
+                "id": api_token.id,
+                "app_id": api_token.app_id,
+                "tenant_id": api_token.tenant_id,
+                "type": api_token.type,
+            },
+        )
+
+    # last used times are written in batches, see ApiTokenUsageRecorder
+    api_token_usage_recorder.record(api_token.id)
 
     return api_token
 
@@ -290,30 +310,13 @@ def create_or_update_end_user_for_user_id(app_model: App, user_id: Optional[str]
     if not user_id:
         user_id = "DEFAULT-USER"
 
-    end_user = (
-        db.session.query(EndUser)
-        .filter(
-            EndUser.tenant_id == app_model.tenant_id,
-            EndUser.app_id == app_model.id,
-            EndUser.session_id == user_id,
-            EndUser.type == "service_api",
-        )
-        .first()
+    return EndUserService.get_or_create_end_user(
+        app_model,
+        session_id=user_id,
+        type="service_api",
+        is_anonymous=user_id == "DEFAULT-USER",
     )
 
-    if end_user is None:
-        end_user = EndUser(
-            tenant_id=app_model.tenant_id,
-            app_id=app_model.id,
-            type="service_api",
-            is_anonymous=user_id == "DEFAULT-USER",
-            session_id=user_id,
-        )
-        db.session.add(end_user)
-        db.session.commit()
-
-    return end_user
-
 
 class DatasetApiResource(Resource):
     method_decorators = [validate_dataset_token]
@@ -11,6 +11,7 @@ from controllers.web.error import WebAppAuthRequiredError
 from extensions.ext_database import db
 from libs.passport import PassportService
 from models.model import App, EndUser, Site
+from services.end_user_service import EndUserService
 from services.enterprise.enterprise_service import EnterpriseService
 from services.feature_service import FeatureService
 from services.webapp_auth_service import WebAppAuthService, WebAppAuthType
@@ -51,22 +52,9 @@ class PassportResource(Resource):
             raise NotFound()
 
         if user_id:
-            end_user = (
-                db.session.query(EndUser).filter(EndUser.app_id == app_model.id, EndUser.session_id == user_id).first()
+            end_user = EndUserService.get_or_create_end_user(
+                app_model, session_id=user_id, type="browser", match_any_type=True
             )
-
-            if end_user:
-                pass
-            else:
-                end_user = EndUser(
-                    tenant_id=app_model.tenant_id,
-                    app_id=app_model.id,
-                    type="browser",
-                    is_anonymous=True,
-                    session_id=user_id,
-                )
-                db.session.add(end_user)
-                db.session.commit()
         else:
             end_user = EndUser(
                 tenant_id=app_model.tenant_id,
@@ -139,30 +127,14 @@ def exchange_token_for_existing_web_user(app_code: str, enterprise_user_decoded:
         raise WebAppAuthRequiredError("Please login as internal user.")
 
     end_user = None
-    if end_user_id:
-        end_user = db.session.query(EndUser).filter(EndUser.id == end_user_id).first()
     if session_id:
-        end_user = (
-            db.session.query(EndUser)
-            .filter(
-                EndUser.session_id == session_id,
-                EndUser.tenant_id == app_model.tenant_id,
-                EndUser.app_id == app_model.id,
-            )
-            .first()
+        end_user = EndUserService.get_or_create_end_user(
+            app_model, session_id=session_id, type="browser", match_any_type=True
         )
+    elif end_user_id:
+        end_user = db.session.query(EndUser).filter(EndUser.id == end_user_id).first()
     if not end_user:
-        if not session_id:
-            raise NotFound("Missing session_id for existing web user.")
-        end_user = EndUser(
-            tenant_id=app_model.tenant_id,
-            app_id=app_model.id,
-            type="browser",
-            is_anonymous=True,
-            session_id=session_id,
-        )
-        db.session.add(end_user)
-        db.session.commit()
+        raise NotFound("Missing session_id for existing web user.")
     exp_dt = datetime.now(UTC) + timedelta(minutes=dify_config.ACCESS_TOKEN_EXPIRE_MINUTES)
     exp = int(exp_dt.timestamp())
     payload = {
@@ -187,9 +159,7 @@ def _exchange_for_public_app_token(app_model, site, token_decoded):
     user_id = token_decoded.get("user_id")
     end_user = None
     if user_id:
-        end_user = (
-            db.session.query(EndUser).filter(EndUser.app_id == app_model.id, EndUser.session_id == user_id).first()
-        )
+        end_user = EndUserService.get_end_user(app_model, session_id=user_id)
 
     if not end_user:
         end_user = EndUser(
@@ -1,10 +1,12 @@
 import logging
+import time
 from abc import ABC, abstractmethod
 from collections.abc import Generator, Mapping
-from typing import Any, Union
+from typing import Any, Optional, Union, cast
 
+from configs import dify_config
 from core.app.entities.app_invoke_entities import InvokeFrom
-from core.app.entities.task_entities import AppBlockingResponse, AppStreamResponse
+from core.app.entities.task_entities import AppBlockingResponse, AppStreamResponse, MessageStreamResponse
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.model_runtime.errors.invoke import InvokeError
 
@@ -16,6 +18,9 @@ class AppGenerateResponseConverter(ABC):
     def convert(
         cls, response: Union[AppBlockingResponse, Generator[AppStreamResponse, Any, None]], invoke_from: InvokeFrom
     ) -> Mapping[str, Any] | Generator[str | Mapping[str, Any], Any, None]:
+        if not isinstance(response, AppBlockingResponse) and dify_config.STREAM_MESSAGE_COALESCE_WINDOW_MS > 0:
+            response = cls._coalesce_message_chunks(response, dify_config.STREAM_MESSAGE_COALESCE_WINDOW_MS / 1000)
+
         if invoke_from in {InvokeFrom.DEBUGGER, InvokeFrom.SERVICE_API}:
             if isinstance(response, AppBlockingResponse):
                 return cls.convert_blocking_full_response(response)
@@ -59,6 +64,73 @@ class AppGenerateResponseConverter(ABC):
     ) -> Generator[dict | str, None, None]:
         raise NotImplementedError
 
+    @classmethod
+    def _coalesce_message_chunks(
+        cls, stream_response: Generator[AppStreamResponse, None, None], window: float
+    ) -> Generator[AppStreamResponse, None, None]:
+        """
+        Merge consecutive message chunks of the same message that arrive within the window.
+
+        Merged chunks are sent once the window has passed when the next chunk arrives, or as soon
+        as any other event arrives, so a chunk may wait for the next event of the stream.
+        :param stream_response: stream response
+        :param window: time window in seconds
+        :return:
+        """
+        pending: Optional[AppStreamResponse] = None
+        answers: list[str] = []
+        pending_since = 0.0
+
+        def _merged() -> AppStreamResponse:
+            assert pending is not None
+            if len(answers) == 1:
+                return pending
+            message = pending.stream_response.model_copy(update={"answer": "".join(answers)})
+            return pending.model_copy(update={"stream_response": message})
+
+        for chunk in stream_response:
+            sub_stream_response = chunk.stream_response
+            if type(sub_stream_response) is MessageStreamResponse:
+                if pending is not None and cls._is_same_message(pending, chunk):
+                    answers.append(sub_stream_response.answer)
+                    if time.monotonic() - pending_since >= window:
+                        yield _merged()
+                        pending = None
+                    continue
+
+                if pending is not None:
+                    yield _merged()
+                pending = chunk
+                answers = [sub_stream_response.answer]
+                pending_since = time.monotonic()
+                continue
+
+            if pending is not None:
+                yield _merged()
+                pending = None
+            yield chunk
+
+        if pending is not None:
+            yield _merged()
+
+    @staticmethod
+    def _is_same_message(chunk: AppStreamResponse, other: AppStreamResponse) -> bool:
+        message = cast(MessageStreamResponse, chunk.stream_response)
+        other_message = cast(MessageStreamResponse, other.stream_response)
+        return (
+            type(chunk) is type(other)
+            and all(
+                getattr(chunk, name) == getattr(other, name)
+                for name in type(chunk).model_fields
+                if name != "stream_response"
+            )
+            and all(
+                getattr(message, name) == getattr(other_message, name)
+                for name in MessageStreamResponse.model_fields
+                if name != "answer"
+            )
+        )
+
     @classmethod
     def _get_simple_metadata(cls, metadata: dict[str, Any]):
         """
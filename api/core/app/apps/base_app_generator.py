@@ -1,8 +1,8 @@
-import json
 from collections.abc import Generator, Mapping, Sequence
 from typing import TYPE_CHECKING, Any, Optional, Union
 
 from core.app.app_config.entities import VariableEntityType
+from core.app.apps.sse_encoder import SSEEncoder
 from core.file import File, FileUploadConfig
 from factories import file_factory
 
@@ -152,10 +152,8 @@ class BaseAppGenerator:
         else:
 
             def gen():
+                encoder = SSEEncoder()
                 for message in generator:
-                    if isinstance(message, Mapping | dict):
-                        yield f"data: {json.dumps(message)}\n\n"
-                    else:
-                        yield f"event: {message}\n\n"
+                    yield encoder.encode(message)
 
             return gen()
@@ -1,9 +1,14 @@
 import queue
 import time
 from abc import abstractmethod
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from enum import Enum
-from typing import Any, Optional
+from types import NoneType
+from typing import Annotated, Any, Literal, Optional, get_args, get_origin
+from uuid import UUID
 
+from pydantic import BaseModel
 from sqlalchemy.orm import DeclarativeMeta
 
 from configs import dify_config
@@ -18,6 +23,34 @@ from core.app.entities.queue_entities import (
 )
 from extensions.ext_redis import redis_client
 
+# types whose instances can never be or contain SQLAlchemy models
+_PRIMITIVE_TYPES = (str, int, float, bool, bytes, NoneType, date, datetime, timedelta, Decimal, UUID, Enum)
+
+# model class -> names of its fields whose values may contain SQLAlchemy models
+_model_fields_to_check: dict[type[BaseModel], tuple[str, ...]] = {}
+
+
+def _may_contain_sqlalchemy_models(annotation: Any) -> bool:
+    origin = get_origin(annotation)
+    if origin is None:
+        # pydantic models are checked by the class of their value, which may be a subclass with more fields
+        return not (isinstance(annotation, type) and issubclass(annotation, _PRIMITIVE_TYPES))
+    if origin is Literal:
+        return False
+    if origin is Annotated:
+        return _may_contain_sqlalchemy_models(get_args(annotation)[0])
+    return any(_may_contain_sqlalchemy_models(arg) for arg in get_args(annotation) if arg is not Ellipsis)
+
+
+def _get_model_fields_to_check(model_class: type[BaseModel]) -> tuple[str, ...]:
+    fields = _model_fields_to_check.get(model_class)
+    if fields is None:
+        fields = tuple(
+            name for name, field in model_class.model_fields.items() if _may_contain_sqlalchemy_models(field.annotation)
+        )
+        _model_fields_to_check[model_class] = fields
+    return fields
+
 
 class PublishFrom(Enum):
     APPLICATION_MANAGER = 1
@@ -25,6 +58,11 @@ class PublishFrom(Enum):
 
 
 class AppQueueManager:
+    # seconds between checks of the stop flag and the listen timeout while listening
+    _LISTEN_CHECK_INTERVAL = 1
+    # seconds the stop flag read from Redis is reused for
+    _STOP_FLAG_CHECK_INTERVAL = 0.5
+
     def __init__(self, task_id: str, user_id: str, invoke_from: InvokeFrom) -> None:
         if not user_id:
             raise ValueError("user is required")
@@ -41,6 +79,8 @@ class AppQueueManager:
         q: queue.Queue[WorkflowQueueMessage | MessageQueueMessage | None] = queue.Queue()
 
         self._q = q
+        self._stopped = False
+        self._stop_flag_checked_at = 0.0
 
     def listen(self):
         """
@@ -51,9 +91,11 @@ class AppQueueManager:
         listen_timeout = dify_config.APP_MAX_EXECUTION_TIME
         start_time = time.time()
         last_ping_time: int | float = 0
+        next_check_time = start_time
         while True:
             try:
-                message = self._q.get(timeout=1)
+                # block until the next message, or until the stop flag and timeout are due to be checked
+                message = self._q.get(timeout=max(next_check_time - time.time(), 0))
                 if message is None:
                     break
 
@@ -61,17 +103,20 @@ class AppQueueManager:
             except queue.Empty:
                 continue
             finally:
-                elapsed_time = time.time() - start_time
-                if elapsed_time >= listen_timeout or self._is_stopped():
-                    # publish two messages to make sure the client can receive the stop signal
-                    # and stop listening after the stop signal processed
-                    self.publish(
-                        QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
-                    )
-
-                if elapsed_time // 10 > last_ping_time:
-                    self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
-                    last_ping_time = elapsed_time // 10
+                now = time.time()
+                if now >= next_check_time:
+                    next_check_time = now + self._LISTEN_CHECK_INTERVAL
+                    elapsed_time = now - start_time
+                    if elapsed_time >= listen_timeout or self._is_stopped():
+                        # publish two messages to make sure the client can receive the stop signal
+                        # and stop listening after the stop signal processed
+                        self.publish(
+                            QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
+                        )
+
+                    if elapsed_time // 10 > last_ping_time:
+                        self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
+                        last_ping_time = elapsed_time // 10
 
     def stop_listen(self) -> None:
         """
@@ -96,7 +141,7 @@ class AppQueueManager:
         :param pub_from:
         :return:
         """
-        self._check_for_sqlalchemy_models(event.model_dump())
+        self._check_for_sqlalchemy_models(event)
         self._publish(event, pub_from)
 
     @abstractmethod
@@ -128,15 +173,23 @@ class AppQueueManager:
 
     def _is_stopped(self) -> bool:
         """
-        Check if task is stopped
+        Check if task is stopped, reading the stop flag from Redis at most every _STOP_FLAG_CHECK_INTERVAL seconds
         :return:
         """
+        if self._stopped:
+            return True
+
+        now = time.monotonic()
+        if now - self._stop_flag_checked_at < self._STOP_FLAG_CHECK_INTERVAL:
+            return False
+        self._stop_flag_checked_at = now
+
         stopped_cache_key = AppQueueManager._generate_stopped_cache_key(self._task_id)
         result = redis_client.get(stopped_cache_key)
         if result is not None:
-            return True
+            self._stopped = True
 
-        return False
+        return self._stopped
 
     @classmethod
     def _generate_task_belong_cache_key(cls, task_id: str) -> str:
@@ -157,11 +210,18 @@ class AppQueueManager:
         return f"generate_task_stopped:{task_id}"
 
     def _check_for_sqlalchemy_models(self, data: Any):
-        # from entity to dict or list
-        if isinstance(data, dict):
+        if isinstance(data, BaseModel):
+            # only walk the fields whose type allows SQLAlchemy models, worked out once per model class
+            for name in _get_model_fields_to_check(type(data)):
+                self._check_for_sqlalchemy_models(getattr(data, name))
+            if data.__pydantic_extra__:
+                self._check_for_sqlalchemy_models(data.__pydantic_extra__)
+        elif isinstance(data, _PRIMITIVE_TYPES):
+            return
+        elif isinstance(data, dict):
             for key, value in data.items():
                 self._check_for_sqlalchemy_models(value)
-        elif isinstance(data, list):
+        elif isinstance(data, list | tuple | set | frozenset):
             for item in data:
                 self._check_for_sqlalchemy_models(item)
         else:
@@ -0,0 +1,65 @@
+import json
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from core.model_runtime.utils.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+# stands in for the answer of message events while their envelope is serialized
+_ANSWER_PLACEHOLDER = "\x00answer\x00"
+
+
+def _default(obj: Any) -> Any:
+    return jsonable_encoder(obj)
+
+
+def dumps_json(obj: Any) -> str:
+    """Serialize to JSON with orjson when it is installed, and with the standard library otherwise."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=_default)
+
+
+class SSEEncoder:
+    """
+    Encodes the messages of one stream as server-sent events.
+
+    Message events of a stream differ only in their answer, so the rest of them, the envelope, is
+    serialized once, and later message events with the same envelope only serialize their answer.
+    """
+
+    def __init__(self) -> None:
+        self._envelope: Optional[dict[str, Any]] = None
+        self._prefix = ""
+        self._suffix = ""
+
+    def encode(self, message: Mapping[str, Any] | str) -> str:
+        if not isinstance(message, Mapping):
+            return f"event: {message}\n\n"
+        if message.get("event") == "message" and isinstance(message.get("answer"), str):
+            return self._encode_message(message)
+        return f"data: {dumps_json(message)}\n\n"
+
+    def _encode_message(self, message: Mapping[str, Any]) -> str:
+        envelope = self._envelope
+        if (
+            envelope is None
+            or len(message) != len(envelope) + 1
+            or any(key not in message or message[key] != value for key, value in envelope.items())
+        ):
+            envelope = {key: value for key, value in message.items() if key != "answer"}
+            frame = dumps_json({**message, "answer": _ANSWER_PLACEHOLDER})
+            encoded_placeholder = dumps_json(_ANSWER_PLACEHOLDER)
+            prefix, suffix = frame.split(encoded_placeholder, 1)
+            if encoded_placeholder in suffix:
+                # the placeholder also occurs elsewhere in the message, do not reuse the envelope
+                return f"data: {dumps_json(message)}\n\n"
+            self._envelope = envelope
+            self._prefix = f"data: {prefix}"
+            self._suffix = f"{suffix}\n\n"
+
+        return f"{self._prefix}{dumps_json(message['answer'])}{self._suffix}"
@@ -116,6 +116,18 @@ class MessageStreamResponse(StreamResponse):
     answer: str
     from_variable_selector: Optional[list[str]] = None
 
+    def to_dict(self):
+        # sent for every generated token, so skip the generic encoder for these plain fields
+        return {
+            "event": self.event.value,
+            "task_id": self.task_id,
+            "id": self.id,
+            "answer": self.answer,
+            "from_variable_selector": list(self.from_variable_selector)
+            if self.from_variable_selector is not None
+            else None,
+        }
+
 
 class MessageAudioStreamResponse(StreamResponse):
     """
@@ -5,19 +5,38 @@ from collections.abc import Generator, Mapping
 from datetime import timedelta
 from typing import Any, Optional, Union
 
+from redis.commands.core import Script
+
 from core.errors.error import AppInvokeQuotaExceededError
 from extensions.ext_redis import redis_client
 
 logger = logging.getLogger(__name__)
 
 
+# Atomically evict stale requests, check the limit and register the request.
+# KEYS[1]: sorted set of active request ids scored by their start time
+# ARGV: max active requests, now, max alive time, request id, key ttl
+# Returns 1 if the request is admitted, 0 otherwise.
+_ENTER_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[2]) - tonumber(ARGV[3]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+
 class RateLimit:
     _MAX_ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:max_active_requests"
-    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:active_requests"
+    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:active_requests_by_time"
     _UNLIMITED_REQUEST_ID = "unlimited_request_id"
     _REQUEST_MAX_ALIVE_TIME = 10 * 60  # 10 minutes
-    _ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL = 5 * 60  # recalculate request_count from request_detail every 5 minutes
+    _ACTIVE_REQUESTS_KEY_TTL = 24 * 60 * 60  # 1 day
+    _ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL = 5 * 60  # refresh max_active_requests from redis every 5 minutes
     _instance_dict: dict[str, "RateLimit"] = {}
+    _enter_script: Optional[Script] = None
 
     def __new__(cls: type["RateLimit"], client_id: str, max_active_requests: int):
         if client_id not in cls._instance_dict:
@@ -50,18 +69,7 @@ class RateLimit:
             self.max_active_requests = int(redis_client.get(self.max_active_requests_key).decode("utf-8"))
             redis_client.expire(self.max_active_requests_key, timedelta(days=1))
 
-        # flush max active requests (in-transit request list)
-        if not redis_client.exists(self.active_requests_key):
-            return
-        request_details = redis_client.hgetall(self.active_requests_key)
-        redis_client.expire(self.active_requests_key, timedelta(days=1))
-        timeout_requests = [
-            k
-            for k, v in request_details.items()
-            if time.time() - float(v.decode("utf-8")) > RateLimit._REQUEST_MAX_ALIVE_TIME
-        ]
-        if timeout_requests:
-            redis_client.hdel(self.active_requests_key, *timeout_requests)
+        # stale in-transit requests are evicted atomically on every enter, see _ENTER_SCRIPT
 
     def enter(self, request_id: Optional[str] = None) -> str:
         if self.disabled():
@@ -71,19 +79,29 @@ class RateLimit:
         if not request_id:
             request_id = RateLimit.gen_request_key()
 
-        active_requests_count = redis_client.hlen(self.active_requests_key)
-        if active_requests_count >= self.max_active_requests:
+        if RateLimit._enter_script is None:
+            RateLimit._enter_script = redis_client.register_script(_ENTER_SCRIPT)
+        admitted = RateLimit._enter_script(
+            keys=[self.active_requests_key],
+            args=[
+                self.max_active_requests,
+                time.time(),
+                RateLimit._REQUEST_MAX_ALIVE_TIME,
+                request_id,
+                RateLimit._ACTIVE_REQUESTS_KEY_TTL,
+            ],
+        )
+        if not admitted:
             raise AppInvokeQuotaExceededError(
                 f"Too many requests. Please try again later. The current maximum concurrent requests allowed "
                 f"for {self.client_id} is {self.max_active_requests}."
             )
-        redis_client.hset(self.active_requests_key, request_id, str(time.time()))
         return request_id
 
     def exit(self, request_id: str):
         if request_id == RateLimit._UNLIMITED_REQUEST_ID:
             return
-        redis_client.hdel(self.active_requests_key, request_id)
+        redis_client.zrem(self.active_requests_key, request_id)
 
     def disabled(self):
         return self.max_active_requests <= 0
@@ -1,12 +1,14 @@
 import logging
 from collections.abc import Sequence
 
+from configs import dify_config
 from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import QueueRetrieverResourcesEvent
 from core.rag.entities.citation_metadata import RetrievalSourceMetadata
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.models.document import Document
+from core.rag.retrieval.retrieval_analytics import RetrievalAnalytics
 from extensions.ext_database import db
 from models.dataset import ChildChunk, DatasetQuery, DocumentSegment
 from models.dataset import Document as DatasetDocument
@@ -30,14 +32,16 @@ class DatasetIndexToolCallbackHandler:
         """
         Handle query.
         """
+        created_by_role = "account" if self._invoke_from in {InvokeFrom.EXPLORE, InvokeFrom.DEBUGGER} else "end_user"
+        if dify_config.RETRIEVAL_ANALYTICS_ASYNC_ENABLED:
+            RetrievalAnalytics.record_queries(query, [dataset_id], self._app_id, created_by_role, self._user_id)
+            return
         dataset_query = DatasetQuery(
             dataset_id=dataset_id,
             content=query,
             source="app",
             source_app_id=self._app_id,
-            created_by_role=(
-                "account" if self._invoke_from in {InvokeFrom.EXPLORE, InvokeFrom.DEBUGGER} else "end_user"
-            ),
+            created_by_role=created_by_role,
             created_by=self._user_id,
         )
 
@@ -46,6 +50,9 @@ class DatasetIndexToolCallbackHandler:
 
     def on_tool_end(self, documents: list[Document]) -> None:
         """Handle tool end."""
+        if dify_config.RETRIEVAL_ANALYTICS_ASYNC_ENABLED:
+            RetrievalAnalytics.record_hits(documents)
+            return
         for document in documents:
             if document.metadata is not None:
                 document_id = document.metadata["document_id"]
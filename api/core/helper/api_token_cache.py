@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import UTC, datetime
+from typing import Any, Optional, cast
+
+from cachetools import TTLCache
+
+from configs import dify_config
+from extensions.ext_redis import redis_client
+from tasks.update_api_tokens_last_used_task import update_api_tokens_last_used_task
+
+logger = logging.getLogger(__name__)
+
+
+class ApiTokenCache:
+    """
+    Two-level cache of the lookups that authenticate Service API requests.
+
+    It holds API tokens by scope and token, and the owner account of tenants. L1 is a small
+    process-local TTL cache, L2 is Redis. Invalidation deletes the Redis entry and the local
+    one of the current process, other processes see it once their local entry expires after
+    API_TOKEN_CACHE_LOCAL_TTL seconds. Tokens are keyed by their SHA-256 hash, so no token is
+    stored in a cache key.
+    """
+
+    def __init__(self, ttl: int, local_ttl: int, local_max_size: int = 10000) -> None:
+        self._ttl = ttl
+        self._local_cache: TTLCache = TTLCache(maxsize=local_max_size, ttl=local_ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _api_token_cache_key(scope: Optional[str], token: str) -> str:
+        return f"api_token:{scope}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+    @staticmethod
+    def _tenant_owner_cache_key(tenant_id: str) -> str:
+        return f"api_token_tenant_owner:{tenant_id}"
+
+    def get_api_token(self, scope: Optional[str], token: str) -> Optional[dict[str, Any]]:
+        return self._get(self._api_token_cache_key(scope, token))
+
+    def set_api_token(self, scope: Optional[str], token: str, api_token: dict[str, Any]) -> None:
+        self._set(self._api_token_cache_key(scope, token), api_token)
+
+    def delete_api_token(self, scope: Optional[str], token: str) -> None:
+        self._delete(self._api_token_cache_key(scope, token))
+
+    def get_tenant_owner(self, tenant_id: str) -> Optional[dict[str, Any]]:
+        return self._get(self._tenant_owner_cache_key(tenant_id))
+
+    def set_tenant_owner(self, tenant_id: str, owner: dict[str, Any]) -> None:
+        self._set(self._tenant_owner_cache_key(tenant_id), owner)
+
+    def delete_tenant_owner(self, tenant_id: str) -> None:
+        self._delete(self._tenant_owner_cache_key(tenant_id))
+
+    def _get(self, key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            value = cast(Optional[dict[str, Any]], self._local_cache.get(key))
+        if value is not None:
+            return value
+
+        data = redis_client.get(key)
+        if not data:
+            return None
+        try:
+            value = cast(dict[str, Any], json.loads(data))
+        except json.JSONDecodeError:
+            return None
+
+        with self._lock:
+            self._local_cache[key] = value
+        return value
+
+    def _set(self, key: str, value: dict[str, Any]) -> None:
+        redis_client.setex(key, self._ttl, json.dumps(value))
+        with self._lock:
+            self._local_cache[key] = value
+
+    def _delete(self, key: str) -> None:
+        redis_client.delete(key)
+        with self._lock:
+            self._local_cache.pop(key, None)
+
+
+class ApiTokenUsageRecorder:
+    """
+    Aggregates the last use of API tokens and writes it asynchronously in batches.
+
+    Each token is recorded at most once per API_TOKEN_LAST_USED_UPDATE_INTERVAL seconds, and the
+    recorded times are handed to a Celery task once that interval has passed since the last batch.
+    """
+
+    def __init__(self, interval: int) -> None:
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._pending: dict[str, str] = {}
+        self._recorded_at: dict[str, float] = {}
+        self._dispatched_at = time.monotonic()
+
+    def record(self, api_token_id: str) -> None:
+        now = time.monotonic()
+        batch = None
+        with self._lock:
+            recorded_at = self._recorded_at.get(api_token_id)
+            if recorded_at is None or now - recorded_at >= self._interval:
+                self._recorded_at[api_token_id] = now
+                self._pending[api_token_id] = datetime.now(UTC).replace(tzinfo=None).isoformat()
+
+            if self._pending and now - self._dispatched_at >= self._interval:
+                batch = self._pending
+                self._pending = {}
+                self._dispatched_at = now
+                # forget tokens not used within the interval, so the map does not grow unbounded
+                self._recorded_at = {k: v for k, v in self._recorded_at.items() if now - v < self._interval}
+
+        if batch:
+            self._dispatch(batch)
+
+    @staticmethod
+    def _dispatch(batch: dict[str, str]) -> None:
+        try:
+            update_api_tokens_last_used_task.delay(batch)
+        except Exception:
+            logger.exception(f"Failed to dispatch last used times of {len(batch)} API tokens")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending = {}
+            self._recorded_at = {}
+            self._dispatched_at = time.monotonic()
+
+
+api_token_cache = ApiTokenCache(
+    ttl=dify_config.API_TOKEN_CACHE_TTL,
+    local_ttl=dify_config.API_TOKEN_CACHE_LOCAL_TTL,
+)
+
+api_token_usage_recorder = ApiTokenUsageRecorder(interval=dify_config.API_TOKEN_LAST_USED_UPDATE_INTERVAL)
+os.register_at_fork(after_in_child=api_token_usage_recorder.reset)
@@ -0,0 +1,92 @@
+import threading
+import uuid
+from typing import Optional
+
+from cachetools import TTLCache
+
+from configs import dify_config
+from core.entities.provider_configuration import ProviderConfigurations
+from extensions.ext_redis import redis_client
+
+
+class ProviderConfigurationsCache:
+    """
+    Process-local cache of the model provider configurations of workspaces.
+
+    Configurations are cached per tenant together with the version they were built at. The version
+    is a random token in Redis that is replaced whenever a provider, model, credential, model
+    setting or load balancing record of the tenant changes, so every process stops using its
+    cached configurations at once. Entries also expire after a TTL, which bounds the staleness of
+    changes made elsewhere, e.g. plugins installed by the plugin daemon.
+    Every get returns a copy of the credentials, quotas and model settings, so callers cannot
+    change the cached ones. Provider schemas come from model runtime and are shared.
+    """
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        self._cache: Optional[TTLCache] = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache is not None
+
+    @staticmethod
+    def _version_key(tenant_id: str) -> str:
+        return f"provider_configurations_version:{tenant_id}"
+
+    def get_version(self, tenant_id: str) -> str:
+        key = self._version_key(tenant_id)
+        version = redis_client.get(key)
+        if version is None:
+            redis_client.setnx(key, uuid.uuid4().hex)
+            version = redis_client.get(key)
+        return version.decode() if isinstance(version, bytes) else str(version)
+
+    def invalidate(self, tenant_id: str) -> None:
+        """Make every process rebuild the provider configurations of the tenant."""
+        redis_client.set(self._version_key(tenant_id), uuid.uuid4().hex)
+        if self._cache is not None:
+            with self._lock:
+                self._cache.pop(tenant_id, None)
+
+    def get(self, tenant_id: str, version: str) -> Optional[ProviderConfigurations]:
+        if self._cache is None:
+            return None
+        with self._lock:
+            entry = self._cache.get(tenant_id)
+        if entry is None or entry[0] != version:
+            return None
+        return self._copy(entry[1])
+
+    def set(self, tenant_id: str, version: str, configurations: ProviderConfigurations) -> None:
+        if self._cache is None:
+            return
+        configurations = self._copy(configurations)
+        with self._lock:
+            self._cache[tenant_id] = (version, configurations)
+
+    @staticmethod
+    def _copy(configurations: ProviderConfigurations) -> ProviderConfigurations:
+        copied = ProviderConfigurations(tenant_id=configurations.tenant_id)
+        for key, configuration in configurations.configurations.items():
+            copied[key] = configuration.model_copy(
+                update={
+                    "system_configuration": configuration.system_configuration.model_copy(deep=True),
+                    "custom_configuration": configuration.custom_configuration.model_copy(deep=True),
+                    "model_settings": [
+                        model_setting.model_copy(deep=True) for model_setting in configuration.model_settings
+                    ],
+                }
+            )
+        return copied
+
+    def clear(self) -> None:
+        if self._cache is not None:
+            with self._lock:
+                self._cache.clear()
+
+
+provider_configurations_cache = ProviderConfigurationsCache(
+    maxsize=dify_config.PROVIDER_CONFIGURATIONS_CACHE_MAX_SIZE,
+    ttl=dify_config.PROVIDER_CONFIGURATIONS_CACHE_TTL,
+)
@@ -2,8 +2,13 @@
 Proxy requests to avoid SSRF
 """
 
+import asyncio
 import logging
+import os
+import threading
 import time
+import weakref
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 
 import httpx
 
@@ -34,7 +39,96 @@ class MaxRetriesExceededError(ValueError):
     pass
 
 
-def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+# cookies set by one response must never be sent along with another request through a shared client
+_REJECT_ALL_COOKIES_POLICY = DefaultCookiePolicy(allowed_domains=[])
+
+_clients: dict[tuple, httpx.Client] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+
+def _client_key(ssl_verify: bool) -> tuple:
+    return (
+        dify_config.SSRF_PROXY_ALL_URL,
+        dify_config.SSRF_PROXY_HTTP_URL,
+        dify_config.SSRF_PROXY_HTTPS_URL,
+        ssl_verify,
+    )
+
+
+def _client_kwargs(ssl_verify: bool, transport_class: type) -> dict:
+    """Build the pool and proxy settings shared by the sync and the async client."""
+    limits = httpx.Limits(
+        max_connections=dify_config.SSRF_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=dify_config.SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=dify_config.SSRF_POOL_KEEPALIVE_EXPIRY,
+    )
+    kwargs: dict = {
+        "verify": ssl_verify,
+        "limits": limits,
+        "http2": dify_config.SSRF_HTTP2_ENABLED,
+        "cookies": CookieJar(policy=_REJECT_ALL_COOKIES_POLICY),
+    }
+    if dify_config.SSRF_PROXY_ALL_URL:
+        kwargs["proxy"] = dify_config.SSRF_PROXY_ALL_URL
+    elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
+        kwargs["mounts"] = {
+            "http://": transport_class(
+                proxy=dify_config.SSRF_PROXY_HTTP_URL,
+                verify=ssl_verify,
+                limits=limits,
+                http2=dify_config.SSRF_HTTP2_ENABLED,
+            ),
+            "https://": transport_class(
+                proxy=dify_config.SSRF_PROXY_HTTPS_URL,
+                verify=ssl_verify,
+                limits=limits,
+                http2=dify_config.SSRF_HTTP2_ENABLED,
+            ),
+        }
+    return kwargs
+
+
+def get_client(ssl_verify: bool = HTTP_REQUEST_NODE_SSL_VERIFY) -> httpx.Client:
+    """Get the long-lived, connection-pooled client for the current proxy configuration."""
+    key = _client_key(ssl_verify)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = httpx.Client(**_client_kwargs(ssl_verify, httpx.HTTPTransport))
+                _clients[key] = client
+    return client
+
+
+def get_async_client(ssl_verify: bool = HTTP_REQUEST_NODE_SSL_VERIFY) -> httpx.AsyncClient:
+    """Get the connection-pooled async client for the current proxy configuration and event loop."""
+    loop = asyncio.get_running_loop()
+    key = _client_key(ssl_verify)
+    with _clients_lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            client = httpx.AsyncClient(**_client_kwargs(ssl_verify, httpx.AsyncHTTPTransport))
+            loop_clients[key] = client
+    return client
+
+
+def _reset_clients() -> None:
+    global _clients_lock
+    # pooled connections inherited from the parent process must not be shared, just forget them
+    _clients.clear()
+    _async_clients.clear()
+    _clients_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_clients)
+
+
+def _prepare_request_kwargs(kwargs: dict) -> tuple[bool, dict]:
     if "allow_redirects" in kwargs:
         allow_redirects = kwargs.pop("allow_redirects")
         if "follow_redirects" not in kwargs:
@@ -52,23 +146,17 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
         kwargs["ssl_verify"] = HTTP_REQUEST_NODE_SSL_VERIFY
 
     ssl_verify = kwargs.pop("ssl_verify")
+    return ssl_verify, kwargs
+
+
+def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    ssl_verify, kwargs = _prepare_request_kwargs(kwargs)
+    client = get_client(ssl_verify)
 
     retries = 0
     while retries <= max_retries:
         try:
-            if dify_config.SSRF_PROXY_ALL_URL:
-                with httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
-                proxy_mounts = {
-                    "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL, verify=ssl_verify),
-                    "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL, verify=ssl_verify),
-                }
-                with httpx.Client(mounts=proxy_mounts, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            else:
-                with httpx.Client(verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
+            response = client.request(method=method, url=url, **kwargs)
 
             if response.status_code not in STATUS_FORCELIST:
                 return response
@@ -86,6 +174,31 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
 
 
+async def make_request_async(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    ssl_verify, kwargs = _prepare_request_kwargs(kwargs)
+    client = get_async_client(ssl_verify)
+
+    retries = 0
+    while retries <= max_retries:
+        try:
+            response = await client.request(method=method, url=url, **kwargs)
+
+            if response.status_code not in STATUS_FORCELIST:
+                return response
+            else:
+                logging.warning(f"Received status code {response.status_code} for URL {url} which is in the force list")
+
+        except httpx.RequestError as e:
+            logging.warning(f"Request to URL {url} failed on attempt {retries + 1}: {e}")
+            if max_retries == 0:
+                raise
+
+        retries += 1
+        if retries <= max_retries:
+            await asyncio.sleep(BACKOFF_FACTOR * (2 ** (retries - 1)))
+    raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
+
+
 def get(url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     return make_request("GET", url, max_retries=max_retries, **kwargs)
 
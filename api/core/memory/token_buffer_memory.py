@@ -1,3 +1,4 @@
+from collections import defaultdict
 from collections.abc import Sequence
 from typing import Optional
 
@@ -69,18 +70,32 @@ class TokenBufferMemory:
 
         messages = list(reversed(thread_messages))
 
+        # load the files of all history messages at once instead of querying them message by message
+        message_files: dict[str, list[MessageFile]] = defaultdict(list)
+        if messages:
+            for message_file in (
+                db.session.query(MessageFile).filter(MessageFile.message_id.in_([m.id for m in messages])).all()
+            ):
+                message_files[message_file.message_id].append(message_file)
+
+        workflow_runs: dict[str, WorkflowRun] = {}
+        workflow_run_ids = {m.workflow_run_id for m in messages if m.workflow_run_id and message_files.get(m.id)}
+        if workflow_run_ids and self.conversation.mode in {AppMode.ADVANCED_CHAT, AppMode.WORKFLOW}:
+            workflow_runs = {
+                workflow_run.id: workflow_run
+                for workflow_run in db.session.query(WorkflowRun).filter(WorkflowRun.id.in_(workflow_run_ids)).all()
+            }
+
         prompt_messages: list[PromptMessage] = []
         for message in messages:
-            files = db.session.query(MessageFile).filter(MessageFile.message_id == message.id).all()
+            files = message_files.get(message.id)
             if files:
                 file_extra_config = None
                 if self.conversation.mode not in {AppMode.ADVANCED_CHAT, AppMode.WORKFLOW}:
                     file_extra_config = FileUploadConfigManager.convert(self.conversation.model_config)
                 else:
                     if message.workflow_run_id:
-                        workflow_run = (
-                            db.session.query(WorkflowRun).filter(WorkflowRun.id == message.workflow_run_id).first()
-                        )
+                        workflow_run = workflow_runs.get(message.workflow_run_id)
 
                         if workflow_run and workflow_run.workflow:
                             file_extra_config = FileUploadConfigManager.convert(
@@ -120,15 +135,38 @@ class TokenBufferMemory:
             return []
 
         # prune the chat message if it exceeds the max token limit
-        curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
+        return self._prune_prompt_messages(prompt_messages, max_token_limit)
+
+    def _prune_prompt_messages(self, prompt_messages: list[PromptMessage], max_token_limit: int) -> list[PromptMessage]:
+        """
+        Drop the oldest prompt messages until the rest fits into the max token limit.
 
-        if curr_message_tokens > max_token_limit:
-            pruned_memory = []
-            while curr_message_tokens > max_token_limit and len(prompt_messages) > 1:
-                pruned_memory.append(prompt_messages.pop(0))
-                curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
+        The token count of a suffix only shrinks as messages are dropped from its front, so the
+        first suffix that fits is found by binary search. This needs O(log n) token counting
+        calls, each of them possibly a plugin daemon round trip, instead of one call per dropped message.
+        :param prompt_messages: prompt messages, oldest first
+        :param max_token_limit: max token limit
+        """
+        suffix_tokens: dict[int, int] = {}
+
+        def count_suffix_tokens(start: int) -> int:
+            if start not in suffix_tokens:
+                suffix_tokens[start] = self.model_instance.get_llm_num_tokens(prompt_messages[start:])
+            return suffix_tokens[start]
+
+        if len(prompt_messages) <= 1 or count_suffix_tokens(0) <= max_token_limit:
+            return prompt_messages
+
+        # at least the latest message is always kept, even if it exceeds the limit on its own
+        low, high = 1, len(prompt_messages) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if count_suffix_tokens(middle) <= max_token_limit:
+                high = middle
+            else:
+                low = middle + 1
 
-        return prompt_messages
+        return prompt_messages[low:]
 
     def get_history_prompt_text(
         self,
@@ -1,3 +1,4 @@
+import gzip
 import json
 import logging
 import os
@@ -786,9 +787,11 @@ class TraceTask:
 
 
 trace_manager_timer: Optional[threading.Timer] = None
-trace_manager_queue: queue.Queue = queue.Queue()
+trace_manager_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("TRACE_QUEUE_MANAGER_MAX_SIZE", 10000)))
 trace_manager_interval = int(os.getenv("TRACE_QUEUE_MANAGER_INTERVAL", 5))
 trace_manager_batch_size = int(os.getenv("TRACE_QUEUE_MANAGER_BATCH_SIZE", 100))
+# batches up to this size in bytes are shipped inline in the task payload instead of via storage
+trace_manager_inline_payload_limit = int(os.getenv("TRACE_QUEUE_MANAGER_INLINE_PAYLOAD_LIMIT", 64 * 1024))
 
 
 class TraceQueueManager:
@@ -807,7 +810,10 @@ class TraceQueueManager:
         try:
             if self.trace_instance:
                 trace_task.app_id = self.app_id
-                trace_manager_queue.put(trace_task)
+                trace_manager_queue.put_nowait(trace_task)
+        except queue.Full:
+            # shed traces rather than blocking the request or growing memory without bound
+            logging.warning(f"Trace queue is full, dropping trace task, trace_type {trace_task.trace_type}")
         except Exception as e:
             logging.exception(f"Error adding trace task, trace_type {trace_task.trace_type}")
         finally:
@@ -824,8 +830,7 @@ class TraceQueueManager:
 
     def run(self):
         try:
-            tasks = self.collect_tasks()
-            if tasks:
+            while tasks := self.collect_tasks():
                 self.send_to_celery(tasks)
         except Exception as e:
             logging.exception("Error processing trace tasks")
@@ -840,20 +845,24 @@ class TraceQueueManager:
 
     def send_to_celery(self, tasks: list[TraceTask]):
         with self.flask_app.app_context():
+            traces: list[str] = []
             for task in tasks:
                 if task.app_id is None:
                     continue
-                file_id = uuid4().hex
                 trace_info = task.execute()
                 task_data = TaskData(
                     app_id=task.app_id,
                     trace_info_type=type(trace_info).__name__,
                     trace_info=trace_info.model_dump() if trace_info else None,
                 )
-                file_path = f"{OPS_FILE_PATH}{task.app_id}/{file_id}.json"
-                storage.save(file_path, task_data.model_dump_json().encode("utf-8"))
-                file_info = {
-                    "file_id": file_id,
-                    "app_id": task.app_id,
-                }
-                process_trace_tasks.delay(file_info)
+                traces.append(task_data.model_dump_json())
+            if not traces:
+                return
+
+            # small batches travel inline with the task, larger ones are spooled to a single compressed file
+            if sum(len(trace) for trace in traces) <= trace_manager_inline_payload_limit:
+                process_trace_tasks.delay({"traces": traces})
+            else:
+                file_path = f"{OPS_FILE_PATH}batches/{uuid4().hex}.jsonl.gz"
+                storage.save(file_path, gzip.compress("\n".join(traces).encode("utf-8")))
+                process_trace_tasks.delay({"batch_file_path": file_path})
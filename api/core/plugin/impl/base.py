@@ -1,6 +1,10 @@
 import inspect
 import json
 import logging
+import os
+import re
+import threading
+import time
 from collections.abc import Callable, Generator
 from typing import TypeVar
 
@@ -37,6 +41,96 @@ T = TypeVar("T", bound=(BaseModel | dict | list | bool | str))
 
 logger = logging.getLogger(__name__)
 
+_ENDPOINT_ID_SEGMENT_PATTERN = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)
+
+
+class PluginDaemonClientStats:
+    """
+    Latency and in-flight counters of requests to the plugin daemon, per endpoint.
+
+    Endpoints are request paths with tenant and other UUID segments replaced by ``{id}``.
+    Latency is measured until the response headers arrive, so streaming responses are
+    not counted for as long as their body is consumed.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict[str, float]] = {}
+
+    @staticmethod
+    def endpoint(method: str, path: str) -> str:
+        segments = ["{id}" if _ENDPOINT_ID_SEGMENT_PATTERN.match(s) else s for s in path.strip("/").split("/")]
+        return f"{method.upper()} /{'/'.join(segments)}"
+
+    def _get(self, endpoint: str) -> dict[str, float]:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = {
+                "in_flight": 0,
+                "requests": 0,
+                "errors": 0,
+                "total_latency": 0.0,
+                "max_latency": 0.0,
+            }
+        return stats
+
+    def request_started(self, endpoint: str) -> None:
+        with self._lock:
+            self._get(endpoint)["in_flight"] += 1
+
+    def request_finished(self, endpoint: str, latency: float, error: bool) -> None:
+        with self._lock:
+            stats = self._get(endpoint)
+            stats["in_flight"] -= 1
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+
+
+plugin_daemon_client_stats = PluginDaemonClientStats()
+
+_plugin_daemon_session: requests.Session | None = None
+_plugin_daemon_session_lock = threading.Lock()
+
+
+def _get_plugin_daemon_session() -> requests.Session:
+    """
+    Get the process-wide keep-alive session to the plugin daemon.
+
+    The session is created lazily and dropped in forked children, so every worker process
+    owns its own connection pool.
+    """
+    global _plugin_daemon_session
+    if _plugin_daemon_session is None:
+        with _plugin_daemon_session_lock:
+            if _plugin_daemon_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=dify_config.PLUGIN_DAEMON_MAX_CONNECTIONS,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _plugin_daemon_session = session
+    return _plugin_daemon_session
+
+
+def _reset_plugin_daemon_session() -> None:
+    global _plugin_daemon_session, _plugin_daemon_session_lock
+    # connections inherited from the parent process must not be shared, just forget them
+    _plugin_daemon_session = None
+    _plugin_daemon_session_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_plugin_daemon_session)
+
 
 class BasePluginClient:
     def _request(
@@ -60,13 +154,20 @@ class BasePluginClient:
         if headers.get("Content-Type") == "application/json" and isinstance(data, dict):
             data = json.dumps(data)
 
+        endpoint = PluginDaemonClientStats.endpoint(method, path)
+        plugin_daemon_client_stats.request_started(endpoint)
+        started_at = time.perf_counter()
+        error = True
         try:
-            response = requests.request(
+            response = _get_plugin_daemon_session().request(
                 method=method, url=str(url), headers=headers, data=data, params=params, stream=stream, files=files
             )
+            error = not response.ok
         except requests.exceptions.ConnectionError:
             logger.exception("Request to Plugin Daemon Service failed")
             raise PluginDaemonInnerError(code=-500, message="Request to Plugin Daemon Service failed")
+        finally:
+            plugin_daemon_client_stats.request_finished(endpoint, time.perf_counter() - started_at, error)
 
         return response
 
@@ -83,12 +184,14 @@ class BasePluginClient:
         Make a stream request to the plugin daemon inner API
         """
         response = self._request(method, path, headers, data, params, files, stream=True)
-        for line in response.iter_lines(chunk_size=1024 * 8):
-            line = line.decode("utf-8").strip()
-            if line.startswith("data:"):
-                line = line[5:].strip()
-            if line:
-                yield line
+        # close the response even if the consumer stops early, so its connection goes back to the pool
+        with response:
+            for line in response.iter_lines(chunk_size=1024 * 8):
+                line = line.decode("utf-8").strip()
+                if line.startswith("data:"):
+                    line = line[5:].strip()
+                if line:
+                    yield line
 
     def _stream_request_with_model(
         self,
@@ -24,6 +24,7 @@ from core.entities.provider_entities import (
 from core.helper import encrypter
 from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
 from core.helper.position_helper import is_filtered
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import (
     ConfigurateMethod,
@@ -53,11 +54,16 @@ class ProviderManager:
     ProviderManager is a class that manages the model providers includes Hosting and Customize Model Providers.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, use_cache: bool = True) -> None:
+        """
+        :param use_cache: reuse the provider configurations of workspaces cached across requests,
+            services changing provider records build them from the database instead
+        """
         self.decoding_rsa_key = None
         self.decoding_cipher_rsa = None
+        self.use_cache = use_cache
 
-    def get_configurations(self, tenant_id: str) -> ProviderConfigurations:
+    def get_configurations(self, tenant_id: str, refresh: bool = False) -> ProviderConfigurations:
         """
         Get model provider configurations.
 
@@ -92,6 +98,31 @@ class ProviderManager:
         - Switch selection priority
 
         :param tenant_id:
+        :param refresh: build the configurations even if they are cached, and replace the cached ones of
+            this process without making other processes rebuild theirs
+        :return:
+        """
+        cache_version = None
+        if self.use_cache and provider_configurations_cache.enabled:
+            # read the version before the records, so changes made while building are not hidden
+            cache_version = provider_configurations_cache.get_version(tenant_id)
+            if not refresh:
+                cached_provider_configurations = provider_configurations_cache.get(tenant_id, cache_version)
+                if cached_provider_configurations is not None:
+                    return cached_provider_configurations
+
+        provider_configurations = self._build_configurations(tenant_id)
+
+        if cache_version is not None:
+            provider_configurations_cache.set(tenant_id, cache_version, provider_configurations)
+
+        return provider_configurations
+
+    def _build_configurations(self, tenant_id: str) -> ProviderConfigurations:
+        """
+        Build the model provider configurations of the workspace from its records.
+
+        :param tenant_id: workspace id
         :return:
         """
         # Get all provider records of the workspace
@@ -254,6 +285,10 @@ class ProviderManager:
 
         # get provider instance
         provider_configuration = provider_configurations.get(provider)
+        if not provider_configuration and self.use_cache and provider_configurations_cache.enabled:
+            # the provider may have been installed after the configurations were cached, rebuild them in
+            # this process only, so apps using a missing provider do not make every process rebuild them
+            provider_configuration = self.get_configurations(tenant_id, refresh=True).get(provider)
         if not provider_configuration:
             raise ValueError(f"Provider {provider} does not exist.")
 
@@ -0,0 +1,78 @@
+import heapq
+import math
+from collections.abc import Mapping
+from operator import itemgetter
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def bm25_top_k(
+    postings: Mapping[str, Mapping[str, int]],
+    node_count: int,
+    avg_node_length: float,
+    k: int,
+    k1: float = BM25_K1,
+    b: float = BM25_B,
+) -> list[str]:
+    """
+    Rank nodes by the BM25 score of the query keywords and return the ids of the top k.
+
+    Every keyword occurs at most once per node, so the term frequency is always 1 and the score
+    of a keyword in a node only depends on its document frequency and the length of the node.
+    Posting lists are visited from the rarest keyword on, and visiting stops once no node left
+    out can reach the top k any more (MaxScore pruning), so the long posting lists of common
+    keywords are usually only probed, not scanned.
+
+    :param postings: the posting list of each query keyword, mapping node ids to node lengths
+    :param node_count: number of nodes in the index
+    :param avg_node_length: average number of keywords per node in the index
+    """
+    terms = sorted((node_lengths for node_lengths in postings.values() if node_lengths), key=len)
+    if k <= 0 or not terms:
+        return []
+
+    node_count = max(node_count, len(terms[-1]))
+    avg_node_length = avg_node_length if avg_node_length > 0 else 1.0
+
+    norms: dict[int, float] = {}
+
+    def norm(node_length: int) -> float:
+        value = norms.get(node_length)
+        if value is None:
+            # unknown lengths are treated as average ones
+            length_ratio = node_length / avg_node_length if node_length > 0 else 1.0
+            value = (k1 + 1) / (1 + k1 * (1 - b + b * length_ratio))
+            norms[node_length] = value
+        return value
+
+    idfs = [math.log(1 + (node_count - len(node_lengths) + 0.5) / (len(node_lengths) + 0.5)) for node_lengths in terms]
+    # the weight of a keyword is largest for the shortest nodes
+    max_norm = (k1 + 1) / (1 + k1 * (1 - b))
+    # remaining_bounds[i] is the highest score a node only in terms[i:] can reach
+    remaining_bounds = [0.0] * (len(terms) + 1)
+    for i in range(len(terms) - 1, -1, -1):
+        remaining_bounds[i] = remaining_bounds[i + 1] + idfs[i] * max_norm
+
+    scores: dict[str, float] = {}
+    for i, node_lengths in enumerate(terms):
+        if len(scores) >= k:
+            threshold = heapq.nlargest(k, scores.values())[-1]
+            if remaining_bounds[i] < threshold:
+                break
+
+        later_terms = list(zip(idfs[i + 1 :], terms[i + 1 :]))
+        idf = idfs[i]
+        for node_id, node_length in node_lengths.items():
+            if node_id in scores:
+                continue
+            # the node is in none of the rarer lists, so its score is complete after the later ones
+            node_norm = norm(node_length)
+            score = idf * node_norm
+            for later_idf, later_node_lengths in later_terms:
+                if node_id in later_node_lengths:
+                    score += later_idf * node_norm
+            scores[node_id] = score
+
+    return [node_id for node_id, _ in heapq.nlargest(k, scores.items(), key=itemgetter(1))]
@@ -1,105 +1,134 @@
 import json
 from collections import defaultdict
-from typing import Any, Optional
+from collections.abc import Iterable, Mapping
+from typing import Any
 
 from pydantic import BaseModel
+from sqlalchemy import delete, distinct, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
 
-from configs import dify_config
+from core.rag.datasource.keyword.jieba.bm25 import bm25_top_k
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.datasource.keyword.jieba.keyword_postings_cache import keyword_postings_cache
 from core.rag.datasource.keyword.keyword_base import BaseKeyword
 from core.rag.models.document import Document
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
-from models.dataset import Dataset, DatasetKeywordTable, DocumentSegment
+from models.dataset import Dataset, DatasetKeyword, DatasetKeywordTable, DocumentSegment
 
 
 class KeywordTableConfig(BaseModel):
     max_keywords_per_chunk: int = 10
 
 
+# data source type of keyword tables stored per keyword in DatasetKeyword
+KEYWORD_INDEX_DATA_SOURCE_TYPE = "dataset_keywords"
+
+_KEYWORD_INSERT_BATCH_SIZE = 1000
+
+_INDEX_STATS_CACHE_TTL = 300
+
+# datasets whose keyword table is known to be stored in DatasetKeyword
+_keyword_index_dataset_ids: set[str] = set()
+
+
 class Jieba(BaseKeyword):
+    """
+    Keyword index stored as one DatasetKeyword row per keyword and node.
+
+    Adding and deleting texts only touches the rows of the changed nodes, so writers do not
+    need to serialize on the whole table and readers do not take a lock. Searches read the
+    posting lists of the query keywords only, through a process-local cache that is
+    invalidated by a version stamp in Redis, and are ranked by BM25. Legacy keyword tables stored as one JSON document
+    are migrated on first use.
+    """
+
     def __init__(self, dataset: Dataset):
         super().__init__(dataset)
         self._config = KeywordTableConfig()
 
     def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
-        lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
-        with redis_client.lock(lock_name, timeout=600):
-            keyword_table_handler = JiebaKeywordTableHandler()
-            keyword_table = self._get_dataset_keyword_table()
-            for text in texts:
-                keywords = keyword_table_handler.extract_keywords(
-                    text.page_content, self._config.max_keywords_per_chunk
-                )
-                if text.metadata is not None:
-                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
-                    keyword_table = self._add_text_to_keyword_table(
-                        keyword_table or {}, text.metadata["doc_id"], list(keywords)
-                    )
+        self._ensure_keyword_index()
+        keyword_table_handler = JiebaKeywordTableHandler()
+        node_keywords = {}
+        for text in texts:
+            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
+            if text.metadata is not None:
+                self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                node_keywords[text.metadata["doc_id"]] = list(keywords)
 
-            self._save_dataset_keyword_table(keyword_table)
+        self._add_keywords(node_keywords)
 
-            return self
+        return self
 
     def add_texts(self, texts: list[Document], **kwargs):
-        lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
-        with redis_client.lock(lock_name, timeout=600):
-            keyword_table_handler = JiebaKeywordTableHandler()
-
-            keyword_table = self._get_dataset_keyword_table()
-            keywords_list = kwargs.get("keywords_list")
-            for i in range(len(texts)):
-                text = texts[i]
-                if keywords_list:
-                    keywords = keywords_list[i]
-                    if not keywords:
-                        keywords = keyword_table_handler.extract_keywords(
-                            text.page_content, self._config.max_keywords_per_chunk
-                        )
-                else:
+        self._ensure_keyword_index()
+        keyword_table_handler = JiebaKeywordTableHandler()
+
+        keywords_list = kwargs.get("keywords_list")
+        node_keywords = {}
+        for i in range(len(texts)):
+            text = texts[i]
+            if keywords_list:
+                keywords = keywords_list[i]
+                if not keywords:
                     keywords = keyword_table_handler.extract_keywords(
                         text.page_content, self._config.max_keywords_per_chunk
                     )
-                if text.metadata is not None:
-                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
-                    keyword_table = self._add_text_to_keyword_table(
-                        keyword_table or {}, text.metadata["doc_id"], list(keywords)
-                    )
+            else:
+                keywords = keyword_table_handler.extract_keywords(
+                    text.page_content, self._config.max_keywords_per_chunk
+                )
+            if text.metadata is not None:
+                self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                node_keywords[text.metadata["doc_id"]] = list(keywords)
 
-            self._save_dataset_keyword_table(keyword_table)
+        self._add_keywords(node_keywords)
 
     def text_exists(self, id: str) -> bool:
-        keyword_table = self._get_dataset_keyword_table()
-        if keyword_table is None:
-            return False
-        return id in set.union(*keyword_table.values())
+        self._ensure_keyword_index()
+        stmt = select(exists().where(DatasetKeyword.dataset_id == self.dataset.id, DatasetKeyword.index_node_id == id))
+        return bool(db.session.scalar(stmt))
 
     def delete_by_ids(self, ids: list[str]) -> None:
-        lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
-        with redis_client.lock(lock_name, timeout=600):
-            keyword_table = self._get_dataset_keyword_table()
-            if keyword_table is not None:
-                keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
-
-            self._save_dataset_keyword_table(keyword_table)
+        self._ensure_keyword_index()
+        if not ids:
+            return
+
+        for i in range(0, len(ids), _KEYWORD_INSERT_BATCH_SIZE):
+            db.session.execute(
+                delete(DatasetKeyword).where(
+                    DatasetKeyword.dataset_id == self.dataset.id,
+                    DatasetKeyword.index_node_id.in_(ids[i : i + _KEYWORD_INSERT_BATCH_SIZE]),
+                )
+            )
+        db.session.commit()
+        keyword_postings_cache.bump_version(self.dataset.id)
 
     def search(self, query: str, **kwargs: Any) -> list[Document]:
-        keyword_table = self._get_dataset_keyword_table()
+        self._ensure_keyword_index()
 
         k = kwargs.get("top_k", 4)
         document_ids_filter = kwargs.get("document_ids_filter")
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table or {}, query, k)
+        sorted_chunk_indices = self._retrieve_ids_by_query(query, k)
+
+        if not sorted_chunk_indices:
+            return []
+
+        # load the segments of all hits at once, they are returned in the order of their ranking
+        segment_query = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id, DocumentSegment.index_node_id.in_(sorted_chunk_indices)
+        )
+        if document_ids_filter:
+            segment_query = segment_query.filter(DocumentSegment.document_id.in_(document_ids_filter))
+        segments: dict[str, DocumentSegment] = {}
+        for loaded_segment in segment_query.all():
+            segments.setdefault(loaded_segment.index_node_id, loaded_segment)
 
         documents = []
         for chunk_index in sorted_chunk_indices:
-            segment_query = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id, DocumentSegment.index_node_id == chunk_index
-            )
-            if document_ids_filter:
-                segment_query = segment_query.filter(DocumentSegment.document_id.in_(document_ids_filter))
-            segment = segment_query.first()
-
+            segment = segments.get(chunk_index)
             if segment:
                 documents.append(
                     Document(
@@ -118,98 +147,170 @@ class Jieba(BaseKeyword):
     def delete(self) -> None:
         lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
         with redis_client.lock(lock_name, timeout=600):
+            db.session.execute(delete(DatasetKeyword).where(DatasetKeyword.dataset_id == self.dataset.id))
             dataset_keyword_table = self.dataset.dataset_keyword_table
             if dataset_keyword_table:
                 db.session.delete(dataset_keyword_table)
-                db.session.commit()
-                if dataset_keyword_table.data_source_type != "database":
-                    file_key = "keyword_files/" + self.dataset.tenant_id + "/" + self.dataset.id + ".txt"
-                    storage.delete(file_key)
-
-    def _save_dataset_keyword_table(self, keyword_table):
-        keyword_table_dict = {
-            "__type__": "keyword_table",
-            "__data__": {"index_id": self.dataset.id, "summary": None, "table": keyword_table},
-        }
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        keyword_data_source_type = dataset_keyword_table.data_source_type
-        if keyword_data_source_type == "database":
-            dataset_keyword_table.keyword_table = json.dumps(keyword_table_dict, cls=SetEncoder)
             db.session.commit()
-        else:
-            file_key = "keyword_files/" + self.dataset.tenant_id + "/" + self.dataset.id + ".txt"
-            if storage.exists(file_key):
+            # the keyword table of the dataset is gone, it must be created again before it is used
+            _keyword_index_dataset_ids.discard(self.dataset.id)
+            keyword_postings_cache.bump_version(self.dataset.id)
+            if dataset_keyword_table and dataset_keyword_table.data_source_type not in {
+                "database",
+                KEYWORD_INDEX_DATA_SOURCE_TYPE,
+            }:
+                file_key = "keyword_files/" + self.dataset.tenant_id + "/" + self.dataset.id + ".txt"
                 storage.delete(file_key)
-            storage.save(file_key, json.dumps(keyword_table_dict, cls=SetEncoder).encode("utf-8"))
-
-    def _get_dataset_keyword_table(self) -> Optional[dict]:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            keyword_table_dict = dataset_keyword_table.keyword_table_dict
-            if keyword_table_dict:
-                return dict(keyword_table_dict["__data__"]["table"])
-        else:
-            keyword_data_source_type = dify_config.KEYWORD_DATA_SOURCE_TYPE
-            dataset_keyword_table = DatasetKeywordTable(
-                dataset_id=self.dataset.id,
-                keyword_table="",
-                data_source_type=keyword_data_source_type,
-            )
-            if keyword_data_source_type == "database":
-                dataset_keyword_table.keyword_table = json.dumps(
-                    {
-                        "__type__": "keyword_table",
-                        "__data__": {"index_id": self.dataset.id, "summary": None, "table": {}},
-                    },
-                    cls=SetEncoder,
-                )
-            db.session.add(dataset_keyword_table)
-            db.session.commit()
 
-        return {}
+    def _ensure_keyword_index(self) -> None:
+        """Make sure the keyword table of the dataset is stored in DatasetKeyword, migrating a legacy one."""
+        if self.dataset.id in _keyword_index_dataset_ids:
+            return
 
-    def _add_text_to_keyword_table(self, keyword_table: dict, id: str, keywords: list[str]) -> dict:
-        for keyword in keywords:
-            if keyword not in keyword_table:
-                keyword_table[keyword] = set()
-            keyword_table[keyword].add(id)
-        return keyword_table
+        dataset_keyword_table = self.dataset.dataset_keyword_table
+        if dataset_keyword_table and dataset_keyword_table.data_source_type == KEYWORD_INDEX_DATA_SOURCE_TYPE:
+            _keyword_index_dataset_ids.add(self.dataset.id)
+            return
 
-    def _delete_ids_from_keyword_table(self, keyword_table: dict, ids: list[str]) -> dict:
-        # get set of ids that correspond to node
-        node_idxs_to_delete = set(ids)
+        lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
+        with redis_client.lock(lock_name, timeout=600):
+            dataset_keyword_table = self.dataset.dataset_keyword_table
+            if dataset_keyword_table is None:
+                dataset_keyword_table = DatasetKeywordTable(
+                    dataset_id=self.dataset.id,
+                    keyword_table="",
+                    data_source_type=KEYWORD_INDEX_DATA_SOURCE_TYPE,
+                )
+                db.session.add(dataset_keyword_table)
+                db.session.commit()
+            elif dataset_keyword_table.data_source_type != KEYWORD_INDEX_DATA_SOURCE_TYPE:
+                self._migrate_legacy_keyword_table(dataset_keyword_table)
+
+        _keyword_index_dataset_ids.add(self.dataset.id)
+
+    def _migrate_legacy_keyword_table(self, dataset_keyword_table: DatasetKeywordTable) -> None:
+        legacy_data_source_type = dataset_keyword_table.data_source_type
+        keyword_table_dict = dataset_keyword_table.keyword_table_dict
+        keyword_table = dict(keyword_table_dict["__data__"]["table"]) if keyword_table_dict else {}
+
+        node_keyword_counts: dict[str, int] = defaultdict(int)
+        for node_ids in keyword_table.values():
+            for node_id in node_ids:
+                node_keyword_counts[node_id] += 1
+        self._insert_keyword_rows(
+            {"keyword": keyword, "index_node_id": node_id, "node_keyword_count": node_keyword_counts[node_id]}
+            for keyword, node_ids in keyword_table.items()
+            for node_id in node_ids
+        )
+        dataset_keyword_table.keyword_table = ""
+        dataset_keyword_table.data_source_type = KEYWORD_INDEX_DATA_SOURCE_TYPE
+        db.session.commit()
 
-        # delete node_idxs from keyword to node idxs mapping
-        keywords_to_delete = set()
-        for keyword, node_idxs in keyword_table.items():
-            if node_idxs_to_delete.intersection(node_idxs):
-                keyword_table[keyword] = node_idxs.difference(node_idxs_to_delete)
-                if not keyword_table[keyword]:
-                    keywords_to_delete.add(keyword)
+        if legacy_data_source_type != "database":
+            file_key = "keyword_files/" + self.dataset.tenant_id + "/" + self.dataset.id + ".txt"
+            if storage.exists(file_key):
+                storage.delete(file_key)
+        keyword_postings_cache.bump_version(self.dataset.id)
 
-        for keyword in keywords_to_delete:
-            del keyword_table[keyword]
+    def _add_keywords(self, node_keywords: dict[str, list[str]]) -> None:
+        self._insert_keyword_rows(
+            {"keyword": keyword, "index_node_id": node_id, "node_keyword_count": len(set(keywords))}
+            for node_id, keywords in node_keywords.items()
+            for keyword in set(keywords)
+        )
+        # nodes may already have had keywords, so count them again
+        node_ids = list(node_keywords)
+        for i in range(0, len(node_ids), _KEYWORD_INSERT_BATCH_SIZE):
+            self._update_node_keyword_counts(node_ids[i : i + _KEYWORD_INSERT_BATCH_SIZE])
+        db.session.commit()
+        keyword_postings_cache.bump_version(self.dataset.id)
+
+    def _update_node_keyword_counts(self, node_ids: list[str]) -> None:
+        node_keyword_counts = (
+            select(DatasetKeyword.index_node_id, func.count().label("keyword_count"))
+            .where(DatasetKeyword.dataset_id == self.dataset.id, DatasetKeyword.index_node_id.in_(node_ids))
+            .group_by(DatasetKeyword.index_node_id)
+            .subquery()
+        )
+        db.session.execute(
+            update(DatasetKeyword)
+            .where(
+                DatasetKeyword.dataset_id == self.dataset.id,
+                DatasetKeyword.index_node_id == node_keyword_counts.c.index_node_id,
+                DatasetKeyword.node_keyword_count != node_keyword_counts.c.keyword_count,
+            )
+            .values(node_keyword_count=node_keyword_counts.c.keyword_count)
+        )
 
-        return keyword_table
+    def _insert_keyword_rows(self, rows: Iterable[dict[str, Any]]) -> None:
+        batch: list[dict[str, Any]] = []
+        for row in rows:
+            batch.append({"dataset_id": self.dataset.id, **row})
+            if len(batch) >= _KEYWORD_INSERT_BATCH_SIZE:
+                self._insert_keyword_batch(batch)
+                batch = []
+        if batch:
+            self._insert_keyword_batch(batch)
+
+    @staticmethod
+    def _insert_keyword_batch(batch: list[dict[str, Any]]) -> None:
+        stmt = insert(DatasetKeyword).values(batch)
+        stmt = stmt.on_conflict_do_nothing(index_elements=["dataset_id", "keyword", "index_node_id"])
+        db.session.execute(stmt)
+
+    def _get_keyword_postings(self, keywords: list[str]) -> dict[str, Mapping[str, int]]:
+        """
+        Get the posting list of each keyword, leaving out keywords not in the index.
+
+        A posting list maps the ids of the nodes of the keyword to their number of keywords.
+        """
+        version = keyword_postings_cache.get_version(self.dataset.id)
+        postings, missing = keyword_postings_cache.get_many(self.dataset.id, version, keywords)
+        if missing:
+            loaded: dict[str, dict[str, int]] = {keyword: {} for keyword in missing}
+            stmt = select(
+                DatasetKeyword.keyword, DatasetKeyword.index_node_id, DatasetKeyword.node_keyword_count
+            ).where(DatasetKeyword.dataset_id == self.dataset.id, DatasetKeyword.keyword.in_(missing))
+            for keyword, node_id, node_keyword_count in db.session.execute(stmt):
+                loaded[keyword][node_id] = node_keyword_count
+            keyword_postings_cache.set_many(self.dataset.id, version, loaded)
+            postings.update(loaded)
+
+        return {keyword: node_ids for keyword, node_ids in postings.items() if node_ids}
+
+    def _get_index_stats(self) -> tuple[int, float]:
+        """
+        Get the number of nodes in the index and their average number of keywords.
+
+        They only scale the scores of the ranking and change slowly, so they are cached in Redis
+        for a few minutes instead of being kept exact.
+        """
+        cache_key = f"keyword_index_stats:{self.dataset.id}"
+        data = redis_client.get(cache_key)
+        if data:
+            try:
+                node_count, avg_node_length = json.loads(data)
+                return int(node_count), float(avg_node_length)
+            except (ValueError, TypeError):
+                pass
+
+        stmt = select(func.count(distinct(DatasetKeyword.index_node_id)), func.count()).where(
+            DatasetKeyword.dataset_id == self.dataset.id
+        )
+        node_count, keyword_count = db.session.execute(stmt).one()
+        avg_node_length = keyword_count / node_count if node_count else 0.0
+        redis_client.setex(cache_key, _INDEX_STATS_CACHE_TTL, json.dumps([node_count, avg_node_length]))
+        return node_count, avg_node_length
 
-    def _retrieve_ids_by_query(self, keyword_table: dict, query: str, k: int = 4):
+    def _retrieve_ids_by_query(self, query: str, k: int = 4):
         keyword_table_handler = JiebaKeywordTableHandler()
         keywords = keyword_table_handler.extract_keywords(query)
+        postings = self._get_keyword_postings(list(keywords))
+        if not postings:
+            return []
 
-        # go through text chunks in order of most matching keywords
-        chunk_indices_count: dict[str, int] = defaultdict(int)
-        keywords_list = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
-        for keyword in keywords_list:
-            for node_id in keyword_table[keyword]:
-                chunk_indices_count[node_id] += 1
-
-        sorted_chunk_indices = sorted(
-            chunk_indices_count.keys(),
-            key=lambda x: chunk_indices_count[x],
-            reverse=True,
-        )
-
-        return sorted_chunk_indices[:k]
+        node_count, avg_node_length = self._get_index_stats()
+        return bm25_top_k(postings, node_count, avg_node_length, k)
 
     def _update_segment_keywords(self, dataset_id: str, node_id: str, keywords: list[str]):
         document_segment = (
@@ -223,37 +324,25 @@ class Jieba(BaseKeyword):
             db.session.commit()
 
     def create_segment_keywords(self, node_id: str, keywords: list[str]):
-        keyword_table = self._get_dataset_keyword_table()
+        self._ensure_keyword_index()
         self._update_segment_keywords(self.dataset.id, node_id, keywords)
-        keyword_table = self._add_text_to_keyword_table(keyword_table or {}, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        self._add_keywords({node_id: keywords})
 
     def multi_create_segment_keywords(self, pre_segment_data_list: list):
+        self._ensure_keyword_index()
         keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = self._get_dataset_keyword_table()
+        node_keywords = {}
         for pre_segment_data in pre_segment_data_list:
             segment = pre_segment_data["segment"]
             if pre_segment_data["keywords"]:
                 segment.keywords = pre_segment_data["keywords"]
-                keyword_table = self._add_text_to_keyword_table(
-                    keyword_table or {}, segment.index_node_id, pre_segment_data["keywords"]
-                )
+                node_keywords[segment.index_node_id] = pre_segment_data["keywords"]
             else:
                 keywords = keyword_table_handler.extract_keywords(segment.content, self._config.max_keywords_per_chunk)
                 segment.keywords = list(keywords)
-                keyword_table = self._add_text_to_keyword_table(
-                    keyword_table or {}, segment.index_node_id, list(keywords)
-                )
-        self._save_dataset_keyword_table(keyword_table)
+                node_keywords[segment.index_node_id] = list(keywords)
+        self._add_keywords(node_keywords)
 
     def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._add_text_to_keyword_table(keyword_table or {}, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
-
-
-class SetEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return super().default(obj)
+        self._ensure_keyword_index()
+        self._add_keywords({node_id: keywords})
@@ -0,0 +1,74 @@
+import threading
+import uuid
+from collections.abc import Mapping
+
+from cachetools import LRUCache
+
+from configs import dify_config
+from extensions.ext_redis import redis_client
+
+
+class KeywordPostingsCache:
+    """
+    Process-local cache of the posting lists of dataset keyword indexes.
+
+    Posting lists map the ids of the nodes of a keyword to their number of keywords. They are
+    cached per dataset and keyword together with the version of the keyword index they were read
+    at. The version is a random token in Redis that is replaced after every change of the index,
+    so a cached posting list is used only as long as the index is unchanged.
+    The size of the cache is bounded by the total number of node ids it holds.
+    """
+
+    def __init__(self, max_postings: int) -> None:
+        self._cache: LRUCache = LRUCache(maxsize=max_postings, getsizeof=lambda entry: len(entry[1]) + 1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version_key(dataset_id: str) -> str:
+        return f"keyword_index_version:{dataset_id}"
+
+    def get_version(self, dataset_id: str) -> str:
+        key = self._version_key(dataset_id)
+        version = redis_client.get(key)
+        if version is None:
+            redis_client.setnx(key, uuid.uuid4().hex)
+            version = redis_client.get(key)
+        return version.decode() if isinstance(version, bytes) else str(version)
+
+    def bump_version(self, dataset_id: str) -> None:
+        redis_client.set(self._version_key(dataset_id), uuid.uuid4().hex)
+
+    def get_many(
+        self, dataset_id: str, version: str, keywords: list[str]
+    ) -> tuple[dict[str, Mapping[str, int]], list[str]]:
+        """
+        Get the cached posting lists of keywords.
+
+        :return: the cached posting lists by keyword, and the keywords that are not cached
+        """
+        postings: dict[str, Mapping[str, int]] = {}
+        missing: list[str] = []
+        with self._lock:
+            for keyword in keywords:
+                entry = self._cache.get((dataset_id, keyword))
+                if entry is not None and entry[0] == version:
+                    postings[keyword] = entry[1]
+                else:
+                    missing.append(keyword)
+        return postings, missing
+
+    def set_many(self, dataset_id: str, version: str, postings: Mapping[str, Mapping[str, int]]) -> None:
+        with self._lock:
+            for keyword, node_lengths in postings.items():
+                try:
+                    self._cache[(dataset_id, keyword)] = (version, node_lengths)
+                except ValueError:
+                    # the posting list alone is larger than the cache
+                    pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+keyword_postings_cache = KeywordPostingsCache(max_postings=dify_config.KEYWORD_INDEX_CACHE_MAX_POSTINGS)
@@ -3,11 +3,13 @@ from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from flask import Flask, current_app
+from sqlalchemy import or_
 from sqlalchemy.orm import load_only
 
 from configs import dify_config
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.keyword_factory import Keyword
+from core.rag.datasource.segment_cache import segment_cache
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.embedding.retrieval import RetrievalSegments
 from core.rag.entities.metadata_entities import MetadataCondition
@@ -298,6 +300,18 @@ class RetrievalService:
                 .all()
             }
 
+            # Resolve the segment of every retrieved chunk at once
+            chunk_keys: dict[tuple[str, str], bool] = {}
+            for document in documents:
+                dataset_document = dataset_documents.get(document.metadata.get("document_id"))
+                index_node_id = document.metadata.get("doc_id")
+                if not dataset_document or not index_node_id:
+                    continue
+                chunk_keys[(dataset_document.dataset_id, index_node_id)] = (
+                    dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX
+                )
+            hydrated_chunks = cls._hydrate_chunks(chunk_keys)
+
             records = []
             include_segment_ids = set()
             segment_child_map = {}
@@ -312,38 +326,19 @@ class RetrievalService:
                 if not dataset_document:
                     continue
 
+                index_node_id = document.metadata.get("doc_id")
+                if not index_node_id:
+                    continue
+                hydrated_chunk = hydrated_chunks.get((dataset_document.dataset_id, index_node_id))
+                if not hydrated_chunk:
+                    continue
+                segment, child_chunk = hydrated_chunk
+
                 if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
                     # Handle parent-child documents
-                    child_index_node_id = document.metadata.get("doc_id")
-
-                    child_chunk = (
-                        db.session.query(ChildChunk).filter(ChildChunk.index_node_id == child_index_node_id).first()
-                    )
-
                     if not child_chunk:
                         continue
 
-                    segment = (
-                        db.session.query(DocumentSegment)
-                        .filter(
-                            DocumentSegment.dataset_id == dataset_document.dataset_id,
-                            DocumentSegment.enabled == True,
-                            DocumentSegment.status == "completed",
-                            DocumentSegment.id == child_chunk.segment_id,
-                        )
-                        .options(
-                            load_only(
-                                DocumentSegment.id,
-                                DocumentSegment.content,
-                                DocumentSegment.answer,
-                            )
-                        )
-                        .first()
-                    )
-
-                    if not segment:
-                        continue
-
                     if segment.id not in include_segment_ids:
                         include_segment_ids.add(segment.id)
                         child_chunk_detail = {
@@ -374,24 +369,6 @@ class RetrievalService:
                         )
                 else:
                     # Handle normal documents
-                    index_node_id = document.metadata.get("doc_id")
-                    if not index_node_id:
-                        continue
-
-                    segment = (
-                        db.session.query(DocumentSegment)
-                        .filter(
-                            DocumentSegment.dataset_id == dataset_document.dataset_id,
-                            DocumentSegment.enabled == True,
-                            DocumentSegment.status == "completed",
-                            DocumentSegment.index_node_id == index_node_id,
-                        )
-                        .first()
-                    )
-
-                    if not segment:
-                        continue
-
                     include_segment_ids.add(segment.id)
                     record = {
                         "segment": segment,
@@ -431,3 +408,68 @@ class RetrievalService:
         except Exception as e:
             db.session.rollback()
             raise e
+
+    @classmethod
+    def _hydrate_chunks(
+        cls, chunk_keys: dict[tuple[str, str], bool]
+    ) -> dict[tuple[str, str], tuple[DocumentSegment, Optional[ChildChunk]]]:
+        """
+        Load the segments of retrieved chunks with one query for child chunks and one for segments.
+
+        :param chunk_keys: whether the chunk is a child chunk, by (dataset_id, index_node_id) of the chunk
+        :return: the segment and, for child chunks, the child chunk, by (dataset_id, index_node_id) of the chunk
+        """
+        hydrated_chunks = segment_cache.get_many(list(chunk_keys))
+        missing_keys = [key for key in chunk_keys if key not in hydrated_chunks]
+        if not missing_keys:
+            return hydrated_chunks
+
+        child_chunks: dict[str, ChildChunk] = {}
+        child_index_node_ids = {key[1] for key in missing_keys if chunk_keys[key]}
+        if child_index_node_ids:
+            for child_chunk in (
+                db.session.query(ChildChunk).filter(ChildChunk.index_node_id.in_(child_index_node_ids)).all()
+            ):
+                child_chunks.setdefault(child_chunk.index_node_id, child_chunk)
+
+        segment_ids = {child_chunk.segment_id for child_chunk in child_chunks.values()}
+        index_node_ids = {key[1] for key in missing_keys if not chunk_keys[key]}
+        segment_conditions = []
+        if segment_ids:
+            segment_conditions.append(DocumentSegment.id.in_(segment_ids))
+        if index_node_ids:
+            segment_conditions.append(DocumentSegment.index_node_id.in_(index_node_ids))
+        if not segment_conditions:
+            return hydrated_chunks
+
+        segments_by_id: dict[str, DocumentSegment] = {}
+        segments_by_index_node_id: dict[tuple[str, str], DocumentSegment] = {}
+        for segment in (
+            db.session.query(DocumentSegment)
+            .filter(
+                DocumentSegment.dataset_id.in_({dataset_id for dataset_id, _ in missing_keys}),
+                DocumentSegment.enabled == True,
+                DocumentSegment.status == "completed",
+                or_(*segment_conditions),
+            )
+            .all()
+        ):
+            segments_by_id[segment.id] = segment
+            segments_by_index_node_id.setdefault((segment.dataset_id, segment.index_node_id), segment)
+
+        loaded_chunks: dict[tuple[str, str], tuple[DocumentSegment, Optional[ChildChunk]]] = {}
+        for key in missing_keys:
+            dataset_id, index_node_id = key
+            if chunk_keys[key]:
+                loaded_child_chunk = child_chunks.get(index_node_id)
+                parent_segment = segments_by_id.get(loaded_child_chunk.segment_id) if loaded_child_chunk else None
+                if loaded_child_chunk and parent_segment and parent_segment.dataset_id == dataset_id:
+                    loaded_chunks[key] = (parent_segment, loaded_child_chunk)
+            else:
+                loaded_segment = segments_by_index_node_id.get(key)
+                if loaded_segment:
+                    loaded_chunks[key] = (loaded_segment, None)
+
+        segment_cache.set_many(loaded_chunks)
+        hydrated_chunks.update(loaded_chunks)
+        return hydrated_chunks
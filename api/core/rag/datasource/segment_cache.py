@@ -0,0 +1,75 @@
+import threading
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from sqlalchemy.orm import make_transient_to_detached
+
+from configs import dify_config
+from models.dataset import ChildChunk, DocumentSegment
+
+
+class SegmentCache:
+    """
+    Process-local cache of the segments of retrieved chunks.
+
+    Entries are keyed by (dataset_id, index_node_id) of a retrieved chunk and hold the columns of
+    its segment and, for parent-child indexes, of its child chunk. A hit is returned as detached
+    instances, so hot chunks are hydrated without querying the database.
+    """
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        self._local_cache: Optional[TTLCache] = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._local_cache is not None
+
+    def get_many(
+        self, keys: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], tuple[DocumentSegment, Optional[ChildChunk]]]:
+        if self._local_cache is None or not keys:
+            return {}
+        with self._lock:
+            entries = {key: self._local_cache.get(key) for key in keys}
+
+        result = {}
+        for key, entry in entries.items():
+            if entry is None:
+                continue
+            segment_row, child_chunk_row = entry
+            child_chunk = self._to_instance(ChildChunk, child_chunk_row) if child_chunk_row is not None else None
+            result[key] = (self._to_instance(DocumentSegment, segment_row), child_chunk)
+        return result
+
+    def set_many(self, hits: dict[tuple[str, str], tuple[DocumentSegment, Optional[ChildChunk]]]) -> None:
+        if self._local_cache is None or not hits:
+            return
+        entries = {
+            key: (self._to_row(segment), self._to_row(child_chunk) if child_chunk is not None else None)
+            for key, (segment, child_chunk) in hits.items()
+        }
+        with self._lock:
+            self._local_cache.update(entries)
+
+    def clear(self) -> None:
+        if self._local_cache is not None:
+            with self._lock:
+                self._local_cache.clear()
+
+    @staticmethod
+    def _to_row(instance: DocumentSegment | ChildChunk) -> dict[str, Any]:
+        return {column.key: getattr(instance, column.key) for column in instance.__table__.columns}
+
+    @staticmethod
+    def _to_instance(model: type[DocumentSegment] | type[ChildChunk], row: dict[str, Any]) -> Any:
+        # every entry gets its own instance, so callers cannot change the cached columns
+        instance = model(**row)
+        make_transient_to_detached(instance)
+        return instance
+
+
+segment_cache = SegmentCache(
+    maxsize=dify_config.RETRIEVAL_SEGMENT_CACHE_MAX_SIZE,
+    ttl=dify_config.RETRIEVAL_SEGMENT_CACHE_TTL,
+)
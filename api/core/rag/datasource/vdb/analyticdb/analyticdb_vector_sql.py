@@ -4,9 +4,9 @@ from contextlib import contextmanager
 from typing import Any
 
 import psycopg2.extras  # type: ignore
-import psycopg2.pool  # type: ignore
 from pydantic import BaseModel, model_validator
 
+from core.rag.datasource.vdb.connection_pool import get_connection_pool
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 
@@ -63,7 +63,7 @@ class AnalyticdbVectorBySql:
             redis_client.set(database_exist_cache_key, 1, ex=3600)
 
     def _create_connection_pool(self):
-        return psycopg2.pool.SimpleConnectionPool(
+        return get_connection_pool(
             self.config.min_connection,
             self.config.max_connection,
             host=self.config.host,
@@ -77,12 +77,14 @@ class AnalyticdbVectorBySql:
     def _get_cursor(self):
         assert self.pool is not None, "Connection pool is not initialized"
         conn = self.pool.getconn()
-        cur = conn.cursor()
         try:
-            yield cur
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+                conn.commit()
         finally:
-            cur.close()
-            conn.commit()
             self.pool.putconn(conn)
 
     def _initialize_vector_database(self) -> None:
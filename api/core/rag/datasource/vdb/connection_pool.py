@@ -0,0 +1,54 @@
+import threading
+from typing import Any
+
+import psycopg2.pool  # type: ignore
+
+# seconds to wait for a free connection before giving up
+ACQUIRE_TIMEOUT = 30
+
+
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    Thread-safe psycopg2 connection pool that waits up to `timeout` seconds for a free connection
+    when all of its connections are in use, and then raises PoolError.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args: Any, timeout: float = ACQUIRE_TIMEOUT, **kwargs: Any) -> None:
+        self._semaphore = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._semaphore.acquire(timeout=self._timeout):
+            raise psycopg2.pool.PoolError(f"no connection became available within {self._timeout} seconds")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._semaphore.release()
+
+
+_pools: dict[tuple, BlockingConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(min_connection: int, max_connection: int, **connect_kwargs: Any) -> BlockingConnectionPool:
+    """
+    Get the connection pool of a PostgreSQL compatible vector store.
+
+    One pool is created per process and connection settings, and shared by all vector processors
+    connecting with them, so the number of connections of a process is bounded by max_connection.
+    """
+    key = (min_connection, max_connection, *sorted(connect_kwargs.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = BlockingConnectionPool(min_connection, max_connection, **connect_kwargs)
+            _pools[key] = pool
+        return pool
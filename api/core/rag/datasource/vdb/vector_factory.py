@@ -5,6 +5,7 @@ from configs import dify_config
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_processor_cache import vector_processor_cache
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.embedding.embedding_base import Embeddings
@@ -53,7 +54,21 @@ class Vector:
             raise ValueError("Vector store must be specified.")
 
         vector_factory_cls = self.get_vector_factory(vector_type)
-        return vector_factory_cls().init_vector(self._dataset, self._attributes, self._embeddings)
+        if not self._dataset.index_struct_dict:
+            # the factory assigns the index struct of the dataset, so its processor is cached once it is stored
+            return vector_factory_cls().init_vector(self._dataset, self._attributes, self._embeddings)
+
+        settings = (
+            self._dataset.index_struct,
+            self._dataset.embedding_model_provider,
+            self._dataset.embedding_model,
+            tuple(self._attributes),
+        )
+        return vector_processor_cache.get_or_create(
+            self._dataset.id,
+            settings,
+            lambda: vector_factory_cls().init_vector(self._dataset, self._attributes, self._embeddings),
+        )
 
     @staticmethod
     def get_vector_factory(vector_type: str) -> type[AbstractVectorFactory]:
@@ -201,6 +216,7 @@ class Vector:
 
     def delete(self) -> None:
         self._vector_processor.delete()
+        vector_processor_cache.invalidate(self._dataset.id)
         # delete collection redis cache
         if self._vector_processor.collection_name:
             collection_exist_cache_key = "vector_indexing_{}".format(self._vector_processor.collection_name)
@@ -0,0 +1,61 @@
+import threading
+from collections.abc import Callable, Hashable
+from typing import Optional, cast
+
+from cachetools import TTLCache
+
+from configs import dify_config
+from core.rag.datasource.vdb.vector_base import BaseVector
+
+
+class VectorProcessorCache:
+    """
+    Process-local cache of the vector processors of datasets.
+
+    Initializing a vector processor creates a client of the vector store and may check or create
+    its collection. Processors are cached per dataset together with the index struct, embedding
+    model and attributes they were initialized with, so a dataset whose index struct or embedding
+    model changed gets a new processor in every process. Every use of a processor restarts its
+    TTL, so only processors that were not used for the idle TTL are evicted.
+    """
+
+    def __init__(self, maxsize: int, idle_ttl: int) -> None:
+        self._cache: Optional[TTLCache] = TTLCache(maxsize=maxsize, ttl=idle_ttl) if idle_ttl > 0 else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache is not None
+
+    def get_or_create(self, dataset_id: str, settings: Hashable, create: Callable[[], BaseVector]) -> BaseVector:
+        if self._cache is None:
+            return create()
+        key = (dataset_id, settings)
+        with self._lock:
+            processor: Optional[BaseVector] = self._cache.get(key)
+            if processor is not None:
+                self._cache[key] = processor
+                return processor
+        # initialized outside of the lock, as it may call the vector store
+        processor = create()
+        with self._lock:
+            return cast(BaseVector, self._cache.setdefault(key, processor))
+
+    def invalidate(self, dataset_id: str) -> None:
+        """Drop the processors of the dataset cached by this process."""
+        if self._cache is None:
+            return
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == dataset_id]:
+                self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        if self._cache is not None:
+            with self._lock:
+                self._cache.clear()
+
+
+vector_processor_cache = VectorProcessorCache(
+    maxsize=dify_config.VECTOR_PROCESSOR_CACHE_MAX_SIZE,
+    idle_ttl=dify_config.VECTOR_PROCESSOR_CACHE_IDLE_TTL,
+)
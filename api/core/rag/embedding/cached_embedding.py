@@ -1,9 +1,8 @@
-import base64
 import logging
 from typing import Any, Optional, cast
 
 import numpy as np
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
 
 from configs import dify_config
 from core.entities.embedding_type import EmbeddingInputType
@@ -11,13 +10,16 @@ from core.model_manager import ModelInstance
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.rag.embedding.embedding_base import Embeddings
+from core.rag.embedding.query_embedding_cache import query_embedding_cache
 from extensions.ext_database import db
-from extensions.ext_redis import redis_client
 from libs import helper
 from models.dataset import Embedding
 
 logger = logging.getLogger(__name__)
 
+# Upper bound of hashes per lookup query / rows per insert statement when accessing the embedding cache.
+EMBEDDING_CACHE_BATCH_SIZE = 1000
+
 
 class CacheEmbedding(Embeddings):
     def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
@@ -28,18 +30,13 @@ class CacheEmbedding(Embeddings):
         """Embed search docs in batches of 10."""
         # use doc embedding cache or store if not exists
         text_embeddings: list[Any] = [None for _ in range(len(texts))]
+        text_hashes = [helper.generate_text_hash(text) for text in texts]
+        cached_embeddings = self._load_cached_embeddings(text_hashes)
         embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = (
-                db.session.query(Embedding)
-                .filter_by(
-                    model_name=self._model_instance.model, hash=hash, provider_name=self._model_instance.provider
-                )
-                .first()
-            )
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
+        for i, hash in enumerate(text_hashes):
+            cached_embedding = cached_embeddings.get(hash)
+            if cached_embedding is not None:
+                text_embeddings[i] = cached_embedding
             else:
                 embedding_queue_indices.append(i)
         if embedding_queue_indices:
@@ -72,27 +69,13 @@ class CacheEmbedding(Embeddings):
                                 logger.warning(f"Normalized embedding is nan: {normalized_embedding}")
                                 continue
                             embedding_queue_embeddings.append(normalized_embedding)
-                        except IntegrityError:
-                            db.session.rollback()
                         except Exception:
                             logging.exception("Failed transform embedding")
-                cache_embeddings = []
-                try:
-                    for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
-                        text_embeddings[i] = n_embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(
-                                model_name=self._model_instance.model,
-                                hash=hash,
-                                provider_name=self._model_instance.provider,
-                            )
-                            embedding_cache.set_embedding(n_embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
+                new_embeddings: dict[str, list[float]] = {}
+                for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
+                    text_embeddings[i] = n_embedding
+                    new_embeddings.setdefault(text_hashes[i], n_embedding)
+                self._save_cached_embeddings(new_embeddings)
             except Exception as ex:
                 db.session.rollback()
                 logger.exception("Failed to embed documents: %s")
@@ -100,16 +83,69 @@ class CacheEmbedding(Embeddings):
 
         return text_embeddings
 
+    def _load_cached_embeddings(self, hashes: list[str]) -> dict[str, list[float]]:
+        """
+        Fetch cached document embeddings for the given text hashes.
+
+        Lookups are issued as one ``IN (...)`` query per chunk of
+        ``EMBEDDING_CACHE_BATCH_SIZE`` distinct hashes instead of one query per text.
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        cached_embeddings: dict[str, list[float]] = {}
+        for i in range(0, len(unique_hashes), EMBEDDING_CACHE_BATCH_SIZE):
+            batch_hashes = unique_hashes[i : i + EMBEDDING_CACHE_BATCH_SIZE]
+            embeddings = (
+                db.session.query(Embedding)
+                .filter(
+                    Embedding.model_name == self._model_instance.model,
+                    Embedding.provider_name == self._model_instance.provider,
+                    Embedding.hash.in_(batch_hashes),
+                )
+                .all()
+            )
+            for embedding in embeddings:
+                cached_embeddings[embedding.hash] = embedding.get_embedding()
+        return cached_embeddings
+
+    def _save_cached_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        """
+        Write newly computed document embeddings back to the cache.
+
+        Rows are inserted in bulk with ``ON CONFLICT DO NOTHING`` so that entries written
+        concurrently by another worker are skipped instead of aborting the whole batch.
+        """
+        if not embeddings:
+            return
+        values = []
+        for hash, embedding_data in embeddings.items():
+            embedding_cache = Embedding(
+                model_name=self._model_instance.model,
+                hash=hash,
+                provider_name=self._model_instance.provider,
+            )
+            embedding_cache.set_embedding(embedding_data)
+            values.append(
+                {
+                    "model_name": embedding_cache.model_name,
+                    "hash": embedding_cache.hash,
+                    "provider_name": embedding_cache.provider_name,
+                    "embedding": embedding_cache.embedding,
+                }
+            )
+        for i in range(0, len(values), EMBEDDING_CACHE_BATCH_SIZE):
+            stmt = insert(Embedding).values(values[i : i + EMBEDDING_CACHE_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_nothing(index_elements=["model_name", "hash", "provider_name"])
+            db.session.execute(stmt)
+        db.session.commit()
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
-        # use doc embedding cache or store if not exists
+        # use query embedding cache or store if not exists
         hash = helper.generate_text_hash(text)
-        embedding_cache_key = f"{self._model_instance.provider}_{self._model_instance.model}_{hash}"
-        embedding = redis_client.get(embedding_cache_key)
-        if embedding:
-            redis_client.expire(embedding_cache_key, 600)
-            decoded_embedding = np.frombuffer(base64.b64decode(embedding), dtype="float")
-            return [float(x) for x in decoded_embedding]
+        provider, model = self._model_instance.provider, self._model_instance.model
+        cached_embedding = query_embedding_cache.get(provider, model, hash)
+        if cached_embedding is not None:
+            return cast(list[float], cached_embedding.tolist())
         try:
             embedding_result = self._model_instance.invoke_text_embedding(
                 texts=[text], user=self._user, input_type=EmbeddingInputType.QUERY
@@ -126,14 +162,7 @@ class CacheEmbedding(Embeddings):
             raise ex
 
         try:
-            # encode embedding to base64
-            embedding_vector = np.array(embedding_results)
-            vector_bytes = embedding_vector.tobytes()
-            # Transform to Base64
-            encoded_vector = base64.b64encode(vector_bytes)
-            # Transform to string
-            encoded_str = encoded_vector.decode("utf-8")
-            redis_client.setex(embedding_cache_key, 600, encoded_str)
+            query_embedding_cache.set(provider, model, hash, embedding_results)
         except Exception as ex:
             if dify_config.DEBUG:
                 logging.exception(f"Failed to add embedding to redis for the text '{text[:10]}...({len(text)} chars)'")
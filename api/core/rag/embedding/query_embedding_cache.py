@@ -0,0 +1,100 @@
+import threading
+from typing import Optional
+
+import numpy as np
+from cachetools import TTLCache
+
+from configs import dify_config
+from extensions.ext_redis import redis_client
+
+# Query embeddings are cached as raw float64 bytes, the precision they are returned in.
+_EMBEDDING_DTYPE = np.dtype("<f8")
+
+
+class QueryEmbeddingCache:
+    """
+    Two-level cache of query embeddings.
+
+    L1 is a process-local TTL cache bounded by the total size of the cached vectors in bytes,
+    L2 is Redis. Both levels store the raw vector bytes, so a hit needs neither base64 decoding
+    nor per-element conversion, and an L1 hit does not touch Redis at all.
+    """
+
+    def __init__(self, max_bytes: int, ttl: int) -> None:
+        self._ttl = ttl
+        self._local_cache: Optional[TTLCache] = (
+            TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=len) if max_bytes > 0 else None
+        )
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cache_key(provider: str, model: str, text_hash: str) -> str:
+        return f"query_embedding:{provider}:{model}:{text_hash}"
+
+    def get(self, provider: str, model: str, text_hash: str) -> Optional[np.ndarray]:
+        key = self._cache_key(provider, model, text_hash)
+        if self._local_cache is not None:
+            with self._lock:
+                data = self._local_cache.get(key)
+            if data is not None:
+                self.local_hits += 1
+                return np.frombuffer(data, dtype=_EMBEDDING_DTYPE)
+
+        # fetch the vector and refresh its expiration in a single round trip
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.get(key)
+        pipeline.expire(key, self._ttl)
+        data, _ = pipeline.execute()
+        if not data:
+            self.misses += 1
+            return None
+
+        self.redis_hits += 1
+        self._set_local(key, data)
+        return np.frombuffer(data, dtype=_EMBEDDING_DTYPE)
+
+    def set(self, provider: str, model: str, text_hash: str, embedding: list[float]) -> None:
+        key = self._cache_key(provider, model, text_hash)
+        data = np.asarray(embedding, dtype=_EMBEDDING_DTYPE).tobytes()
+        redis_client.setex(key, self._ttl, data)
+        self._set_local(key, data)
+
+    def _set_local(self, key: str, data: bytes) -> None:
+        if self._local_cache is None:
+            return
+        with self._lock:
+            try:
+                self._local_cache[key] = data
+            except ValueError:
+                # the vector alone exceeds the byte budget of the cache
+                pass
+
+    def clear(self) -> None:
+        """Drop all locally cached embeddings, Redis entries are left to expire."""
+        if self._local_cache is not None:
+            with self._lock:
+                self._local_cache.clear()
+
+    def stats(self) -> dict[str, int]:
+        local_size = 0
+        local_bytes = 0
+        if self._local_cache is not None:
+            with self._lock:
+                local_size = len(self._local_cache)
+                local_bytes = int(self._local_cache.currsize)
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_size": local_size,
+            "local_bytes": local_bytes,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_bytes=dify_config.QUERY_EMBEDDING_CACHE_MAX_BYTES,
+    ttl=dify_config.QUERY_EMBEDDING_CACHE_TTL,
+)
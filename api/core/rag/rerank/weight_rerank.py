@@ -1,8 +1,10 @@
-import math
+import threading
 from collections import Counter
-from typing import Optional
+from collections.abc import Iterable, Sequence
+from typing import Optional, cast
 
 import numpy as np
+from cachetools import LRUCache
 
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
@@ -11,6 +13,13 @@ from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.models.document import Document
 from core.rag.rerank.entity.weight import VectorSetting, Weights
 from core.rag.rerank.rerank_base import BaseRerankRunner
+from extensions.ext_database import db
+from libs import helper
+from models.dataset import DocumentSegment
+
+# Keywords extracted from the contents of documents without stored segment keywords, keyed by content hash.
+_document_keywords_cache: LRUCache = LRUCache(maxsize=10000)
+_document_keywords_cache_lock = threading.Lock()
 
 
 class WeightRerankRunner(BaseRerankRunner):
@@ -73,72 +82,107 @@ class WeightRerankRunner(BaseRerankRunner):
         """
         keyword_table_handler = JiebaKeywordTableHandler()
         query_keywords = keyword_table_handler.extract_keywords(query, None)
+        segments_keywords = self._get_segments_keywords(documents)
         documents_keywords = []
         for document in documents:
-            # get the document keywords
-            document_keywords = keyword_table_handler.extract_keywords(document.page_content, None)
             if document.metadata is not None:
+                # get the document keywords, preferring the ones stored for the segment at indexing time
+                document_keywords = segments_keywords.get(document.metadata.get("doc_id", ""))
+                if not document_keywords:
+                    document_keywords = self._extract_document_keywords(keyword_table_handler, document.page_content)
                 document.metadata["keywords"] = document_keywords
                 documents_keywords.append(document_keywords)
 
-        # Counter query keywords(TF)
-        query_keyword_counts = Counter(query_keywords)
-
-        # total documents
-        total_documents = len(documents)
-
-        # calculate all documents' keywords IDF
-        all_keywords = set()
-        for document_keywords in documents_keywords:
-            all_keywords.update(document_keywords)
-
-        keyword_idf = {}
-        for keyword in all_keywords:
-            # calculate include query keywords' documents
-            doc_count_containing_keyword = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
-            # IDF
-            keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
-
-        query_tfidf = {}
-
-        for keyword, count in query_keyword_counts.items():
-            tf = count
-            idf = keyword_idf.get(keyword, 0)
-            query_tfidf[keyword] = tf * idf
-
-        # calculate all documents' TF-IDF
-        documents_tfidf = []
-        for document_keywords in documents_keywords:
-            document_keyword_counts = Counter(document_keywords)
-            document_tfidf = {}
-            for keyword, count in document_keyword_counts.items():
-                tf = count
-                idf = keyword_idf.get(keyword, 0)
-                document_tfidf[keyword] = tf * idf
-            documents_tfidf.append(document_tfidf)
-
-        def cosine_similarity(vec1, vec2):
-            intersection = set(vec1.keys()) & set(vec2.keys())
-            numerator = sum(vec1[x] * vec2[x] for x in intersection)
-
-            sum1 = sum(vec1[x] ** 2 for x in vec1)
-            sum2 = sum(vec2[x] ** 2 for x in vec2)
-            denominator = math.sqrt(sum1) * math.sqrt(sum2)
-
-            if not denominator:
-                return 0.0
-            else:
-                return float(numerator) / denominator
+        return self._calculate_tfidf_similarities(query_keywords, documents_keywords)
 
-        similarities = []
-        for document_tfidf in documents_tfidf:
-            similarity = cosine_similarity(query_tfidf, document_tfidf)
-            similarities.append(similarity)
+    @staticmethod
+    def _get_segments_keywords(documents: list[Document]) -> dict[str, set[str]]:
+        """
+        Get the keywords stored at indexing time for the segments of the documents
+        :param documents: documents for reranking
 
-        # for idx, similarity in enumerate(similarities):
-        #     print(f"Document {idx + 1} similarity: {similarity}")
+        :return: keywords by segment index node id
+        """
+        index_node_ids = [
+            document.metadata["doc_id"]
+            for document in documents
+            if document.metadata and document.metadata.get("doc_id")
+        ]
+        if not index_node_ids:
+            return {}
+        dataset_ids = {
+            document.metadata["dataset_id"]
+            for document in documents
+            if document.metadata and document.metadata.get("dataset_id")
+        }
+        query = db.session.query(DocumentSegment.index_node_id, DocumentSegment.keywords).filter(
+            DocumentSegment.index_node_id.in_(index_node_ids)
+        )
+        if dataset_ids:
+            query = query.filter(DocumentSegment.dataset_id.in_(dataset_ids))
+        return {index_node_id: set(keywords) for index_node_id, keywords in query.all() if keywords}
 
-        return similarities
+    @staticmethod
+    def _extract_document_keywords(keyword_table_handler: JiebaKeywordTableHandler, content: str) -> set[str]:
+        """
+        Extract the keywords of a document content, reusing keywords extracted for the same content before
+        :param keyword_table_handler: jieba keyword table handler
+        :param content: document content
+
+        :return:
+        """
+        content_hash = helper.generate_text_hash(content)
+        with _document_keywords_cache_lock:
+            document_keywords = _document_keywords_cache.get(content_hash)
+        if document_keywords is None:
+            document_keywords = keyword_table_handler.extract_keywords(content, None)
+            with _document_keywords_cache_lock:
+                _document_keywords_cache[content_hash] = document_keywords
+        return cast(set[str], document_keywords)
+
+    @staticmethod
+    def _calculate_tfidf_similarities(
+        query_keywords: Iterable[str], documents_keywords: Sequence[Iterable[str]]
+    ) -> list[float]:
+        """
+        Calculate TF-IDF cosine similarities between the query and every document in bulk
+        :param query_keywords: query keywords
+        :param documents_keywords: keywords of each document
+
+        :return:
+        """
+        total_documents = len(documents_keywords)
+        if not total_documents:
+            return []
+
+        # build the term-document count matrix in one pass, indexing keywords as they appear
+        vocabulary: dict[str, int] = {}
+        rows: list[int] = []
+        columns: list[int] = []
+        counts: list[int] = []
+        for row, document_keywords in enumerate(documents_keywords):
+            for keyword, count in Counter(document_keywords).items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(keyword, len(vocabulary)))
+                counts.append(count)
+        term_frequencies = np.zeros((total_documents, len(vocabulary)), dtype=np.float64)
+        term_frequencies[rows, columns] = counts
+
+        # IDF of all documents' keywords, keywords that only occur in the query have an IDF of 0
+        document_frequencies = np.count_nonzero(term_frequencies, axis=0)
+        keyword_idf = np.log((1 + total_documents) / (1 + document_frequencies)) + 1
+
+        query_tfidf = np.zeros(len(vocabulary), dtype=np.float64)
+        for keyword, count in Counter(query_keywords).items():
+            index = vocabulary.get(keyword)
+            if index is not None:
+                query_tfidf[index] = count * keyword_idf[index]
+
+        documents_tfidf = term_frequencies * keyword_idf
+        numerators = documents_tfidf @ query_tfidf
+        denominators = np.linalg.norm(documents_tfidf, axis=1) * np.linalg.norm(query_tfidf)
+        similarities = np.divide(numerators, denominators, out=np.zeros_like(numerators), where=denominators != 0)
+        return cast(list[float], similarities.tolist())
 
     def _calculate_cosine(
         self, tenant_id: str, query: str, documents: list[Document], vector_setting: VectorSetting
@@ -150,7 +194,7 @@ class WeightRerankRunner(BaseRerankRunner):
 
         :return:
         """
-        query_vector_scores = []
+        query_vector_scores: list[float] = [0.0] * len(documents)
 
         model_manager = ModelManager()
 
@@ -162,24 +206,22 @@ class WeightRerankRunner(BaseRerankRunner):
         )
         cache_embedding = CacheEmbedding(embedding_model)
         query_vector = cache_embedding.embed_query(query)
-        for document in documents:
-            # calculate cosine similarity
+
+        vector_indices = []
+        for index, document in enumerate(documents):
             if document.metadata and "score" in document.metadata:
-                query_vector_scores.append(document.metadata["score"])
+                query_vector_scores[index] = document.metadata["score"]
             else:
-                # transform to NumPy
-                vec1 = np.array(query_vector)
-                vec2 = np.array(document.vector)
-
-                # calculate dot product
-                dot_product = np.dot(vec1, vec2)
-
-                # calculate norm
-                norm_vec1 = np.linalg.norm(vec1)
-                norm_vec2 = np.linalg.norm(vec2)
-
-                # calculate cosine similarity
-                cosine_sim = dot_product / (norm_vec1 * norm_vec2)
-                query_vector_scores.append(cosine_sim)
+                vector_indices.append(index)
+
+        if vector_indices:
+            # stack the document vectors into one matrix and compute all cosine similarities at once
+            document_vectors = np.array([documents[index].vector for index in vector_indices], dtype=np.float64)
+            query_array = np.asarray(query_vector, dtype=np.float64)
+            cosine_similarities = (document_vectors @ query_array) / (
+                np.linalg.norm(document_vectors, axis=1) * np.linalg.norm(query_array)
+            )
+            for index, cosine_similarity in zip(vector_indices, cosine_similarities.tolist()):
+                query_vector_scores[index] = cosine_similarity
 
         return query_vector_scores
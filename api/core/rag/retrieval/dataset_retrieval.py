@@ -10,6 +10,7 @@ from flask import Flask, current_app
 from sqlalchemy import Float, and_, or_, text
 from sqlalchemy import cast as sqlalchemy_cast
 
+from configs import dify_config
 from core.app.app_config.entities import (
     DatasetEntity,
     DatasetRetrieveConfigEntity,
@@ -41,6 +42,7 @@ from core.rag.entities.metadata_entities import Condition, MetadataCondition
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.models.document import Document
 from core.rag.rerank.rerank_type import RerankMode
+from core.rag.retrieval.retrieval_analytics import RetrievalAnalytics
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from core.rag.retrieval.router.multi_dataset_function_call_router import FunctionCallMultiDatasetRouter
 from core.rag.retrieval.router.multi_dataset_react_route import ReactMultiDatasetRouter
@@ -511,49 +513,52 @@ class DatasetRetrieval:
     ) -> None:
         """Handle retrieval end."""
         dify_documents = [document for document in documents if document.provider == "dify"]
-        for document in dify_documents:
-            if document.metadata is not None:
-                dataset_document = (
-                    db.session.query(DatasetDocument)
-                    .filter(DatasetDocument.id == document.metadata["document_id"])
-                    .first()
-                )
-                if dataset_document:
-                    if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
-                        child_chunk = (
-                            db.session.query(ChildChunk)
-                            .filter(
-                                ChildChunk.index_node_id == document.metadata["doc_id"],
-                                ChildChunk.dataset_id == dataset_document.dataset_id,
-                                ChildChunk.document_id == dataset_document.id,
+        if dify_config.RETRIEVAL_ANALYTICS_ASYNC_ENABLED:
+            RetrievalAnalytics.record_hits(dify_documents)
+        else:
+            for document in dify_documents:
+                if document.metadata is not None:
+                    dataset_document = (
+                        db.session.query(DatasetDocument)
+                        .filter(DatasetDocument.id == document.metadata["document_id"])
+                        .first()
+                    )
+                    if dataset_document:
+                        if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
+                            child_chunk = (
+                                db.session.query(ChildChunk)
+                                .filter(
+                                    ChildChunk.index_node_id == document.metadata["doc_id"],
+                                    ChildChunk.dataset_id == dataset_document.dataset_id,
+                                    ChildChunk.document_id == dataset_document.id,
+                                )
+                                .first()
                             )
-                            .first()
-                        )
-                        if child_chunk:
-                            segment = (
-                                db.session.query(DocumentSegment)
-                                .filter(DocumentSegment.id == child_chunk.segment_id)
-                                .update(
-                                    {DocumentSegment.hit_count: DocumentSegment.hit_count + 1},
-                                    synchronize_session=False,
+                            if child_chunk:
+                                segment = (
+                                    db.session.query(DocumentSegment)
+                                    .filter(DocumentSegment.id == child_chunk.segment_id)
+                                    .update(
+                                        {DocumentSegment.hit_count: DocumentSegment.hit_count + 1},
+                                        synchronize_session=False,
+                                    )
                                 )
+                                db.session.commit()
+                        else:
+                            query = db.session.query(DocumentSegment).filter(
+                                DocumentSegment.index_node_id == document.metadata["doc_id"]
                             )
-                            db.session.commit()
-                    else:
-                        query = db.session.query(DocumentSegment).filter(
-                            DocumentSegment.index_node_id == document.metadata["doc_id"]
-                        )
 
-                        # if 'dataset_id' in document.metadata:
-                        if "dataset_id" in document.metadata:
-                            query = query.filter(DocumentSegment.dataset_id == document.metadata["dataset_id"])
+                            # if 'dataset_id' in document.metadata:
+                            if "dataset_id" in document.metadata:
+                                query = query.filter(DocumentSegment.dataset_id == document.metadata["dataset_id"])
 
-                        # add hit count to document segment
-                        query.update(
-                            {DocumentSegment.hit_count: DocumentSegment.hit_count + 1}, synchronize_session=False
-                        )
+                            # add hit count to document segment
+                            query.update(
+                                {DocumentSegment.hit_count: DocumentSegment.hit_count + 1}, synchronize_session=False
+                            )
 
-                    db.session.commit()
+                        db.session.commit()
 
         # get tracing instance
         trace_manager: TraceQueueManager | None = (
@@ -572,6 +577,9 @@ class DatasetRetrieval:
         """
         if not query:
             return
+        if dify_config.RETRIEVAL_ANALYTICS_ASYNC_ENABLED:
+            RetrievalAnalytics.record_queries(query, dataset_ids, app_id, user_from, user_id)
+            return
         dataset_queries = []
         for dataset_id in dataset_ids:
             dataset_query = DatasetQuery(
@@ -0,0 +1,213 @@
+import json
+import logging
+import uuid
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import Optional
+
+from redis.exceptions import ResponseError
+from sqlalchemy import Integer, String, and_, column, func, select, union_all, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import ChildChunk, DatasetQuery, DocumentSegment
+from models.types import StringUUID
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_HITS_KEY = "retrieval_analytics:segment_hits"
+DATASET_QUERIES_KEY = "retrieval_analytics:dataset_queries"
+FLUSH_LOCK_KEY = "retrieval_analytics:flush_lock"
+
+# keeps the bind parameters of a statement well below the limit of PostgreSQL
+FLUSH_BATCH_SIZE = 1000
+
+
+class RetrievalAnalytics:
+    """
+    Accumulates the hit counts of retrieved segments and the queries of datasets in Redis.
+
+    Retrieval only increments a Redis hash and appends to a Redis list, and flush, run by the
+    retrieval_analytics_flush_task beat task, writes them to the database as aggregated bulk
+    statements. Accumulated data is renamed to a flushing key before it is written, and only
+    deleted once the write is committed, so a flush that fails is retried by the next one: hit
+    counts are applied at least once, dataset queries have their ids assigned up front and are
+    inserted exactly once.
+    """
+
+    @classmethod
+    def record_hits(cls, documents: Sequence[Document]) -> None:
+        """Count a hit for the segment, or parent segment, of every retrieved chunk."""
+        fields = [
+            cls._hit_field(document.metadata["document_id"], document.metadata["doc_id"])
+            for document in documents
+            if document.provider == "dify" and document.metadata is not None
+        ]
+        if not fields:
+            return
+        pipeline = redis_client.pipeline(transaction=False)
+        for field in fields:
+            pipeline.hincrby(SEGMENT_HITS_KEY, field, 1)
+        pipeline.execute()
+
+    @classmethod
+    def record_queries(
+        cls,
+        query: str,
+        dataset_ids: Sequence[str],
+        app_id: Optional[str],
+        created_by_role: str,
+        created_by: str,
+    ) -> None:
+        created_at = datetime.now(UTC).replace(tzinfo=None).isoformat()
+        records = [
+            json.dumps(
+                {
+                    "id": str(uuid.uuid4()),
+                    "dataset_id": dataset_id,
+                    "content": query,
+                    "source": "app",
+                    "source_app_id": app_id,
+                    "created_by_role": created_by_role,
+                    "created_by": created_by,
+                    "created_at": created_at,
+                }
+            )
+            for dataset_id in dataset_ids
+        ]
+        if records:
+            redis_client.rpush(DATASET_QUERIES_KEY, *records)
+
+    @classmethod
+    def flush(cls) -> tuple[int, int]:
+        """
+        Write the accumulated hit counts and dataset queries to the database.
+
+        :return: the number of chunks whose hits were counted and the number of dataset queries
+        """
+        lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=600)
+        if not lock.acquire(blocking=False):
+            logger.info("Retrieval analytics are being flushed by another worker")
+            return 0, 0
+        try:
+            return cls._flush_segment_hits(), cls._flush_dataset_queries()
+        finally:
+            lock.release()
+
+    @classmethod
+    def _flush_segment_hits(cls) -> int:
+        flushing_key = cls._claim(SEGMENT_HITS_KEY)
+        if flushing_key is None:
+            return 0
+
+        hits = []
+        for field, delta in redis_client.hgetall(flushing_key).items():
+            document_id, index_node_id = cls._parse_hit_field(field)
+            hits.append((document_id, index_node_id, int(delta)))
+        for start in range(0, len(hits), FLUSH_BATCH_SIZE):
+            db.session.execute(cls._increment_hit_counts_statement(hits[start : start + FLUSH_BATCH_SIZE]))
+        db.session.commit()
+        redis_client.delete(flushing_key)
+        return len(hits)
+
+    @classmethod
+    def _flush_dataset_queries(cls) -> int:
+        flushing_key = cls._claim(DATASET_QUERIES_KEY)
+        if flushing_key is None:
+            return 0
+
+        rows = []
+        for record in redis_client.lrange(flushing_key, 0, -1):
+            row = json.loads(record)
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+            rows.append(row)
+        for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+            db.session.execute(
+                insert(DatasetQuery)
+                .values(rows[start : start + FLUSH_BATCH_SIZE])
+                .on_conflict_do_nothing(index_elements=[DatasetQuery.id])
+            )
+        db.session.commit()
+        redis_client.delete(flushing_key)
+        return len(rows)
+
+    @staticmethod
+    def _claim(key: str) -> Optional[str]:
+        """
+        Move accumulated data to its flushing key, so retrieval accumulates into a new one.
+
+        Data left at the flushing key by a failed flush is flushed again first.
+        """
+        flushing_key = f"{key}:flushing"
+        if redis_client.exists(flushing_key):
+            return flushing_key
+        try:
+            redis_client.rename(key, flushing_key)
+        except ResponseError:
+            # nothing was accumulated
+            return None
+        return flushing_key
+
+    @staticmethod
+    def _increment_hit_counts_statement(hits: list[tuple[str, str, int]]):
+        """
+        Build one UPDATE ... FROM (VALUES ...) incrementing the hit counts of the segments of chunks.
+
+        A chunk is either a segment or a child chunk, so its segment is the segment with its index
+        node id or the parent of the child chunk with it. Several chunks may share a parent, so the
+        hits are summed per segment before they are applied.
+        """
+        chunk_hits = select(
+            values(
+                column("document_id", StringUUID),
+                column("index_node_id", String),
+                column("hits", Integer),
+                name="hits",
+            ).data(hits)
+        ).cte("chunk_hits")
+        segment = aliased(DocumentSegment)
+        segment_hits = union_all(
+            select(segment.id.label("segment_id"), chunk_hits.c.hits)
+            .select_from(chunk_hits)
+            .join(
+                segment,
+                and_(
+                    segment.document_id == chunk_hits.c.document_id,
+                    segment.index_node_id == chunk_hits.c.index_node_id,
+                ),
+            ),
+            select(ChildChunk.segment_id.label("segment_id"), chunk_hits.c.hits)
+            .select_from(chunk_hits)
+            .join(
+                ChildChunk,
+                and_(
+                    ChildChunk.document_id == chunk_hits.c.document_id,
+                    ChildChunk.index_node_id == chunk_hits.c.index_node_id,
+                ),
+            ),
+        ).subquery("segment_hits")
+        totals = (
+            select(segment_hits.c.segment_id, func.sum(segment_hits.c.hits).label("hits"))
+            .group_by(segment_hits.c.segment_id)
+            .subquery("totals")
+        )
+        return (
+            update(DocumentSegment)
+            .where(DocumentSegment.id == totals.c.segment_id)
+            .values(hit_count=DocumentSegment.hit_count + totals.c.hits)
+        )
+
+    @staticmethod
+    def _hit_field(document_id: str, index_node_id: str) -> str:
+        return f"{document_id}:{index_node_id}"
+
+    @staticmethod
+    def _parse_hit_field(field: bytes | str) -> tuple[str, str]:
+        if isinstance(field, bytes):
+            field = field.decode()
+        # document ids are uuids, index node ids may contain anything
+        document_id, index_node_id = field.split(":", 1)
+        return document_id, index_node_id
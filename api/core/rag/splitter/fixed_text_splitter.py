@@ -130,25 +130,26 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
                 merged_text = self._merge_splits(_good_splits, _separator, _good_splits_lengths)
                 final_chunks.extend(merged_text)
         else:
-            current_part = ""
+            # chunks are joined from the characters once their boundaries are known
+            current_start = 0
             current_length = 0
-            overlap_part = ""
-            overlap_part_length = 0
-            for s, s_len in zip(splits, s_lens):
+            overlap_start: Optional[int] = None
+            overlap_length = 0
+            for i, s_len in enumerate(s_lens):
                 if current_length + s_len <= self._chunk_size - self._chunk_overlap:
-                    current_part += s
                     current_length += s_len
                 elif current_length + s_len <= self._chunk_size:
-                    current_part += s
                     current_length += s_len
-                    overlap_part += s
-                    overlap_part_length += s_len
+                    if overlap_start is None:
+                        overlap_start = i
+                    overlap_length += s_len
                 else:
-                    final_chunks.append(current_part)
-                    current_part = overlap_part + s
-                    current_length = s_len + overlap_part_length
-                    overlap_part = ""
-                    overlap_part_length = 0
+                    final_chunks.append("".join(splits[current_start:i]))
+                    current_start = overlap_start if overlap_start is not None else i
+                    current_length = s_len + overlap_length
+                    overlap_start = None
+                    overlap_length = 0
+            current_part = "".join(splits[current_start:])
             if current_part:
                 final_chunks.append(current_part)
 
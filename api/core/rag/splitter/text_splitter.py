@@ -4,6 +4,7 @@ import copy
 import logging
 import re
 from abc import ABC, abstractmethod
+from collections import deque
 from collections.abc import Callable, Collection, Iterable, Sequence, Set
 from dataclasses import dataclass
 from typing import (
@@ -95,7 +96,7 @@ class TextSplitter(BaseDocumentTransformer, ABC):
             metadatas.append(doc.metadata or {})
         return self.create_documents(texts, metadatas=metadatas)
 
-    def _join_docs(self, docs: list[str], separator: str) -> Optional[str]:
+    def _join_docs(self, docs: Iterable[str], separator: str) -> Optional[str]:
         text = separator.join(docs)
         text = text.strip()
         if text == "":
@@ -109,11 +110,11 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         separator_len = self._length_function([separator])[0]
 
         docs = []
-        current_doc: list[str] = []
+        current_doc: deque[str] = deque()
+        # the lengths of the pieces of current_doc, so pieces dropped from it are not measured again
+        current_lengths: deque[int] = deque()
         total = 0
-        index = 0
-        for d in splits:
-            _len = lengths[index]
+        for d, _len in zip(splits, lengths):
             if total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size:
                 if total > self._chunk_size:
                     logger.warning(
@@ -129,13 +130,11 @@ class TextSplitter(BaseDocumentTransformer, ABC):
                     while total > self._chunk_overlap or (
                         total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size and total > 0
                     ):
-                        total -= self._length_function([current_doc[0]])[0] + (
-                            separator_len if len(current_doc) > 1 else 0
-                        )
-                        current_doc = current_doc[1:]
+                        total -= current_lengths.popleft() + (separator_len if len(current_doc) > 1 else 0)
+                        current_doc.popleft()
             current_doc.append(d)
+            current_lengths.append(_len)
             total += _len + (separator_len if len(current_doc) > 1 else 0)
-            index += 1
         doc = self._join_docs(current_doc, separator)
         if doc is not None:
             docs.append(doc)
@@ -4,13 +4,17 @@ SQLAlchemy implementation of the WorkflowNodeExecutionRepository.
 
 import json
 import logging
-from collections.abc import Sequence
-from typing import Optional, Union
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any, Optional, Union
 
-from sqlalchemy import UnaryExpression, asc, delete, desc, select
+from sqlalchemy import UnaryExpression, asc, delete, desc, inspect, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
+from configs import dify_config
 from core.model_runtime.utils.encoders import jsonable_encoder
 from core.workflow.entities.workflow_node_execution import (
     WorkflowNodeExecution,
@@ -30,6 +34,8 @@ from models import (
 
 logger = logging.getLogger(__name__)
 
+_COLUMN_KEYS = tuple(column_attr.key for column_attr in inspect(WorkflowNodeExecutionModel).column_attrs)
+
 
 class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository):
     """
@@ -41,6 +47,11 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
 
     This implementation also includes an in-memory cache for node executions to improve
     performance by reducing database queries.
+
+    With WORKFLOW_NODE_EXECUTION_WRITE_MODE set to "write-behind", saves of workflow run node
+    executions are buffered and coalesced per execution, and written with bulk upserts once
+    the buffer is full or old enough, and when `flush` is called at the end of the run.
+    Reads by workflow run include the buffered executions.
     """
 
     def __init__(
@@ -89,6 +100,16 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
         # Key: node_execution_id, Value: WorkflowNodeExecution (DB model)
         self._node_execution_cache: dict[str, WorkflowNodeExecutionModel] = {}
 
+        # Buffer of node executions not written yet in write-behind mode
+        # Key: id, Value: WorkflowNodeExecution (DB model) of the latest save
+        self._write_behind = (
+            dify_config.WORKFLOW_NODE_EXECUTION_WRITE_MODE == "write-behind"
+            and triggered_from == WorkflowNodeExecutionTriggeredFrom.WORKFLOW_RUN
+        )
+        self._pending_db_models: dict[str, WorkflowNodeExecutionModel] = {}
+        self._pending_lock = threading.Lock()
+        self._last_flushed_at = time.monotonic()
+
     def _to_domain_model(self, db_model: WorkflowNodeExecutionModel) -> WorkflowNodeExecution:
         """
         Convert a database model to a domain model.
@@ -204,6 +225,10 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
         # Convert domain model to database model using tenant context and other attributes
         db_model = self.to_db_model(execution)
 
+        if self._write_behind:
+            self._save_deferred(db_model)
+            return
+
         # Create a new database session
         with self._session_factory() as session:
             # SQLAlchemy merge intelligently handles both insert and update operations
@@ -217,6 +242,82 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
                 logger.debug(f"Updating cache for node_execution_id: {db_model.node_execution_id}")
                 self._node_execution_cache[db_model.node_execution_id] = db_model
 
+    def _save_deferred(self, db_model: WorkflowNodeExecutionModel) -> None:
+        with self._pending_lock:
+            # A later save of the same execution replaces the earlier one, so each is written once
+            self._pending_db_models[db_model.id] = db_model
+            should_flush = (
+                len(self._pending_db_models) >= dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE
+                or time.monotonic() - self._last_flushed_at >= dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL
+            )
+
+        if db_model.node_execution_id:
+            self._node_execution_cache[db_model.node_execution_id] = db_model
+
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the node executions buffered in write-behind mode to the database.
+
+        Executions are upserted in batches of WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE rows within
+        one transaction. If writing fails, the executions stay buffered for the next flush.
+        """
+        with self._pending_lock:
+            pending_db_models = self._pending_db_models
+            self._pending_db_models = {}
+            self._last_flushed_at = time.monotonic()
+
+        if not pending_db_models:
+            return
+
+        try:
+            with self._session_factory() as session:
+                for rows in self._to_row_batches(pending_db_models.values()):
+                    stmt = insert(WorkflowNodeExecutionModel).values(rows)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[WorkflowNodeExecutionModel.id],
+                        set_={key: stmt.excluded[key] for key in rows[0] if key != "id"},
+                    )
+                    session.execute(stmt)
+                session.commit()
+        except Exception:
+            with self._pending_lock:
+                for id, db_model in pending_db_models.items():
+                    self._pending_db_models.setdefault(id, db_model)
+            raise
+
+        logger.debug(f"Flushed {len(pending_db_models)} workflow node executions")
+
+    @staticmethod
+    def _to_row_batches(db_models: Iterable[WorkflowNodeExecutionModel]) -> list[list[dict[str, Any]]]:
+        # A multi-row insert needs the same columns in every row, unset columns keep their server default
+        rows_by_columns: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for db_model in db_models:
+            row = {key: getattr(db_model, key) for key in _COLUMN_KEYS if key in db_model.__dict__}
+            rows_by_columns.setdefault(tuple(row), []).append(row)
+
+        batch_size = dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE
+        return [rows[i : i + batch_size] for rows in rows_by_columns.values() for i in range(0, len(rows), batch_size)]
+
+    def _merge_pending_db_models(
+        self,
+        db_models: Sequence[WorkflowNodeExecutionModel],
+        predicate: Callable[[WorkflowNodeExecutionModel], bool],
+    ) -> Sequence[WorkflowNodeExecutionModel]:
+        """
+        Replace queried node executions by their buffered state and add the buffered ones matching the predicate.
+        """
+        with self._pending_lock:
+            if not self._pending_db_models:
+                return db_models
+            pending_db_models = dict(self._pending_db_models)
+
+        merged = [model for model in db_models if model.id not in pending_db_models]
+        merged.extend(model for model in pending_db_models.values() if predicate(model))
+        return merged
+
     def get_by_node_execution_id(self, node_execution_id: str) -> Optional[WorkflowNodeExecution]:
         """
         Retrieve a NodeExecution by its node_execution_id.
@@ -306,6 +407,15 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
 
             db_models = session.scalars(stmt).all()
 
+            if self._write_behind:
+                db_models = self._merge_pending_db_models(
+                    db_models,
+                    lambda model: model.workflow_run_id == workflow_run_id
+                    and model.triggered_from == WorkflowNodeExecutionTriggeredFrom.WORKFLOW_RUN,
+                )
+                if order_config and order_config.order_by:
+                    db_models = self._sort_db_models(db_models, order_config)
+
             # Update the cache with the retrieved DB models
             for model in db_models:
                 if model.node_execution_id:
@@ -313,6 +423,18 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
 
             return db_models
 
+    @staticmethod
+    def _sort_db_models(
+        db_models: Sequence[WorkflowNodeExecutionModel], order_config: OrderConfig
+    ) -> list[WorkflowNodeExecutionModel]:
+        # Python counterpart of the ORDER BY above, for results that include buffered node executions
+        fields = [field for field in order_config.order_by if hasattr(WorkflowNodeExecutionModel, field)]
+        return sorted(
+            db_models,
+            key=lambda model: tuple(getattr(model, field) for field in fields),
+            reverse=order_config.order_direction == "desc",
+        )
+
     def get_by_workflow_run(
         self,
         workflow_run_id: str,
@@ -369,6 +491,12 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
                 stmt = stmt.where(WorkflowNodeExecutionModel.app_id == self._app_id)
 
             db_models = session.scalars(stmt).all()
+            if self._write_behind:
+                db_models = self._merge_pending_db_models(
+                    db_models,
+                    lambda model: model.workflow_run_id == workflow_run_id
+                    and model.status == WorkflowNodeExecutionStatus.RUNNING,
+                )
             domain_models = []
 
             for model in db_models:
@@ -407,4 +535,6 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
 
             # Clear the in-memory cache
             self._node_execution_cache.clear()
+            with self._pending_lock:
+                self._pending_db_models.clear()
             logger.info("Cleared in-memory node execution cache")
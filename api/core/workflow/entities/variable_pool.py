@@ -1,9 +1,11 @@
 import re
+import threading
 from collections import defaultdict
 from collections.abc import Mapping, Sequence
+from copy import copy
 from typing import Any, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from core.file import File, FileAttribute, file_manager
 from core.variables import Segment, SegmentGroup, Variable
@@ -17,6 +19,9 @@ VariableValue = Union[str, int, float, dict, list, File]
 
 VARIABLE_PATTERN = re.compile(r"\{\{#([a-zA-Z0-9_]{1,50}(?:\.[a-zA-Z_][a-zA-Z0-9_]{0,29}){1,10})#\}\}")
 
+# Guards writes against concurrent forks of the same pool, e.g. by parallel iteration runs.
+_write_lock = threading.RLock()
+
 
 class VariablePool(BaseModel):
     # Variable dictionary is a dictionary for looking up variables by their selector.
@@ -44,6 +49,9 @@ class VariablePool(BaseModel):
         description="Conversation variables.",
         default_factory=list,
     )
+    # Node ids whose second-level dictionary is exclusively owned by this pool. The dictionaries
+    # of all other nodes may be shared with forks and are copied before they are written to.
+    _owned_node_ids: set[str] = PrivateAttr(default_factory=set)
 
     def model_post_init(self, context: Any, /) -> None:
         for key, value in self.system_variables.items():
@@ -84,7 +92,8 @@ class VariablePool(BaseModel):
             variable = variable_factory.segment_to_variable(segment=segment, selector=selector)
 
         hash_key = hash(tuple(selector[1:]))
-        self.variable_dictionary[selector[0]][hash_key] = variable
+        with _write_lock:
+            self._get_writable_node_variables(selector[0])[hash_key] = variable
 
     def get(self, selector: Sequence[str], /) -> Segment | None:
         """
@@ -133,11 +142,37 @@ class VariablePool(BaseModel):
         """
         if not selector:
             return
-        if len(selector) == 1:
-            self.variable_dictionary[selector[0]] = {}
-            return
-        hash_key = hash(tuple(selector[1:]))
-        self.variable_dictionary[selector[0]].pop(hash_key, None)
+        with _write_lock:
+            if len(selector) == 1:
+                self.variable_dictionary[selector[0]] = {}
+                self._owned_node_ids.add(selector[0])
+                return
+            hash_key = hash(tuple(selector[1:]))
+            self._get_writable_node_variables(selector[0]).pop(hash_key, None)
+
+    def _get_writable_node_variables(self, node_id: str) -> dict[int, Segment]:
+        if node_id not in self._owned_node_ids:
+            self.variable_dictionary[node_id] = dict(self.variable_dictionary.get(node_id, {}))
+            self._owned_node_ids.add(node_id)
+        return self.variable_dictionary[node_id]
+
+    def fork(self) -> "VariablePool":
+        """
+        Create a copy-on-write copy of the variable pool.
+
+        The copy shares the variables of every node with this pool instead of deep-copying them.
+        Segments are immutable, so only the variables of a node written to by either pool after
+        the fork get copied, at the time of that write.
+
+        Returns:
+            VariablePool: The new variable pool.
+        """
+        with _write_lock:
+            new_pool = self.model_copy()
+            new_pool.variable_dictionary = copy(self.variable_dictionary)
+            new_pool._owned_node_ids = set()
+            self._owned_node_ids.clear()
+        return new_pool
 
     def convert_template(self, template: str, /):
         parts = VARIABLE_PATTERN.split(template)
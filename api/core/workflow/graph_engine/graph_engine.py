@@ -1,11 +1,12 @@
 import contextvars
 import logging
 import queue
+import threading
 import time
 import uuid
 from collections.abc import Generator, Mapping
-from concurrent.futures import ThreadPoolExecutor, wait
-from copy import copy, deepcopy
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from copy import copy
 from datetime import UTC, datetime
 from typing import Any, Optional, cast
 
@@ -73,20 +74,67 @@ class GraphEngineThreadPool(ThreadPoolExecutor):
         super().__init__(max_workers, thread_name_prefix, initializer, initargs)
         self.max_submit_count = max_submit_count
         self.submit_count = 0
+        self._stats_lock = threading.Lock()
+        self._created_at = time.perf_counter()
+        self._stats: dict[str, float] = {
+            "submitted": 0,
+            "completed": 0,
+            "peak_submit_count": 0,
+            "total_queue_wait_time": 0.0,
+            "max_queue_wait_time": 0.0,
+            "total_run_time": 0.0,
+        }
 
     def submit(self, fn, /, *args, **kwargs):
-        self.submit_count += 1
-        self.check_is_full()
+        with self._stats_lock:
+            self.submit_count += 1
+            self.check_is_full()
+            self._stats["submitted"] += 1
+            self._stats["peak_submit_count"] = max(self._stats["peak_submit_count"], self.submit_count)
+
+        return super().submit(self._run_task, fn, time.perf_counter(), *args, **kwargs)
 
-        return super().submit(fn, *args, **kwargs)
+    def _run_task(self, fn, submitted_at: float, /, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            finished_at = time.perf_counter()
+            with self._stats_lock:
+                queue_wait_time = started_at - submitted_at
+                self._stats["completed"] += 1
+                self._stats["total_queue_wait_time"] += queue_wait_time
+                self._stats["max_queue_wait_time"] = max(self._stats["max_queue_wait_time"], queue_wait_time)
+                self._stats["total_run_time"] += finished_at - started_at
 
     def task_done_callback(self, future):
-        self.submit_count -= 1
+        with self._stats_lock:
+            self.submit_count -= 1
 
     def check_is_full(self) -> None:
         if self.submit_count > self.max_submit_count:
             raise ValueError(f"Max submit count {self.max_submit_count} of workflow thread pool reached.")
 
+    def stats(self) -> dict[str, float]:
+        """
+        Get the scheduling stats of the thread pool since it was created.
+
+        `worker_utilization` is the share of the lifetime of all workers spent running tasks,
+        queue wait times are measured from submitting a task until a worker picks it up.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self.submit_count
+        elapsed_time = time.perf_counter() - self._created_at
+        stats["max_workers"] = self._max_workers
+        stats["avg_queue_wait_time"] = (
+            stats["total_queue_wait_time"] / stats["completed"] if stats["completed"] else 0.0
+        )
+        stats["worker_utilization"] = (
+            stats["total_run_time"] / (self._max_workers * elapsed_time) if elapsed_time > 0 else 0.0
+        )
+        return stats
+
 
 class GraphEngine:
     workflow_thread_pool_mapping: dict[str, GraphEngineThreadPool] = {}
@@ -109,7 +157,7 @@ class GraphEngine:
         thread_pool_id: Optional[str] = None,
     ) -> None:
         thread_pool_max_submit_count = dify_config.MAX_SUBMIT_COUNT
-        thread_pool_max_workers = 10
+        thread_pool_max_workers = dify_config.WORKFLOW_PARALLEL_MAX_WORKERS
 
         # init thread pool
         if thread_pool_id:
@@ -222,6 +270,7 @@ class GraphEngine:
     def _release_thread(self):
         if self.is_main_thread_pool and self.thread_pool_id in GraphEngine.workflow_thread_pool_mapping:
             del GraphEngine.workflow_thread_pool_mapping[self.thread_pool_id]
+            logger.debug("Workflow thread pool %s stats: %s", self.thread_pool_id, self.thread_pool.stats())
 
     def _run(
         self,
@@ -495,28 +544,36 @@ class GraphEngine:
             )
 
             future.add_done_callback(self.thread_pool.task_done_callback)
+            future.add_done_callback(
+                lambda f, branch_start_node_id=edge.target_node_id: self._handle_parallel_node_aborted(
+                    future=f,
+                    q=q,
+                    parallel_id=parallel_id,
+                    parallel_start_node_id=branch_start_node_id,
+                    parent_parallel_id=in_parallel_id,
+                    parent_parallel_start_node_id=parallel_start_node_id,
+                )
+            )
 
             futures.append(future)
 
+        # every branch ends with a succeeded or failed event, so the queue can be waited on without timeout
         succeeded_count = 0
         while True:
-            try:
-                event = q.get(timeout=1)
-                if event is None:
-                    break
+            event = q.get()
+            if event is None:
+                break
 
-                yield event
-                if not isinstance(event, BaseAgentEvent) and event.parallel_id == parallel_id:
-                    if isinstance(event, ParallelBranchRunSucceededEvent):
-                        succeeded_count += 1
-                        if succeeded_count == len(futures):
-                            q.put(None)
-
-                        continue
-                    elif isinstance(event, ParallelBranchRunFailedEvent):
-                        raise GraphRunFailedError(event.error)
-            except queue.Empty:
-                continue
+            yield event
+            if not isinstance(event, BaseAgentEvent) and event.parallel_id == parallel_id:
+                if isinstance(event, ParallelBranchRunSucceededEvent):
+                    succeeded_count += 1
+                    if succeeded_count == len(futures):
+                        q.put(None)
+
+                    continue
+                elif isinstance(event, ParallelBranchRunFailedEvent):
+                    raise GraphRunFailedError(event.error)
 
         # wait all threads
         wait(futures)
@@ -595,6 +652,35 @@ class GraphEngine:
                     )
                 )
 
+    def _handle_parallel_node_aborted(
+        self,
+        future: Future,
+        q: queue.Queue,
+        parallel_id: str,
+        parallel_start_node_id: str,
+        parent_parallel_id: Optional[str] = None,
+        parent_parallel_start_node_id: Optional[str] = None,
+    ) -> None:
+        """
+        Publish a failed event for parallel nodes that were cancelled or aborted without one
+        """
+        if future.cancelled():
+            error = "Parallel branch cancelled."
+        elif future.exception() is not None:
+            error = str(future.exception())
+        else:
+            return
+
+        q.put(
+            ParallelBranchRunFailedEvent(
+                parallel_id=parallel_id,
+                parallel_start_node_id=parallel_start_node_id,
+                parent_parallel_id=parent_parallel_id,
+                parent_parallel_start_node_id=parent_parallel_start_node_id,
+                error=error,
+            )
+        )
+
     def _run_node(
         self,
         node_instance: BaseNode[BaseNodeData],
@@ -640,8 +726,6 @@ class GraphEngine:
             try:
                 # run node
                 retry_start_at = datetime.now(UTC).replace(tzinfo=None)
-                # yield control to other threads
-                time.sleep(0.001)
                 event_stream = node_instance.run()
                 for event in event_stream:
                     if isinstance(event, GraphEngineEvent):
@@ -880,7 +964,7 @@ class GraphEngine:
         """
         new_instance = copy(self)
         new_instance.graph_runtime_state = copy(self.graph_runtime_state)
-        new_instance.graph_runtime_state.variable_pool = deepcopy(self.graph_runtime_state.variable_pool)
+        new_instance.graph_runtime_state.variable_pool = self.graph_runtime_state.variable_pool.fork()
         new_instance.graph_runtime_state.total_tokens = 0
         return new_instance
 
@@ -82,6 +82,15 @@ class WorkflowNodeExecutionRepository(Protocol):
         """
         ...
 
+    def flush(self) -> None:
+        """
+        Persist NodeExecution instances whose save has been deferred.
+
+        Implementations that write on every save have nothing to do here. Callers flush once
+        the workflow run has ended, so no deferred state outlives the run.
+        """
+        ...
+
     def clear(self) -> None:
         """
         Clear all NodeExecution records based on implementation-specific criteria.
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from configs import dify_config
 from core.app.entities.app_invoke_entities import AgentChatAppGenerateEntity, ChatAppGenerateEntity
 from core.entities.provider_entities import QuotaUnit, SystemConfiguration
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.plugin.entities.plugin import ModelProviderID
 from events.message_event import message_was_created
 from extensions.ext_database import db
@@ -126,6 +127,9 @@ def handle(sender: Message, **kwargs):
     start_time = time_module.perf_counter()
     try:
         _execute_provider_updates(updates_to_perform)
+        if any(operation.description == "quota_deduction_update" for operation in updates_to_perform):
+            # cached provider configurations hold the used quota
+            provider_configurations_cache.invalidate(tenant_id)
 
         # Log successful completion with timing
         duration = time_module.perf_counter() - start_time
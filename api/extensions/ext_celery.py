@@ -71,6 +71,7 @@ def init_app(app: DifyApp) -> Celery:
         "schedule.clean_messages",
         "schedule.mail_clean_document_notify_task",
         "schedule.queue_monitor_task",
+        "schedule.retrieval_analytics_flush_task",
     ]
     day = dify_config.CELERY_BEAT_SCHEDULER_TIME
     beat_schedule = {
@@ -105,6 +106,11 @@ def init_app(app: DifyApp) -> Celery:
                 minutes=dify_config.QUEUE_MONITOR_INTERVAL if dify_config.QUEUE_MONITOR_INTERVAL else 30
             ),
         },
+        # also runs when accumulation is disabled, to flush what was accumulated before
+        "retrieval_analytics_flush_task": {
+            "task": "schedule.retrieval_analytics_flush_task.retrieval_analytics_flush_task",
+            "schedule": timedelta(seconds=dify_config.RETRIEVAL_ANALYTICS_FLUSH_INTERVAL),
+        },
     }
     celery_app.conf.update(beat_schedule=beat_schedule, imports=imports)
 
@@ -13,6 +13,7 @@ from .dataset import (
     AppDatasetJoin,
     Dataset,
     DatasetCollectionBinding,
+    DatasetKeyword,
     DatasetKeywordTable,
     DatasetPermission,
     DatasetPermissionEnum,
@@ -115,6 +116,7 @@ __all__ = [
     "DataSourceOauthBinding",
     "Dataset",
     "DatasetCollectionBinding",
+    "DatasetKeyword",
     "DatasetKeywordTable",
     "DatasetPermission",
     "DatasetPermissionEnum",
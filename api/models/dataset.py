@@ -7,10 +7,12 @@ import logging
 import os
 import pickle
 import re
+import struct
 import time
 from json import JSONDecodeError
 from typing import Any, cast
 
+import numpy as np
 from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped
@@ -898,6 +900,9 @@ class DatasetKeywordTable(Base):
         dataset = db.session.query(Dataset).filter_by(id=self.dataset_id).first()
         if not dataset:
             return None
+        if self.data_source_type == "dataset_keywords":
+            # the keyword table is stored per keyword in DatasetKeyword
+            return None
         if self.data_source_type == "database":
             return json.loads(self.keyword_table, cls=SetDecoder) if self.keyword_table else None
         else:
@@ -912,6 +917,23 @@ class DatasetKeywordTable(Base):
                 return None
 
 
+class DatasetKeyword(Base):
+    __tablename__ = "dataset_keywords"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="dataset_keyword_pkey"),
+        db.UniqueConstraint("dataset_id", "keyword", "index_node_id", name="dataset_keyword_keyword_node_key"),
+        db.Index("dataset_keyword_index_node_id_idx", "dataset_id", "index_node_id"),
+    )
+
+    id = db.Column(StringUUID, primary_key=True, server_default=db.text("uuid_generate_v4()"))
+    dataset_id = db.Column(StringUUID, nullable=False)
+    keyword = db.Column(db.Text, nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    # number of keywords of the node, the document length for ranking
+    node_keyword_count = db.Column(db.Integer, nullable=False, server_default=db.text("0"))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
 class Embedding(Base):
     __tablename__ = "embeddings"
     __table_args__ = (
@@ -929,11 +951,46 @@ class Embedding(Base):
     created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
     provider_name = db.Column(db.String(255), nullable=False, server_default=db.text("''::character varying"))
 
-    def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+    # Compact storage format: an 8-byte header (magic, format version, dtype code, padding)
+    # followed by the raw little-endian vector. Rows written before this format are pickled lists.
+    COMPACT_FORMAT_MAGIC = b"DEMB"
+    COMPACT_FORMAT_VERSION = 1
+    COMPACT_FORMAT_HEADER = struct.Struct("<4sBBxx")
+    COMPACT_FORMAT_DTYPES: dict[int, np.dtype] = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+
+    def set_embedding(self, embedding_data: list[float] | np.ndarray, dtype: str = "float32"):
+        vector = np.asarray(embedding_data, dtype=np.dtype(dtype).newbyteorder("<"))
+        dtype_code = next(
+            (code for code, item in self.COMPACT_FORMAT_DTYPES.items() if item == vector.dtype),
+            None,
+        )
+        if dtype_code is None:
+            raise ValueError(f"Unsupported embedding storage dtype: {dtype}")
+        header = self.COMPACT_FORMAT_HEADER.pack(self.COMPACT_FORMAT_MAGIC, self.COMPACT_FORMAT_VERSION, dtype_code)
+        self.embedding = header + vector.tobytes()
 
     def get_embedding(self) -> list[float]:
-        return cast(list[float], pickle.loads(self.embedding))  # noqa: S301
+        return cast(list[float], self.get_embedding_array().tolist())
+
+    def get_embedding_array(self) -> np.ndarray:
+        """
+        Decode the stored embedding into a NumPy array.
+
+        Compact rows are decoded without copying, so the returned array is read-only.
+        """
+        if not self.is_compact_format:
+            return np.asarray(pickle.loads(self.embedding), dtype=np.float64)  # noqa: S301
+        _, version, dtype_code = self.COMPACT_FORMAT_HEADER.unpack_from(self.embedding)
+        if version != self.COMPACT_FORMAT_VERSION or dtype_code not in self.COMPACT_FORMAT_DTYPES:
+            raise ValueError(f"Unsupported embedding storage format: version {version}, dtype {dtype_code}")
+        embedding: bytes = self.embedding
+        return np.frombuffer(
+            embedding, dtype=self.COMPACT_FORMAT_DTYPES[dtype_code], offset=self.COMPACT_FORMAT_HEADER.size
+        )
+
+    @property
+    def is_compact_format(self) -> bool:
+        return bytes(self.embedding[: len(self.COMPACT_FORMAT_MAGIC)]) == self.COMPACT_FORMAT_MAGIC
 
 
 class DatasetCollectionBinding(Base):
@@ -0,0 +1,28 @@
+import time
+
+import click
+
+import app
+from core.rag.retrieval.retrieval_analytics import RetrievalAnalytics
+from extensions.ext_database import db
+
+
+@app.celery.task(queue="dataset")
+def retrieval_analytics_flush_task():
+    start_at = time.perf_counter()
+    try:
+        chunk_count, query_count = RetrievalAnalytics.flush()
+    except Exception as e:
+        db.session.rollback()
+        # accumulated data is kept and flushed by the next run
+        click.echo(click.style(f"Error: {e}", fg="red"))
+        return
+
+    if chunk_count or query_count:
+        end_at = time.perf_counter()
+        click.echo(
+            click.style(
+                f"Flushed hits of {chunk_count} chunks and {query_count} dataset queries, latency: {end_at - start_at}",
+                fg="green",
+            )
+        )
@@ -14,6 +14,7 @@ from werkzeug.exceptions import Unauthorized
 
 from configs import dify_config
 from constants.languages import language_timezone_mapping, languages
+from core.helper.api_token_cache import api_token_cache
 from events.tenant_event import tenant_was_created
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -815,6 +816,7 @@ class TenantService:
 
         db.session.delete(ta)
         db.session.commit()
+        api_token_cache.delete_tenant_owner(tenant.id)
 
     @staticmethod
     def update_member_role(tenant: Tenant, member: Account, new_role: str, operator: Account) -> None:
@@ -842,6 +844,7 @@ class TenantService:
         # Update the role of the target member
         target_member_join.role = new_role
         db.session.commit()
+        api_token_cache.delete_tenant_owner(tenant.id)
 
     @staticmethod
     def dissolve_tenant(tenant: Tenant, operator: Account) -> None:
@@ -851,6 +854,7 @@ class TenantService:
         db.session.query(TenantAccountJoin).filter_by(tenant_id=tenant.id).delete()
         db.session.delete(tenant)
         db.session.commit()
+        api_token_cache.delete_tenant_owner(tenant.id)
 
     @staticmethod
     def get_custom_config(tenant_id: str) -> dict:
@@ -292,7 +292,7 @@ class AppAnnotationService:
             if len(result) == 0:
                 raise ValueError("The CSV file is empty.")
             # check annotation limit
-            features = FeatureService.get_features(current_user.current_tenant_id)
+            features = FeatureService.get_features(current_user.current_tenant_id, fresh=True)
             if features.billing.enabled:
                 annotation_quota_limit = features.annotation_quota_limit
                 if annotation_quota_limit.limit < len(result) + annotation_quota_limit.size:
@@ -45,7 +45,10 @@ class AppGenerateService:
             # check if it's free plan
             limit_info = BillingService.get_info(app_model.tenant_id)
             if limit_info["subscription"]["plan"] == "sandbox":
-                if cls.system_rate_limiter.is_rate_limited(app_model.tenant_id):
+                if cls.system_rate_limiter.is_rate_limited(app_model.tenant_id) and (
+                    # the tenant may have upgraded since its billing info was cached
+                    BillingService.get_info(app_model.tenant_id, fresh=True)["subscription"]["plan"] == "sandbox"
+                ):
                     raise InvokeRateLimitError(
                         "Rate limit exceeded, please upgrade your plan "
                         f"or your RPD was {dify_config.APP_DAILY_RATE_LIMIT} requests/day"
@@ -1,13 +1,129 @@
+import json
+import logging
 import os
-from typing import Literal, Optional
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal, Optional
 
 import httpx
 from tenacity import retry, retry_if_exception_type, stop_before_delay, wait_fixed
 
+from configs import dify_config
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from libs.helper import RateLimiter
 from models.account import Account, TenantAccountJoin, TenantAccountRole
 
+logger = logging.getLogger(__name__)
+
+
+class TenantBillingCache:
+    """
+    Stale-while-revalidate cache of billing lookups of tenants.
+
+    Entries are kept in process and in Redis together with the time they were fetched. An entry
+    younger than `ttl` seconds is returned as is. An entry younger than `stale_ttl` seconds is
+    returned as well, and refreshed in the background, so only tenants without a usable entry wait
+    for the billing API. Lookups that enforce quotas pass `fresh`, which always fetches and stores
+    the current value, as usage counters change with every resource created or deleted.
+    """
+
+    def __init__(self, prefix: str, ttl: int, stale_ttl: int, local_max_size: int = 10000) -> None:
+        self._prefix = prefix
+        self._ttl = ttl
+        self._stale_ttl = max(stale_ttl, ttl)
+        self._local_cache: dict[str, tuple[Any, float]] = {}
+        self._local_max_size = local_max_size
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get(self, tenant_id: str, fetch: Callable[[str], Any], fresh: bool = False) -> Any:
+        if fresh:
+            return self._fetch(tenant_id, fetch)
+
+        entry = self._get_entry(tenant_id)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self._ttl:
+                return value
+            if age < self._stale_ttl:
+                self._refresh_in_background(tenant_id, fetch)
+                return value
+
+        return self._fetch(tenant_id, fetch)
+
+    def delete(self, tenant_id: str) -> None:
+        redis_client.delete(self._cache_key(tenant_id))
+        with self._lock:
+            self._local_cache.pop(tenant_id, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._local_cache.clear()
+            self._refreshing.clear()
+            self._executor = None
+
+    def _cache_key(self, tenant_id: str) -> str:
+        return f"{self._prefix}:{tenant_id}"
+
+    def _get_entry(self, tenant_id: str) -> Optional[tuple[Any, float]]:
+        with self._lock:
+            entry = self._local_cache.get(tenant_id)
+        if entry is not None:
+            return entry
+
+        data = redis_client.get(self._cache_key(tenant_id))
+        if not data:
+            return None
+        try:
+            cached = json.loads(data)
+            entry = (cached["value"], cached["fetched_at"])
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return None
+
+        self._set_local(tenant_id, entry)
+        return entry
+
+    def _fetch(self, tenant_id: str, fetch: Callable[[str], Any]) -> Any:
+        value = fetch(tenant_id)
+        fetched_at = time.time()
+        redis_client.setex(
+            self._cache_key(tenant_id), self._stale_ttl, json.dumps({"value": value, "fetched_at": fetched_at})
+        )
+        self._set_local(tenant_id, (value, fetched_at))
+        return value
+
+    def _set_local(self, tenant_id: str, entry: tuple[Any, float]) -> None:
+        with self._lock:
+            if tenant_id not in self._local_cache and len(self._local_cache) >= self._local_max_size:
+                # drop the oldest inserted entry
+                self._local_cache.pop(next(iter(self._local_cache)))
+            self._local_cache[tenant_id] = entry
+
+    def _refresh_in_background(self, tenant_id: str, fetch: Callable[[str], Any]) -> None:
+        with self._lock:
+            if tenant_id in self._refreshing:
+                return
+            self._refreshing.add(tenant_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"{self._prefix}_refresh")
+            executor = self._executor
+
+        executor.submit(self._refresh, tenant_id, fetch)
+
+    def _refresh(self, tenant_id: str, fetch: Callable[[str], Any]) -> None:
+        try:
+            self._fetch(tenant_id, fetch)
+        except Exception:
+            logger.exception(f"Failed to refresh {self._prefix} of tenant {tenant_id}, keeping the stale value")
+        finally:
+            with self._lock:
+                self._refreshing.discard(tenant_id)
+
 
 class BillingService:
     base_url = os.environ.get("BILLING_API_URL", "BILLING_API_URL")
@@ -15,24 +131,50 @@ class BillingService:
 
     compliance_download_rate_limiter = RateLimiter("compliance_download_rate_limiter", 4, 60)
 
+    info_cache = TenantBillingCache(
+        "billing_info",
+        ttl=dify_config.BILLING_INFO_CACHE_TTL,
+        stale_ttl=dify_config.BILLING_INFO_CACHE_STALE_TTL,
+    )
+    knowledge_rate_limit_cache = TenantBillingCache(
+        "billing_knowledge_rate_limit",
+        ttl=dify_config.BILLING_INFO_CACHE_TTL,
+        stale_ttl=dify_config.BILLING_INFO_CACHE_STALE_TTL,
+    )
+
+    _client: Optional[httpx.Client] = None
+    _client_lock = threading.Lock()
+
     @classmethod
-    def get_info(cls, tenant_id: str):
+    def get_info(cls, tenant_id: str, fresh: bool = False):
+        return cls.info_cache.get(tenant_id, cls._fetch_info, fresh=fresh)
+
+    @classmethod
+    def _fetch_info(cls, tenant_id: str):
         params = {"tenant_id": tenant_id}
 
         billing_info = cls._send_request("GET", "/subscription/info", params=params)
         return billing_info
 
     @classmethod
-    def get_knowledge_rate_limit(cls, tenant_id: str):
-        params = {"tenant_id": tenant_id}
+    def clear_info_cache(cls, tenant_id: str):
+        cls.info_cache.delete(tenant_id)
+        cls.knowledge_rate_limit_cache.delete(tenant_id)
 
-        knowledge_rate_limit = cls._send_request("GET", "/subscription/knowledge-rate-limit", params=params)
+    @classmethod
+    def get_knowledge_rate_limit(cls, tenant_id: str):
+        knowledge_rate_limit = cls.knowledge_rate_limit_cache.get(tenant_id, cls._fetch_knowledge_rate_limit)
 
         return {
             "limit": knowledge_rate_limit.get("limit", 10),
             "subscription_plan": knowledge_rate_limit.get("subscription_plan", "sandbox"),
         }
 
+    @classmethod
+    def _fetch_knowledge_rate_limit(cls, tenant_id: str):
+        params = {"tenant_id": tenant_id}
+        return cls._send_request("GET", "/subscription/knowledge-rate-limit", params=params)
+
     @classmethod
     def get_subscription(cls, plan: str, interval: str, prefilled_email: str = "", tenant_id: str = ""):
         params = {"plan": plan, "interval": interval, "prefilled_email": prefilled_email, "tenant_id": tenant_id}
@@ -64,11 +206,37 @@ class BillingService:
         headers = {"Content-Type": "application/json", "Billing-Api-Secret-Key": cls.secret_key}
 
         url = f"{cls.base_url}{endpoint}"
-        response = httpx.request(method, url, json=json, params=params, headers=headers)
+        response = cls._get_client().request(method, url, json=json, params=params, headers=headers)
         if method == "GET" and response.status_code != httpx.codes.OK:
             raise ValueError("Unable to retrieve billing information. Please try again later or contact support.")
         return response.json()
 
+    @classmethod
+    def _get_client(cls) -> httpx.Client:
+        """Get the long-lived, connection-pooled client for the billing API."""
+        client = cls._client
+        if client is None:
+            with cls._client_lock:
+                client = cls._client
+                if client is None:
+                    client = httpx.Client(
+                        timeout=httpx.Timeout(dify_config.BILLING_API_TIMEOUT),
+                        limits=httpx.Limits(
+                            max_connections=dify_config.BILLING_API_MAX_CONNECTIONS,
+                            max_keepalive_connections=dify_config.BILLING_API_MAX_CONNECTIONS,
+                        ),
+                    )
+                    cls._client = client
+        return client
+
+    @classmethod
+    def _reset_after_fork(cls) -> None:
+        # connections and threads are not shared with forked processes
+        cls._client = None
+        cls._client_lock = threading.Lock()
+        cls.info_cache.reset()
+        cls.knowledge_rate_limit_cache.reset()
+
     @staticmethod
     def is_tenant_owner_or_admin(current_user):
         tenant_id = current_user.current_tenant_id
@@ -141,7 +309,10 @@ class BillingService:
                 "token": token,
                 "role": role,
             }
-            return BillingService._send_request("POST", "/education/", json=json, params=params)
+            result = BillingService._send_request("POST", "/education/", json=json, params=params)
+            if account.current_tenant_id:
+                BillingService.clear_info_cache(account.current_tenant_id)
+            return result
 
         @classmethod
         def autocomplete(cls, keywords: str, page: int = 0, limit: int = 20):
@@ -173,3 +344,6 @@ class BillingService:
         res = cls._send_request("POST", "/compliance/download", json=json)
         cls.compliance_download_rate_limiter.increment_rate_limit(limiter_key)
         return res
+
+
+os.register_at_fork(after_in_child=BillingService._reset_after_fork)
@@ -18,6 +18,7 @@ from core.errors.error import LLMBadRequestError, ProviderTokenNotInitError
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.plugin.entities.plugin import ModelProviderID
+from core.rag.datasource.vdb.vector_processor_cache import vector_processor_cache
 from core.rag.index_processor.constant.built_in_field import BuiltInField
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
@@ -421,6 +422,7 @@ class DatasetService:
 
         # Trigger vector index task if indexing technique changed
         if action:
+            vector_processor_cache.invalidate(dataset.id)
             deal_dataset_vector_index_task.delay(dataset.id, action)
 
         return dataset
@@ -1058,7 +1060,7 @@ class DocumentService:
         created_from: str = "web",
     ):
         # check document limit
-        features = FeatureService.get_features(current_user.current_tenant_id)
+        features = FeatureService.get_features(current_user.current_tenant_id, fresh=True)
 
         if features.billing.enabled:
             if not knowledge_config.original_document_id:
@@ -1531,7 +1533,7 @@ class DocumentService:
 
     @staticmethod
     def save_document_without_dataset_id(tenant_id: str, knowledge_config: KnowledgeConfig, account: Account):
-        features = FeatureService.get_features(current_user.current_tenant_id)
+        features = FeatureService.get_features(current_user.current_tenant_id, fresh=True)
 
         if features.billing.enabled:
             count = 0
@@ -0,0 +1,155 @@
+import json
+import threading
+from datetime import datetime
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import exists, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import make_transient_to_detached
+
+from configs import dify_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.model import App, EndUser
+
+_DATETIME_COLUMNS = ("created_at", "updated_at")
+
+
+class EndUserService:
+    """
+    Resolves end users of apps by session id.
+
+    End users are never updated after they are created, so resolved end users are cached for
+    END_USER_CACHE_TTL seconds in Redis and END_USER_CACHE_LOCAL_TTL seconds in process, and a
+    cached end user is returned as a detached instance without querying the database.
+    """
+
+    _local_cache: TTLCache = TTLCache(maxsize=10000, ttl=dify_config.END_USER_CACHE_LOCAL_TTL)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_end_user(cls, app_model: App, session_id: str, type: Optional[str] = None) -> Optional[EndUser]:
+        """
+        Get the end user of an app by session id.
+
+        :param type: type of the end user, None matches end users of any type
+        """
+        cache_key = cls._cache_key(app_model.id, session_id, type)
+        end_user = cls._get_cached(cache_key)
+        if end_user is not None:
+            return end_user
+
+        stmt = select(*EndUser.__table__.columns).where(*cls._filters(app_model, session_id, type)).limit(1)
+        row = db.session.execute(stmt).mappings().first()
+        if row is None:
+            return None
+
+        cls._set_cached(cache_key, dict(row))
+        return cls._to_end_user(dict(row))
+
+    @classmethod
+    def get_or_create_end_user(
+        cls,
+        app_model: App,
+        session_id: str,
+        type: str,
+        is_anonymous: bool = True,
+        match_any_type: bool = False,
+    ) -> EndUser:
+        """
+        Get the end user of an app by session id, creating it if it does not exist.
+
+        There is no unique constraint on the session id of end users, so creation is serialized
+        per session id by a transaction level advisory lock, and the lookup and the insert are a
+        single statement.
+
+        :param type: type of the end user to create, and to match unless match_any_type is set
+        :param match_any_type: return an existing end user of any type
+        """
+        match_type = None if match_any_type else type
+        cache_key = cls._cache_key(app_model.id, session_id, match_type)
+        end_user = cls._get_cached(cache_key)
+        if end_user is not None:
+            return end_user
+
+        table = EndUser.__table__
+        lock_key = f"end_user:{app_model.id}:{session_id}"
+        db.session.execute(select(func.pg_advisory_xact_lock(func.hashtext(lock_key))))
+
+        existing = (
+            select(*table.columns).where(*cls._filters(app_model, session_id, match_type)).limit(1).cte("existing")
+        )
+        values = {
+            "tenant_id": app_model.tenant_id,
+            "app_id": app_model.id,
+            "type": type,
+            "is_anonymous": is_anonymous,
+            "session_id": session_id,
+        }
+        inserted = (
+            insert(EndUser)
+            .from_select(
+                list(values),
+                select(*(literal(value, table.c[name].type) for name, value in values.items())).where(
+                    ~exists(select(existing.c.id))
+                ),
+            )
+            .returning(*table.columns)
+            .cte("inserted")
+        )
+        stmt = union_all(select(*existing.c), select(*inserted.c))
+        row = dict(db.session.execute(stmt).mappings().one())
+        db.session.commit()
+
+        cls._set_cached(cache_key, row)
+        return cls._to_end_user(row)
+
+    @staticmethod
+    def _filters(app_model: App, session_id: str, type: Optional[str]) -> list:
+        filters = [
+            EndUser.tenant_id == app_model.tenant_id,
+            EndUser.app_id == app_model.id,
+            EndUser.session_id == session_id,
+        ]
+        if type is not None:
+            filters.append(EndUser.type == type)
+        return filters
+
+    @staticmethod
+    def _cache_key(app_id: str, session_id: str, type: Optional[str]) -> str:
+        return f"end_user:{app_id}:{type or '*'}:{session_id}"
+
+    @classmethod
+    def _get_cached(cls, cache_key: str) -> Optional[EndUser]:
+        with cls._lock:
+            row = cls._local_cache.get(cache_key)
+
+        if row is None:
+            data = redis_client.get(cache_key)
+            if not data:
+                return None
+            try:
+                row = json.loads(data)
+            except json.JSONDecodeError:
+                return None
+            for name in _DATETIME_COLUMNS:
+                if row.get(name):
+                    row[name] = datetime.fromisoformat(row[name])
+            with cls._lock:
+                cls._local_cache[cache_key] = row
+
+        return cls._to_end_user(row)
+
+    @classmethod
+    def _set_cached(cls, cache_key: str, row: dict[str, Any]) -> None:
+        data = {name: value.isoformat() if isinstance(value, datetime) else value for name, value in row.items()}
+        redis_client.setex(cache_key, dify_config.END_USER_CACHE_TTL, json.dumps(data))
+        with cls._lock:
+            cls._local_cache[cache_key] = row
+
+    @staticmethod
+    def _to_end_user(row: dict[str, Any]) -> EndUser:
+        end_user = EndUser(**row)
+        make_transient_to_detached(end_user)
+        return end_user
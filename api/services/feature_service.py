@@ -153,13 +153,19 @@ class SystemFeatureModel(BaseModel):
 
 class FeatureService:
     @classmethod
-    def get_features(cls, tenant_id: str) -> FeatureModel:
+    def get_features(cls, tenant_id: str, fresh: bool = False) -> FeatureModel:
+        """
+        Get the features of a tenant.
+
+        Billing info is cached for a while, pass `fresh` where usage counters or the plan enforce a
+        quota, so resources created or deleted and plan changes are taken into account at once.
+        """
         features = FeatureModel()
 
         cls._fulfill_params_from_env(features)
 
         if dify_config.BILLING_ENABLED and tenant_id:
-            cls._fulfill_params_from_billing_api(features, tenant_id)
+            cls._fulfill_params_from_billing_api(features, tenant_id, fresh)
 
         if dify_config.ENTERPRISE_ENABLED:
             features.webapp_copyright_enabled = True
@@ -218,8 +224,8 @@ class FeatureService:
             features.workspace_members.enabled = workspace_info["WorkspaceMembers"]["enabled"]
 
     @classmethod
-    def _fulfill_params_from_billing_api(cls, features: FeatureModel, tenant_id: str):
-        billing_info = BillingService.get_info(tenant_id)
+    def _fulfill_params_from_billing_api(cls, features: FeatureModel, tenant_id: str, fresh: bool = False):
+        billing_info = BillingService.get_info(tenant_id, fresh=fresh)
 
         features.billing.enabled = billing_info["enabled"]
         features.billing.subscription.plan = billing_info["subscription"]["plan"]
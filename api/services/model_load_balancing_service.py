@@ -8,6 +8,7 @@ from constants import HIDDEN_VALUE
 from core.entities.provider_configuration import ProviderConfiguration
 from core.helper import encrypter
 from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.model_manager import LBModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import (
@@ -24,7 +25,7 @@ logger = logging.getLogger(__name__)
 
 class ModelLoadBalancingService:
     def __init__(self) -> None:
-        self.provider_manager = ProviderManager()
+        self.provider_manager = ProviderManager(use_cache=False)
 
     def enable_model_load_balancing(self, tenant_id: str, provider: str, model: str, model_type: str) -> None:
         """
@@ -46,6 +47,7 @@ class ModelLoadBalancingService:
 
         # Enable model load balancing
         provider_configuration.enable_model_load_balancing(model=model, model_type=ModelType.value_of(model_type))
+        provider_configurations_cache.invalidate(tenant_id)
 
     def disable_model_load_balancing(self, tenant_id: str, provider: str, model: str, model_type: str) -> None:
         """
@@ -67,6 +69,7 @@ class ModelLoadBalancingService:
 
         # disable model load balancing
         provider_configuration.disable_model_load_balancing(model=model, model_type=ModelType.value_of(model_type))
+        provider_configurations_cache.invalidate(tenant_id)
 
     def get_load_balancing_configs(
         self, tenant_id: str, provider: str, model: str, model_type: str
@@ -276,6 +279,7 @@ class ModelLoadBalancingService:
         )
         db.session.add(inherit_config)
         db.session.commit()
+        provider_configurations_cache.invalidate(tenant_id)
 
         return inherit_config
 
@@ -373,6 +377,7 @@ class ModelLoadBalancingService:
                 load_balancing_config.enabled = enabled
                 load_balancing_config.updated_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
                 db.session.commit()
+                provider_configurations_cache.invalidate(tenant_id)
 
                 self._clear_credentials_cache(tenant_id, config_id)
             else:
@@ -413,12 +418,14 @@ class ModelLoadBalancingService:
 
                 db.session.add(load_balancing_model_config)
                 db.session.commit()
+                provider_configurations_cache.invalidate(tenant_id)
 
         # get deleted config ids
         deleted_config_ids = set(current_load_balancing_configs_dict.keys()) - updated_config_ids
         for config_id in deleted_config_ids:
             db.session.delete(current_load_balancing_configs_dict[config_id])
             db.session.commit()
+            provider_configurations_cache.invalidate(tenant_id)
 
             self._clear_credentials_cache(tenant_id, config_id)
 
@@ -9,6 +9,7 @@ from configs import dify_config
 from core.helper import marketplace
 from core.helper.download import download_with_size_limit
 from core.helper.marketplace import download_plugin_pkg
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.plugin.entities.bundle import PluginBundleDependency
 from core.plugin.entities.plugin import (
     GenericProviderID,
@@ -463,7 +464,10 @@ class PluginService:
     @staticmethod
     def uninstall(tenant_id: str, plugin_installation_id: str) -> bool:
         manager = PluginInstaller()
-        return manager.uninstall(tenant_id, plugin_installation_id)
+        uninstalled = manager.uninstall(tenant_id, plugin_installation_id)
+        # the plugin may have provided models
+        provider_configurations_cache.invalidate(tenant_id)
+        return uninstalled
 
     @staticmethod
     def check_tools_existence(tenant_id: str, provider_ids: Sequence[GenericProviderID]) -> Sequence[bool]:
@@ -32,7 +32,7 @@ def duplicate_document_indexing_task(dataset_id: str, document_ids: list):
         return
 
     # check document limit
-    features = FeatureService.get_features(dataset.tenant_id)
+    features = FeatureService.get_features(dataset.tenant_id, fresh=True)
     try:
         if features.billing.enabled:
             vector_space = features.vector_space
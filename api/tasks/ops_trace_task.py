@@ -1,3 +1,4 @@
+import gzip
 import json
 import logging
 
@@ -16,27 +17,54 @@ from models.workflow import WorkflowRun
 @shared_task(queue="ops_trace")
 def process_trace_tasks(file_info):
     """
-    Async process trace tasks
-    Usage: process_trace_tasks.delay(tasks_data)
+    Async process a batch of trace tasks
+    Usage: process_trace_tasks.delay(file_info)
+
+    file_info carries the serialized traces inline (``traces``), the storage path of a gzip-compressed
+    newline-delimited batch (``batch_file_path``), or a single trace file written by earlier
+    versions (``app_id`` and ``file_id``).
     """
+    file_path = None
+    if "traces" in file_info:
+        traces = file_info["traces"]
+    elif "batch_file_path" in file_info:
+        file_path = file_info["batch_file_path"]
+        traces = gzip.decompress(storage.load(file_path)).decode("utf-8").splitlines()
+    else:
+        file_path = f"{OPS_FILE_PATH}{file_info.get('app_id')}/{file_info.get('file_id')}.json"
+        traces = [storage.load(file_path)]
+
+    try:
+        trace_instances: dict = {}
+        for trace in traces:
+            _process_trace(json.loads(trace), trace_instances)
+    finally:
+        if file_path:
+            storage.delete(file_path)
+
+
+def _process_trace(file_data: dict, trace_instances: dict):
     from core.ops.ops_trace_manager import OpsTraceManager
 
-    app_id = file_info.get("app_id")
-    file_id = file_info.get("file_id")
-    file_path = f"{OPS_FILE_PATH}{app_id}/{file_id}.json"
-    file_data = json.loads(storage.load(file_path))
+    app_id = file_data.get("app_id")
     trace_info = file_data.get("trace_info")
-    trace_info_type = file_data.get("trace_info_type")
-    trace_instance = OpsTraceManager.get_ops_trace_instance(app_id)
-
-    if trace_info.get("message_data"):
-        trace_info["message_data"] = Message.from_dict(data=trace_info["message_data"])
-    if trace_info.get("workflow_data"):
-        trace_info["workflow_data"] = WorkflowRun.from_dict(data=trace_info["workflow_data"])
-    if trace_info.get("documents"):
-        trace_info["documents"] = [Document(**doc) for doc in trace_info["documents"]]
+    trace_info_type: str = file_data.get("trace_info_type") or ""
 
     try:
+        # a trace of an app that cannot be traced must not abort the rest of its batch
+        if app_id not in trace_instances:
+            trace_instances[app_id] = OpsTraceManager.get_ops_trace_instance(app_id)
+        trace_instance = trace_instances[app_id]
+
+        if not trace_info:
+            raise ValueError(f"Empty trace info, trace_info_type: {trace_info_type}")
+        if trace_info.get("message_data"):
+            trace_info["message_data"] = Message.from_dict(data=trace_info["message_data"])
+        if trace_info.get("workflow_data"):
+            trace_info["workflow_data"] = WorkflowRun.from_dict(data=trace_info["workflow_data"])
+        if trace_info.get("documents"):
+            trace_info["documents"] = [Document(**doc) for doc in trace_info["documents"]]
+
         if trace_instance:
             with current_app.app_context():
                 trace_type = trace_info_info_map.get(trace_info_type)
@@ -51,5 +79,3 @@ def process_trace_tasks(file_info):
         failed_key = f"{OPS_TRACE_FAILED_KEY}_{app_id}"
         redis_client.incr(failed_key)
         logging.info(f"Processing trace tasks failed, app_id: {app_id}")
-    finally:
-        storage.delete(file_path)
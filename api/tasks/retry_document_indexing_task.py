@@ -34,7 +34,7 @@ def retry_document_indexing_task(dataset_id: str, document_ids: list[str]):
     for document_id in document_ids:
         retry_indexing_cache_key = "document_{}_is_retried".format(document_id)
         # check document limit
-        features = FeatureService.get_features(tenant_id)
+        features = FeatureService.get_features(tenant_id, fresh=True)
         try:
             if features.billing.enabled:
                 vector_space = features.vector_space
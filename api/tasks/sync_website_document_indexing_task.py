@@ -30,7 +30,7 @@ def sync_website_document_indexing_task(dataset_id: str, document_id: str):
 
     sync_indexing_cache_key = "document_{}_is_sync".format(document_id)
     # check document limit
-    features = FeatureService.get_features(dataset.tenant_id)
+    features = FeatureService.get_features(dataset.tenant_id, fresh=True)
     try:
         if features.billing.enabled:
             vector_space = features.vector_space
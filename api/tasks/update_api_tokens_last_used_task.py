@@ -0,0 +1,46 @@
+import logging
+from datetime import datetime
+
+from celery import shared_task  # type: ignore
+from sqlalchemy import bindparam, or_, update
+
+from extensions.ext_database import db
+from models.model import ApiToken
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(queue="dataset")
+def update_api_tokens_last_used_task(last_used_at_by_id: dict[str, str]):
+    """
+    Update the last used time of API tokens in one batch.
+
+    :param last_used_at_by_id: ISO formatted last used time by API token id
+
+    Usage: update_api_tokens_last_used_task.delay(last_used_at_by_id)
+    """
+    if not last_used_at_by_id:
+        return
+
+    stmt = (
+        update(ApiToken.__table__)  # type: ignore[arg-type]
+        .where(
+            ApiToken.id == bindparam("api_token_id"),
+            or_(ApiToken.last_used_at.is_(None), ApiToken.last_used_at < bindparam("last_used_at")),
+        )
+        .values(last_used_at=bindparam("last_used_at"))
+    )
+    try:
+        db.session.execute(
+            stmt,
+            [
+                {"api_token_id": api_token_id, "last_used_at": datetime.fromisoformat(last_used_at)}
+                for api_token_id, last_used_at in last_used_at_by_id.items()
+            ],
+        )
+        db.session.commit()
+    except Exception:
+        logger.exception(f"Failed to update last used time of {len(last_used_at_by_id)} API tokens")
+        db.session.rollback()
+    finally:
+        db.session.close()
@@ -0,0 +1,24 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+CACHED_APP = Flask(__name__)
+
+# benchmarks must never reach a real Redis server
+redis_mock = MagicMock()
+redis_mock.get = MagicMock(return_value=None)
+
+redis_patcher = patch("extensions.ext_redis.redis_client", redis_mock)
+redis_patcher.start()
+
+
+@pytest.fixture
+def app() -> Flask:
+    return CACHED_APP
+
+
+@pytest.fixture(autouse=True)
+def _provide_app_context(app: Flask):
+    with app.app_context():
+        yield
@@ -0,0 +1,51 @@
+"""
+Compare the previous AppQueueManager publish path with the current one, in chunks per second.
+
+The previous path dumped every event to scan it for SQLAlchemy models and read the stop flag
+from Redis on every publish from the application manager. Redis is mocked here, so the saved
+round trips are reported as `redis_gets` instead of being part of the timings.
+"""
+
+import pytest
+
+from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
+from core.app.apps.workflow.app_queue_manager import WorkflowAppQueueManager
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import AppQueueEvent, QueueTextChunkEvent
+from extensions.ext_redis import redis_client
+
+CHUNKS = 2_000
+
+
+class LegacyWorkflowAppQueueManager(WorkflowAppQueueManager):
+    def publish(self, event: AppQueueEvent, pub_from: PublishFrom) -> None:
+        self._check_for_sqlalchemy_models(event.model_dump())
+        self._publish(event, pub_from)
+
+    def _is_stopped(self) -> bool:
+        return redis_client.get(AppQueueManager._generate_stopped_cache_key(self._task_id)) is not None
+
+
+def _publish_chunks(queue_manager_class: type[WorkflowAppQueueManager]) -> None:
+    queue_manager = queue_manager_class(
+        task_id="task_id", user_id="user_id", invoke_from=InvokeFrom.SERVICE_API, app_mode="workflow"
+    )
+    for _ in range(CHUNKS):
+        queue_manager.publish(
+            QueueTextChunkEvent(text="token", from_variable_selector=["llm", "text"]),
+            PublishFrom.APPLICATION_MANAGER,
+        )
+
+
+@pytest.mark.parametrize(
+    "queue_manager_class", [LegacyWorkflowAppQueueManager, WorkflowAppQueueManager], ids=["legacy", "current"]
+)
+def test_publish_text_chunks(benchmark, queue_manager_class):
+    benchmark.group = f"app queue manager publish ({CHUNKS} text chunks)"
+
+    redis_client.get.reset_mock()
+    _publish_chunks(queue_manager_class)
+    benchmark.extra_info["redis_gets"] = redis_client.get.call_count
+
+    benchmark(_publish_chunks, queue_manager_class)
+    benchmark.extra_info["chunks_per_second"] = CHUNKS / benchmark.stats.stats.mean
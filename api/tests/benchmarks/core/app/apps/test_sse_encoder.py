@@ -0,0 +1,93 @@
+"""
+Compare the previous encoding of streamed chat messages as server-sent events with SSEEncoder.
+
+A stream of message chunks runs through AdvancedChatAppGenerateResponseConverter and
+convert_to_event_stream, like a Service API chat response. The previous path encoded every chunk
+with jsonable_encoder and json.dumps. Events per second and the CPU time per streamed token are
+reported as `events_per_second` and `cpu_seconds_per_token`. The coalescing variant merges the
+chunks of a 20 ms window, with tokens arriving every 5 ms on a simulated clock.
+"""
+
+import itertools
+import json
+import time
+from collections.abc import Mapping
+from unittest.mock import patch
+
+import pytest
+
+from core.app.apps.advanced_chat.app_generator import AdvancedChatAppGenerator
+from core.app.apps.advanced_chat.generate_response_converter import AdvancedChatAppGenerateResponseConverter
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.task_entities import ChatbotAppStreamResponse, MessageEndStreamResponse, MessageStreamResponse
+from core.model_runtime.utils.encoders import jsonable_encoder
+
+TOKENS = 5_000
+
+
+def _legacy_convert_to_event_stream(generator):
+    for message in generator:
+        if isinstance(message, Mapping | dict):
+            yield f"data: {json.dumps(message)}\n\n"
+        else:
+            yield f"event: {message}\n\n"
+
+
+def _stream_response():
+    for index in range(TOKENS):
+        yield ChatbotAppStreamResponse(
+            conversation_id="5f2b6d3c-3a8e-4bde-9a4c-3f1ad8a2e0c1",
+            message_id="8c1e7f5a-92d4-4f0b-b7f3-6c2a9e4d1b07",
+            created_at=1700000000,
+            stream_response=MessageStreamResponse(
+                task_id="0d9a3c6e-1f47-4b8a-a2e5-7c9b3d1f6e48",
+                id="8c1e7f5a-92d4-4f0b-b7f3-6c2a9e4d1b07",
+                answer=f" w{index}",
+            ),
+        )
+    yield ChatbotAppStreamResponse(
+        conversation_id="5f2b6d3c-3a8e-4bde-9a4c-3f1ad8a2e0c1",
+        message_id="8c1e7f5a-92d4-4f0b-b7f3-6c2a9e4d1b07",
+        created_at=1700000000,
+        stream_response=MessageEndStreamResponse(
+            task_id="0d9a3c6e-1f47-4b8a-a2e5-7c9b3d1f6e48", id="8c1e7f5a-92d4-4f0b-b7f3-6c2a9e4d1b07"
+        ),
+    )
+
+
+def _stream(implementation: str) -> list[str]:
+    response = AdvancedChatAppGenerateResponseConverter.convert(_stream_response(), InvokeFrom.SERVICE_API)
+    if implementation == "legacy":
+        with patch.object(MessageStreamResponse, "to_dict", jsonable_encoder):
+            return list(_legacy_convert_to_event_stream(response))
+    if implementation == "coalesced":
+        clock = itertools.count(step=0.005)
+        with (
+            patch("configs.dify_config.STREAM_MESSAGE_COALESCE_WINDOW_MS", 20),
+            patch("core.app.apps.base_app_generate_response_converter.time.monotonic", new=lambda: next(clock)),
+        ):
+            response = AdvancedChatAppGenerateResponseConverter.convert(_stream_response(), InvokeFrom.SERVICE_API)
+            return list(AdvancedChatAppGenerator.convert_to_event_stream(response))
+    return list(AdvancedChatAppGenerator.convert_to_event_stream(response))
+
+
+@pytest.mark.parametrize("implementation", ["legacy", "sse_encoder", "coalesced"])
+def test_stream_encoding(benchmark, implementation):
+    benchmark.group = f"streamed chat message encoding ({TOKENS} tokens)"
+
+    wall_started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    events = _stream(implementation)
+    cpu_seconds = time.process_time() - cpu_started_at
+    wall_seconds = time.perf_counter() - wall_started_at
+    benchmark.extra_info["events"] = len(events)
+    benchmark.extra_info["events_per_second"] = len(events) / wall_seconds
+    benchmark.extra_info["cpu_seconds_per_token"] = cpu_seconds / TOKENS
+
+    events = benchmark.pedantic(_stream, args=(implementation,), rounds=5, iterations=1)
+    answer = "".join(
+        json.loads(event[len("data: ") :])["answer"]
+        for event in events
+        if '"event":"message"' in event.replace(" ", "")
+    )
+    assert answer == "".join(f" w{index}" for index in range(TOKENS))
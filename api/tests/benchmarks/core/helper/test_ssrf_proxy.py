@@ -0,0 +1,99 @@
+"""
+Compare a fresh httpx client per request, as ssrf_proxy used to do, with the pooled clients.
+
+Requests go to a local keep-alive HTTP stub, so the numbers mostly reflect connection setup.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from core.helper import ssrf_proxy
+
+REQUEST_COUNT = 1_000
+CONCURRENCY = 32
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, avoid delayed ACK stalls on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # noqa: N802
+        body = b'{"result": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = _StubServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def _request_with_new_client(url: str) -> int:
+    with httpx.Client() as client:
+        return client.get(url).status_code
+
+
+def _request_with_pooled_client(url: str) -> int:
+    return ssrf_proxy.get(url).status_code
+
+
+_REQUESTERS = {"new_client": _request_with_new_client, "pooled": _request_with_pooled_client}
+
+
+@pytest.mark.parametrize("strategy", ["new_client", "pooled"])
+def test_sequential_requests(benchmark, stub_url, strategy):
+    request = _REQUESTERS[strategy]
+    benchmark.group = f"ssrf proxy: {REQUEST_COUNT} sequential requests"
+
+    def run():
+        return [request(stub_url) for _ in range(REQUEST_COUNT)]
+
+    assert set(benchmark.pedantic(run, rounds=1, iterations=1)) == {200}
+
+
+@pytest.mark.parametrize("strategy", ["new_client", "pooled"])
+def test_concurrent_requests(benchmark, stub_url, strategy):
+    request = _REQUESTERS[strategy]
+    benchmark.group = f"ssrf proxy: {REQUEST_COUNT} concurrent requests ({CONCURRENCY} threads)"
+
+    def run():
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            return list(executor.map(request, [stub_url] * REQUEST_COUNT))
+
+    assert set(benchmark.pedantic(run, rounds=1, iterations=1)) == {200}
+
+
+def test_concurrent_requests_async(benchmark, stub_url):
+    benchmark.group = f"ssrf proxy: {REQUEST_COUNT} concurrent requests ({CONCURRENCY} threads)"
+
+    async def run_requests():
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def request():
+            async with semaphore:
+                return (await ssrf_proxy.make_request_async("GET", stub_url)).status_code
+
+        return await asyncio.gather(*(request() for _ in range(REQUEST_COUNT)))
+
+    assert set(benchmark.pedantic(lambda: asyncio.run(run_requests()), rounds=1, iterations=1)) == {200}
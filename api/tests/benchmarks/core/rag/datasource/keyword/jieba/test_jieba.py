@@ -0,0 +1,94 @@
+"""
+Compare the previous keyword table scan of Jieba._retrieve_ids_by_query with BM25 over posting lists.
+
+The synthetic index has 500k segments with 10 keywords each, drawn from a Zipf-like vocabulary,
+so some query keywords match a large share of the segments. Keyword extraction and loading the
+index are not measured. The peak of Python allocations of a search is reported as
+`peak_allocated_bytes`.
+"""
+
+import random
+import tracemalloc
+from collections import defaultdict
+
+import pytest
+
+from core.rag.datasource.keyword.jieba.bm25 import bm25_top_k
+
+SEGMENTS = 500_000
+KEYWORDS_PER_SEGMENT = 10
+VOCABULARY_SIZE = 50_000
+TOP_K = 4
+
+
+def legacy_retrieve_ids_by_query(keyword_table: dict, keywords: set[str], k: int = 4) -> list[str]:
+    """Jieba._retrieve_ids_by_query before posting lists, kept as the baseline."""
+    chunk_indices_count: dict[str, int] = defaultdict(int)
+    keywords_list = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
+    for keyword in keywords_list:
+        for node_id in keyword_table[keyword]:
+            chunk_indices_count[node_id] += 1
+
+    sorted_chunk_indices = sorted(
+        chunk_indices_count.keys(),
+        key=lambda x: chunk_indices_count[x],
+        reverse=True,
+    )
+
+    return sorted_chunk_indices[:k]
+
+
+@pytest.fixture(scope="module")
+def keyword_index():
+    rng = random.Random(0)  # noqa: S311
+    vocabulary = [f"keyword{i}" for i in range(VOCABULARY_SIZE)]
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, VOCABULARY_SIZE + 1):
+        total += 1 / rank
+        cum_weights.append(total)
+
+    keyword_table: dict[str, set[str]] = defaultdict(set)
+    node_keywords: dict[str, set[str]] = {}
+    for segment in range(SEGMENTS):
+        node_id = f"node-{segment}"
+        keywords = set(rng.choices(vocabulary, cum_weights=cum_weights, k=KEYWORDS_PER_SEGMENT))
+        node_keywords[node_id] = keywords
+        for keyword in keywords:
+            keyword_table[keyword].add(node_id)
+
+    postings = {
+        keyword: {node_id: len(node_keywords[node_id]) for node_id in node_ids}
+        for keyword, node_ids in keyword_table.items()
+    }
+    avg_node_length = sum(len(keywords) for keywords in node_keywords.values()) / SEGMENTS
+
+    # one common, two mid-frequency and two rare keywords
+    query_keywords = {vocabulary[i] for i in (2, 40, 300, 5_000, 20_000)}
+    return dict(keyword_table), postings, avg_node_length, query_keywords
+
+
+def _search(implementation, keyword_index):
+    keyword_table, postings, avg_node_length, query_keywords = keyword_index
+    if implementation == "legacy":
+        return legacy_retrieve_ids_by_query(keyword_table, query_keywords, TOP_K)
+
+    # only the posting lists of the query keywords are loaded
+    query_postings = {keyword: postings[keyword] for keyword in query_keywords if keyword in postings}
+    return bm25_top_k(query_postings, SEGMENTS, avg_node_length, TOP_K)
+
+
+@pytest.mark.parametrize("implementation", ["legacy", "bm25"])
+def test_keyword_search(benchmark, implementation, keyword_index):
+    benchmark.group = f"keyword search ({SEGMENTS} segments)"
+
+    tracemalloc.start()
+    try:
+        _search(implementation, keyword_index)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_allocated_bytes"] = peak
+
+    node_ids = benchmark.pedantic(_search, args=(implementation, keyword_index), rounds=5, iterations=1)
+    assert len(node_ids) == TOP_K
@@ -0,0 +1,103 @@
+"""
+Benchmark the lookup phase of ``CacheEmbedding.embed_documents``.
+
+An SQLite database stands in for Postgres, so the absolute numbers only show the
+difference in round trips between a per-text lookup and the batched ``IN (...)`` lookup.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from core.rag.embedding.cached_embedding import CacheEmbedding
+from libs import helper
+from models.dataset import Embedding
+
+PROVIDER_NAME = "langgenius/openai/openai"
+MODEL_NAME = "text-embedding-3-small"
+
+
+@pytest.fixture(scope="module")
+def session():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        # Embedding.__table__ uses Postgres-only server defaults, so create a compatible table by hand.
+        conn.execute(
+            text(
+                "CREATE TABLE embeddings ("
+                "id CHAR(36) PRIMARY KEY, model_name VARCHAR(255) NOT NULL, hash VARCHAR(64) NOT NULL, "
+                "embedding BLOB NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, "
+                "provider_name VARCHAR(255) NOT NULL, UNIQUE (model_name, hash, provider_name))"
+            )
+        )
+    with Session(engine) as session:
+        yield session
+
+
+def _populate(session: Session, texts: list[str]) -> None:
+    rows = []
+    for i, content in enumerate(texts):
+        embedding = Embedding(
+            model_name=MODEL_NAME, hash=helper.generate_text_hash(content), provider_name=PROVIDER_NAME
+        )
+        embedding.set_embedding([0.1] * 256)
+        rows.append(
+            {
+                "id": f"{i:036d}",
+                "model_name": embedding.model_name,
+                "hash": embedding.hash,
+                "embedding": embedding.embedding,
+                "provider_name": embedding.provider_name,
+            }
+        )
+    session.execute(text("DELETE FROM embeddings"))
+    session.execute(
+        text(
+            "INSERT INTO embeddings (id, model_name, hash, embedding, provider_name) "
+            "VALUES (:id, :model_name, :hash, :embedding, :provider_name)"
+        ),
+        rows,
+    )
+    session.commit()
+
+
+def _lookup_one_by_one(session: Session, texts: list[str]) -> int:
+    """The previous lookup strategy: one query per text."""
+    hits = 0
+    for content in texts:
+        embedding = (
+            session.query(Embedding)
+            .filter_by(model_name=MODEL_NAME, hash=helper.generate_text_hash(content), provider_name=PROVIDER_NAME)
+            .first()
+        )
+        if embedding:
+            embedding.get_embedding()
+            hits += 1
+    return hits
+
+
+def _lookup_batched(cache_embedding: CacheEmbedding, texts: list[str]) -> int:
+    hashes = [helper.generate_text_hash(content) for content in texts]
+    return len(cache_embedding._load_cached_embeddings(hashes))
+
+
+@pytest.mark.parametrize("size", [1_000, 10_000, 50_000])
+@pytest.mark.parametrize("strategy", ["one_by_one", "batched"])
+def test_embedding_cache_lookup(benchmark, session, strategy, size):
+    texts = [f"segment content {i}" for i in range(size)]
+    # only half of the texts are cached, the rest are misses
+    _populate(session, texts[::2])
+
+    model_instance = MagicMock(provider=PROVIDER_NAME, model=MODEL_NAME)
+    cache_embedding = CacheEmbedding(model_instance)
+    benchmark.group = f"embedding cache lookup ({size} texts)"
+
+    with patch("core.rag.embedding.cached_embedding.db", MagicMock(session=session)):
+        if strategy == "one_by_one":
+            hits = benchmark.pedantic(_lookup_one_by_one, args=(session, texts), rounds=1, iterations=1)
+        else:
+            hits = benchmark.pedantic(_lookup_batched, args=(cache_embedding, texts), rounds=3, iterations=1)
+
+    assert hits == len(texts[::2])
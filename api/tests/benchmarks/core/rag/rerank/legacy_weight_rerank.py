@@ -0,0 +1,55 @@
+"""Scoring of WeightRerankRunner before vectorization, kept as the baseline for the benchmark."""
+
+import math
+from collections import Counter
+
+import numpy as np
+
+
+def legacy_tfidf_similarities(query_keywords, documents_keywords) -> list[float]:
+    query_keyword_counts = Counter(query_keywords)
+    total_documents = len(documents_keywords)
+
+    all_keywords = set()
+    for document_keywords in documents_keywords:
+        all_keywords.update(document_keywords)
+
+    keyword_idf = {}
+    for keyword in all_keywords:
+        doc_count_containing_keyword = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
+        keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
+
+    query_tfidf = {}
+    for keyword, count in query_keyword_counts.items():
+        query_tfidf[keyword] = count * keyword_idf.get(keyword, 0)
+
+    documents_tfidf = []
+    for document_keywords in documents_keywords:
+        document_keyword_counts = Counter(document_keywords)
+        documents_tfidf.append(
+            {keyword: count * keyword_idf.get(keyword, 0) for keyword, count in document_keyword_counts.items()}
+        )
+
+    def cosine_similarity(vec1, vec2):
+        intersection = set(vec1.keys()) & set(vec2.keys())
+        numerator = sum(vec1[x] * vec2[x] for x in intersection)
+        sum1 = sum(vec1[x] ** 2 for x in vec1)
+        sum2 = sum(vec2[x] ** 2 for x in vec2)
+        denominator = math.sqrt(sum1) * math.sqrt(sum2)
+        if not denominator:
+            return 0.0
+        return float(numerator) / denominator
+
+    return [cosine_similarity(query_tfidf, document_tfidf) for document_tfidf in documents_tfidf]
+
+
+def legacy_cosine_similarities(query_vector, document_vectors) -> list[float]:
+    scores = []
+    for document_vector in document_vectors:
+        vec1 = np.array(query_vector)
+        vec2 = np.array(document_vector)
+        dot_product = np.dot(vec1, vec2)
+        norm_vec1 = np.linalg.norm(vec1)
+        norm_vec2 = np.linalg.norm(vec2)
+        scores.append(dot_product / (norm_vec1 * norm_vec2))
+    return scores
@@ -0,0 +1,66 @@
+"""
+Compare the previous per-document scoring of WeightRerankRunner with the vectorized one.
+
+Keyword extraction and the query embedding are precomputed, so only scoring is measured.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from core.rag.models.document import Document
+from core.rag.rerank.entity.weight import KeywordSetting, VectorSetting, Weights
+from core.rag.rerank.weight_rerank import WeightRerankRunner
+from tests.benchmarks.core.rag.rerank.legacy_weight_rerank import legacy_cosine_similarities, legacy_tfidf_similarities
+
+DIMENSION = 1536
+VOCABULARY = [f"keyword{i}" for i in range(2_000)]
+
+
+def _build_corpus(size: int):
+    rng = np.random.default_rng(size)
+    query_keywords = set(rng.choice(VOCABULARY, 8, replace=False).tolist())
+    documents_keywords = [set(rng.choice(VOCABULARY, 30, replace=False).tolist()) for _ in range(size)]
+    query_vector = rng.random(DIMENSION).tolist()
+    document_vectors = rng.random((size, DIMENSION)).tolist()
+    return query_keywords, documents_keywords, query_vector, document_vectors
+
+
+@pytest.mark.parametrize("size", [50, 150, 500])
+@pytest.mark.parametrize("implementation", ["legacy", "vectorized"])
+def test_keyword_scoring(benchmark, implementation, size):
+    query_keywords, documents_keywords, _, _ = _build_corpus(size)
+    benchmark.group = f"weight rerank keyword scoring ({size} documents)"
+    if implementation == "legacy":
+        scores = benchmark(legacy_tfidf_similarities, query_keywords, documents_keywords)
+    else:
+        scores = benchmark(WeightRerankRunner._calculate_tfidf_similarities, query_keywords, documents_keywords)
+    assert len(scores) == size
+
+
+@pytest.mark.parametrize("size", [50, 150, 500])
+@pytest.mark.parametrize("implementation", ["legacy", "vectorized"])
+def test_vector_scoring(benchmark, implementation, size):
+    _, _, query_vector, document_vectors = _build_corpus(size)
+    benchmark.group = f"weight rerank vector scoring ({size} documents)"
+    if implementation == "legacy":
+        scores = benchmark(legacy_cosine_similarities, query_vector, document_vectors)
+    else:
+        runner = WeightRerankRunner(
+            "tenant_id",
+            Weights(
+                vector_setting=VectorSetting(
+                    vector_weight=0.7, embedding_provider_name="openai", embedding_model_name="m"
+                ),
+                keyword_setting=KeywordSetting(keyword_weight=0.3),
+            ),
+        )
+        documents = [Document(page_content="", vector=vector, metadata={}) for vector in document_vectors]
+        with (
+            patch("core.rag.rerank.weight_rerank.ModelManager"),
+            patch("core.rag.rerank.weight_rerank.CacheEmbedding") as mock_cache_embedding,
+        ):
+            mock_cache_embedding.return_value = MagicMock(embed_query=MagicMock(return_value=query_vector))
+            scores = benchmark(runner._calculate_cosine, "tenant_id", "query", documents, runner.weights.vector_setting)
+    assert len(scores) == size
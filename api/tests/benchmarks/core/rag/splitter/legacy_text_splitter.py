@@ -0,0 +1,122 @@
+"""Chunk merging of the text splitters before it kept the lengths of pieces, kept as the baseline."""
+
+import logging
+from collections.abc import Iterable
+
+from core.rag.splitter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+
+class LegacyFixedRecursiveCharacterTextSplitter(FixedRecursiveCharacterTextSplitter):
+    def _merge_splits(self, splits: Iterable[str], separator: str, lengths: list[int]) -> list[str]:
+        # We now want to combine these smaller pieces into medium size
+        # chunks to send to the LLM.
+        separator_len = self._length_function([separator])[0]
+
+        docs = []
+        current_doc: list[str] = []
+        total = 0
+        index = 0
+        for d in splits:
+            _len = lengths[index]
+            if total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size:
+                if total > self._chunk_size:
+                    logger.warning(
+                        f"Created a chunk of size {total}, which is longer than the specified {self._chunk_size}"
+                    )
+                if len(current_doc) > 0:
+                    doc = self._join_docs(current_doc, separator)
+                    if doc is not None:
+                        docs.append(doc)
+                    # Keep on popping if:
+                    # - we have a larger chunk than in the chunk overlap
+                    # - or if we still have any chunks and the length is long
+                    while total > self._chunk_overlap or (
+                        total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size and total > 0
+                    ):
+                        total -= self._length_function([current_doc[0]])[0] + (
+                            separator_len if len(current_doc) > 1 else 0
+                        )
+                        current_doc = current_doc[1:]
+            current_doc.append(d)
+            total += _len + (separator_len if len(current_doc) > 1 else 0)
+            index += 1
+        doc = self._join_docs(current_doc, separator)
+        if doc is not None:
+            docs.append(doc)
+        return docs
+
+    def recursive_split_text(self, text: str) -> list[str]:
+        """Split incoming text and return chunks."""
+
+        final_chunks = []
+        separator = self._separators[-1]
+        new_separators = []
+
+        for i, _s in enumerate(self._separators):
+            if _s == "":
+                separator = _s
+                break
+            if _s in text:
+                separator = _s
+                new_separators = self._separators[i + 1 :]
+                break
+
+        # Now that we have the separator, split the text
+        if separator:
+            if separator == " ":
+                splits = text.split()
+            else:
+                splits = text.split(separator)
+        else:
+            splits = list(text)
+        splits = [s for s in splits if (s not in {"", "\n"})]
+        _good_splits = []
+        _good_splits_lengths = []  # cache the lengths of the splits
+        _separator = "" if self._keep_separator else separator
+        s_lens = self._length_function(splits)
+        if separator != "":
+            for s, s_len in zip(splits, s_lens):
+                if s_len < self._chunk_size:
+                    _good_splits.append(s)
+                    _good_splits_lengths.append(s_len)
+                else:
+                    if _good_splits:
+                        merged_text = self._merge_splits(_good_splits, _separator, _good_splits_lengths)
+                        final_chunks.extend(merged_text)
+                        _good_splits = []
+                        _good_splits_lengths = []
+                    if not new_separators:
+                        final_chunks.append(s)
+                    else:
+                        other_info = self._split_text(s, new_separators)
+                        final_chunks.extend(other_info)
+
+            if _good_splits:
+                merged_text = self._merge_splits(_good_splits, _separator, _good_splits_lengths)
+                final_chunks.extend(merged_text)
+        else:
+            current_part = ""
+            current_length = 0
+            overlap_part = ""
+            overlap_part_length = 0
+            for s, s_len in zip(splits, s_lens):
+                if current_length + s_len <= self._chunk_size - self._chunk_overlap:
+                    current_part += s
+                    current_length += s_len
+                elif current_length + s_len <= self._chunk_size:
+                    current_part += s
+                    current_length += s_len
+                    overlap_part += s
+                    overlap_part_length += s_len
+                else:
+                    final_chunks.append(current_part)
+                    current_part = overlap_part + s
+                    current_length = s_len + overlap_part_length
+                    overlap_part = ""
+                    overlap_part_length = 0
+            if current_part:
+                final_chunks.append(current_part)
+
+        return final_chunks
@@ -0,0 +1,52 @@
+"""
+Compare the previous chunk merging of FixedRecursiveCharacterTextSplitter with the current one.
+
+The corpora stand in for the text of a large PDF: English paragraphs, which are merged word by
+word, and Chinese paragraphs without spaces, which are longer than a chunk and so are merged
+character by character. The number of chunks is reported as `chunks`.
+"""
+
+import numpy as np
+import pytest
+
+from core.rag.splitter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from tests.benchmarks.core.rag.splitter.legacy_text_splitter import LegacyFixedRecursiveCharacterTextSplitter
+
+WORDS = [f"word{i}" for i in range(5_000)]
+HANZI = [chr(code) for code in range(0x4E00, 0x4E00 + 3_000)]
+
+
+def _english_corpus(pages: int) -> str:
+    rng = np.random.default_rng(pages)
+    paragraphs = []
+    for _ in range(pages * 8):
+        sentences = [" ".join(rng.choice(WORDS, rng.integers(8, 21))) + "." for _ in range(rng.integers(2, 7))]
+        paragraphs.append(" ".join(sentences))
+    return "\n".join(paragraphs)
+
+
+def _chinese_corpus(pages: int) -> str:
+    rng = np.random.default_rng(pages)
+    paragraphs = ["".join(rng.choice(HANZI, rng.integers(600, 2_401))) for _ in range(pages)]
+    return "\n".join(paragraphs)
+
+
+def _splitter(implementation: str) -> FixedRecursiveCharacterTextSplitter:
+    cls = (
+        LegacyFixedRecursiveCharacterTextSplitter if implementation == "legacy" else FixedRecursiveCharacterTextSplitter
+    )
+    return cls.from_encoder(embedding_model_instance=None, chunk_size=500, chunk_overlap=50, fixed_separator="\n\n")
+
+
+@pytest.mark.parametrize("pages", [50, 500])
+@pytest.mark.parametrize("corpus", ["english", "chinese"])
+@pytest.mark.parametrize("implementation", ["legacy", "current"])
+def test_split_text(benchmark, implementation, corpus, pages):
+    text = _english_corpus(pages) if corpus == "english" else _chinese_corpus(pages)
+    splitter = _splitter(implementation)
+    benchmark.group = f"split text ({corpus}, {pages} pages)"
+
+    chunks = benchmark.pedantic(splitter.split_text, args=(text,), rounds=3, iterations=1)
+
+    assert chunks == _splitter("legacy").split_text(text)
+    benchmark.extra_info["chunks"] = len(chunks)
@@ -0,0 +1,57 @@
+"""
+Compare deep-copying the variable pool per iteration run with copy-on-write forks.
+
+Every run copies a pool that already holds the upstream outputs, writes the loop variables and
+its own output, and stays alive until the iteration finishes, like parallel iteration runs do.
+The peak of Python allocations during an iteration is reported as `peak_allocated_bytes`.
+"""
+
+import tracemalloc
+from copy import deepcopy
+
+import pytest
+
+from core.variables import StringSegment
+from core.workflow.entities.variable_pool import VariablePool
+
+UPSTREAM_NODES = 20
+UPSTREAM_OUTPUTS_PER_NODE = 10
+
+
+def _build_pool() -> VariablePool:
+    pool = VariablePool(system_variables={}, user_inputs={})
+    for node_index in range(UPSTREAM_NODES):
+        for output_index in range(UPSTREAM_OUTPUTS_PER_NODE):
+            pool.add((f"node_{node_index}", f"output_{output_index}"), StringSegment(value="x" * 256))
+    return pool
+
+
+def _run_iteration(pool: VariablePool, items: int, strategy: str) -> list[VariablePool]:
+    runs = []
+    for index in range(items):
+        run_pool = deepcopy(pool) if strategy == "deepcopy" else pool.fork()
+        run_pool.add(("iteration", "index"), StringSegment(value=str(index)))
+        run_pool.add(("iteration", "item"), StringSegment(value=f"item {index}"))
+        run_pool.add(("llm", "text"), StringSegment(value=f"answer {index}"))
+        runs.append(run_pool)
+    return runs
+
+
+@pytest.mark.parametrize("items", [100, 1_000, 10_000])
+@pytest.mark.parametrize("strategy", ["deepcopy", "fork"])
+def test_iteration(benchmark, strategy, items):
+    pool = _build_pool()
+    benchmark.group = f"variable pool per iteration run ({items} items)"
+
+    tracemalloc.start()
+    try:
+        runs = _run_iteration(pool, items, strategy)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del runs
+    benchmark.extra_info["peak_allocated_bytes"] = peak
+
+    runs = benchmark.pedantic(_run_iteration, args=(pool, items, strategy), rounds=3, iterations=1)
+    assert len(runs) == items
+    assert runs[-1].get(("node_0", "output_0")).value == "x" * 256
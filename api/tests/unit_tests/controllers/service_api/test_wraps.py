@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from werkzeug.exceptions import Unauthorized
+
+from controllers.service_api import wraps
+from controllers.service_api.wraps import validate_dataset_token
+from models.account import Account, Tenant, TenantStatus
+from models.model import ApiToken
+
+
+@pytest.fixture
+def api_token():
+    api_token = ApiToken(id="token-id", tenant_id="tenant-1", type="dataset")
+    with (
+        patch.object(wraps, "validate_and_get_api_token", return_value=api_token),
+        patch.object(wraps, "current_app"),
+        patch.object(wraps, "user_logged_in"),
+        patch.object(wraps, "_get_user"),
+    ):
+        yield api_token
+
+
+def _mock_db(tenant, account):
+    mock_db = MagicMock()
+    records = {Tenant: tenant, Account: account}
+    mock_db.session.query.side_effect = lambda model: MagicMock(
+        **{"filter.return_value.first.return_value": records[model]}
+    )
+    return mock_db
+
+
+@validate_dataset_token
+def _view(tenant_id):
+    return tenant_id
+
+
+def test_dataset_token_with_cached_tenant_owner_logs_in_the_owner(api_token):
+    tenant = Tenant(id="tenant-1", status=TenantStatus.NORMAL)
+    # the current_tenant setter loads the role of the account
+    account = MagicMock(spec=Account)
+
+    with (
+        patch.object(wraps, "db", _mock_db(tenant, account)),
+        patch.object(wraps.api_token_cache, "get_tenant_owner", return_value={"account_id": "account-1"}),
+    ):
+        assert _view() == "tenant-1"
+
+    assert account.current_tenant is tenant
+
+
+def test_dataset_token_with_cached_tenant_owner_of_archived_tenant_is_rejected(api_token):
+    # archived workspaces are filtered out by the query
+    with (
+        patch.object(wraps, "db", _mock_db(None, Account(id="account-1"))),
+        patch.object(wraps.api_token_cache, "get_tenant_owner", return_value={"account_id": "account-1"}),
+        pytest.raises(Unauthorized),
+    ):
+        _view()
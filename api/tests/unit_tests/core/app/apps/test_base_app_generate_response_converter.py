@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+from core.app.apps.base_app_generate_response_converter import AppGenerateResponseConverter
+from core.app.entities.task_entities import (
+    ChatbotAppStreamResponse,
+    MessageEndStreamResponse,
+    MessageStreamResponse,
+)
+
+
+def _chunk(answer: str, message_id: str = "message-1") -> ChatbotAppStreamResponse:
+    return ChatbotAppStreamResponse(
+        conversation_id="conversation-1",
+        message_id=message_id,
+        created_at=1700000000,
+        stream_response=MessageStreamResponse(task_id="task-1", id=message_id, answer=answer),
+    )
+
+
+def _end(message_id: str = "message-1") -> ChatbotAppStreamResponse:
+    return ChatbotAppStreamResponse(
+        conversation_id="conversation-1",
+        message_id=message_id,
+        created_at=1700000000,
+        stream_response=MessageEndStreamResponse(task_id="task-1", id=message_id),
+    )
+
+
+def _answers(chunks) -> list:
+    return [
+        chunk.stream_response.answer if isinstance(chunk.stream_response, MessageStreamResponse) else "<end>"
+        for chunk in chunks
+    ]
+
+
+def test_chunks_within_the_window_are_merged():
+    chunks = [_chunk("Hel"), _chunk("lo"), _chunk(" world"), _end()]
+
+    coalesced = list(AppGenerateResponseConverter._coalesce_message_chunks(iter(chunks), window=60))
+
+    assert _answers(coalesced) == ["Hello world", "<end>"]
+    assert coalesced[0].message_id == "message-1"
+
+
+def test_chunks_are_sent_once_the_window_has_passed():
+    chunks = [_chunk("a"), _chunk("b"), _chunk("c"), _chunk("d")]
+
+    with patch("core.app.apps.base_app_generate_response_converter.time.monotonic", side_effect=[0, 0.01, 0.03, 0.04]):
+        coalesced = list(AppGenerateResponseConverter._coalesce_message_chunks(iter(chunks), window=0.02))
+
+    assert _answers(coalesced) == ["abc", "d"]
+
+
+def test_chunks_of_different_messages_are_not_merged():
+    chunks = [_chunk("a"), _chunk("b", message_id="message-2"), _end("message-2")]
+
+    coalesced = list(AppGenerateResponseConverter._coalesce_message_chunks(iter(chunks), window=60))
+
+    assert _answers(coalesced) == ["a", "b", "<end>"]
@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from core.app.apps.base_app_queue_manager import GenerateTaskStoppedError, PublishFrom
+from core.app.apps.workflow.app_queue_manager import WorkflowAppQueueManager
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import QueueNodeSucceededEvent, QueueStopEvent, QueueTextChunkEvent
+from core.workflow.nodes.base.entities import BaseNodeData
+from core.workflow.nodes.enums import NodeType
+from extensions.ext_redis import redis_client
+from models.account import Account
+
+
+class _NodeData(BaseNodeData):
+    extra: Any = None
+
+
+def _node_succeeded_event(**kwargs) -> QueueNodeSucceededEvent:
+    return QueueNodeSucceededEvent(
+        node_execution_id="node_execution_id",
+        node_id="node_id",
+        node_type=NodeType.CODE,
+        start_at=datetime.now(),
+        **kwargs,
+    )
+
+
+def _create_queue_manager() -> WorkflowAppQueueManager:
+    return WorkflowAppQueueManager(
+        task_id="task_id", user_id="user_id", invoke_from=InvokeFrom.SERVICE_API, app_mode="workflow"
+    )
+
+
+def test_listen_checks_stop_flag_once_per_interval():
+    queue_manager = _create_queue_manager()
+    for i in range(100):
+        queue_manager._q.put(QueueTextChunkEvent(text=str(i)))  # type: ignore[arg-type]
+    queue_manager.stop_listen()
+
+    with patch.object(WorkflowAppQueueManager, "_is_stopped", return_value=False) as mock_is_stopped:
+        messages = list(queue_manager.listen())
+
+    assert len(messages) == 100
+    assert mock_is_stopped.call_count == 1
+
+
+def test_listen_stops_when_stop_flag_is_set():
+    queue_manager = _create_queue_manager()
+
+    with patch.object(WorkflowAppQueueManager, "_is_stopped", return_value=True):
+        messages = list(queue_manager.listen())
+
+    assert [type(message.event) for message in messages] == [QueueStopEvent]
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        _node_succeeded_event(node_data=_NodeData(title="code"), outputs={"result": [Account()]}),
+        _node_succeeded_event(node_data=_NodeData(title="code", extra={"account": Account()})),
+    ],
+    ids=["any_field", "node_data_subclass_field"],
+)
+def test_publish_rejects_sqlalchemy_models(event):
+    queue_manager = _create_queue_manager()
+
+    with pytest.raises(TypeError):
+        queue_manager.publish(event, PublishFrom.TASK_PIPELINE)
+
+
+def test_publish_accepts_plain_values():
+    queue_manager = _create_queue_manager()
+
+    queue_manager.publish(
+        _node_succeeded_event(node_data=_NodeData(title="code", extra=[1, "a"]), outputs={"result": {"a": [1.0]}}),
+        PublishFrom.TASK_PIPELINE,
+    )
+
+    assert queue_manager._q.qsize() == 1
+
+
+def test_stop_flag_is_read_from_redis_once_per_interval():
+    queue_manager = _create_queue_manager()
+
+    for _ in range(100):
+        queue_manager.publish(QueueTextChunkEvent(text="chunk"), PublishFrom.APPLICATION_MANAGER)
+    assert redis_client.get.call_count == 1
+
+    redis_client.get.return_value = b"1"
+    queue_manager._stop_flag_checked_at -= WorkflowAppQueueManager._STOP_FLAG_CHECK_INTERVAL
+    with pytest.raises(GenerateTaskStoppedError):
+        queue_manager.publish(QueueTextChunkEvent(text="chunk"), PublishFrom.APPLICATION_MANAGER)
+
+    redis_client.get.return_value = None
+    with pytest.raises(GenerateTaskStoppedError):
+        queue_manager.publish(QueueTextChunkEvent(text="chunk"), PublishFrom.APPLICATION_MANAGER)
+    assert redis_client.get.call_count == 2
@@ -0,0 +1,80 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from core.app.apps import sse_encoder
+from core.app.apps.sse_encoder import SSEEncoder, dumps_json
+from core.app.entities.task_entities import MessageStreamResponse
+from core.model_runtime.utils.encoders import jsonable_encoder
+
+
+def _message(answer: str, **kwargs) -> dict:
+    message = {
+        "event": "message",
+        "conversation_id": "conversation-1",
+        "message_id": "message-1",
+        "created_at": 1700000000,
+        "task_id": "task-1",
+        "id": "message-1",
+        "answer": answer,
+        "from_variable_selector": None,
+    }
+    message.update(kwargs)
+    return message
+
+
+def _decode(frame: str) -> dict:
+    assert frame.startswith("data: ")
+    assert frame.endswith("\n\n")
+    return json.loads(frame[len("data: ") : -2])
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def json_backend(request):
+    if request.param == "stdlib":
+        with patch.object(sse_encoder, "orjson", None):
+            yield request.param
+    else:
+        yield request.param
+
+
+def test_dumps_json_falls_back_to_the_encoder_for_other_types(json_backend):
+    assert json.loads(dumps_json({"tags": {"a"}, "text": "你好"})) == {"tags": ["a"], "text": "你好"}
+
+
+def test_message_events_reuse_the_envelope(json_backend):
+    encoder = SSEEncoder()
+    answers = ["Hello", ", ", 'wor"ld', "\n", "你好", "\x00answer\x00"]
+
+    frames = [encoder.encode(_message(answer)) for answer in answers]
+
+    assert [_decode(frame) for frame in frames] == [_message(answer) for answer in answers]
+    with patch.object(sse_encoder, "dumps_json", wraps=sse_encoder.dumps_json) as dumps:
+        encoder.encode(_message("!"))
+    # only the answer is serialized
+    dumps.assert_called_once_with("!")
+
+
+def test_changed_envelope_is_serialized_again(json_backend):
+    encoder = SSEEncoder()
+    encoder.encode(_message("Hello"))
+
+    assert _decode(encoder.encode(_message("Hi", message_id="message-2"))) == _message("Hi", message_id="message-2")
+    assert _decode(encoder.encode(_message("Hi", extra=1))) == _message("Hi", extra=1)
+    assert _decode(encoder.encode(_message("Hi"))) == _message("Hi")
+
+
+def test_other_events(json_backend):
+    encoder = SSEEncoder()
+
+    assert encoder.encode("ping") == "event: ping\n\n"
+    assert _decode(encoder.encode({"event": "message_end", "metadata": {}})) == {"event": "message_end", "metadata": {}}
+
+
+def test_message_stream_response_to_dict_matches_the_generic_encoder():
+    response = MessageStreamResponse(task_id="task-1", id="message-1", answer="Hi", from_variable_selector=["a", "b"])
+
+    assert response.to_dict() == jsonable_encoder(response)
+    response = MessageStreamResponse(task_id="task-1", id="message-1", answer="Hi")
+    assert response.to_dict() == jsonable_encoder(response)
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from core.app.features.rate_limiting.rate_limit import RateLimit
+from core.errors.error import AppInvokeQuotaExceededError
+
+
+@pytest.fixture
+def fake_redis():
+    # runs the Lua script of enter, see _ENTER_SCRIPT
+    fake_redis = fakeredis.FakeRedis()
+    with (
+        patch("core.app.features.rate_limiting.rate_limit.redis_client", fake_redis),
+        patch.object(RateLimit, "_instance_dict", {}),
+        patch.object(RateLimit, "_enter_script", None),
+    ):
+        yield fake_redis
+
+
+def _active_requests(fake_redis, rate_limit: RateLimit) -> set[str]:
+    return {request_id.decode() for request_id in fake_redis.zrange(rate_limit.active_requests_key, 0, -1)}
+
+
+def test_requests_under_the_limit_are_admitted(fake_redis):
+    rate_limit = RateLimit("app-1", max_active_requests=2)
+
+    assert rate_limit.enter("request-1") == "request-1"
+    assert rate_limit.enter("request-2") == "request-2"
+    assert _active_requests(fake_redis, rate_limit) == {"request-1", "request-2"}
+    assert 0 < fake_redis.ttl(rate_limit.active_requests_key) <= RateLimit._ACTIVE_REQUESTS_KEY_TTL
+
+
+def test_requests_at_the_limit_are_rejected(fake_redis):
+    rate_limit = RateLimit("app-1", max_active_requests=2)
+    rate_limit.enter("request-1")
+    rate_limit.enter("request-2")
+
+    with pytest.raises(AppInvokeQuotaExceededError):
+        rate_limit.enter("request-3")
+    assert _active_requests(fake_redis, rate_limit) == {"request-1", "request-2"}
+
+
+def test_stale_requests_are_evicted(fake_redis):
+    rate_limit = RateLimit("app-1", max_active_requests=2)
+    # patch the clock of the rate limit only, fake redis expires keys by the real one
+    with patch("core.app.features.rate_limiting.rate_limit.time") as mock_time:
+        mock_time.time.return_value = 1_000.0
+        rate_limit.enter("request-1")
+        mock_time.time.return_value = 1_001.0
+        rate_limit.enter("request-2")
+
+        # request-1 is exactly the max alive time old, request-2 is not yet
+        mock_time.time.return_value = 1_000.0 + RateLimit._REQUEST_MAX_ALIVE_TIME
+        assert rate_limit.enter("request-3") == "request-3"
+        with pytest.raises(AppInvokeQuotaExceededError):
+            rate_limit.enter("request-4")
+
+    assert _active_requests(fake_redis, rate_limit) == {"request-2", "request-3"}
+
+
+def test_exit_releases_the_slot(fake_redis):
+    rate_limit = RateLimit("app-1", max_active_requests=1)
+    rate_limit.enter("request-1")
+
+    rate_limit.exit("request-1")
+
+    assert rate_limit.enter("request-2") == "request-2"
+    assert _active_requests(fake_redis, rate_limit) == {"request-2"}
+
+
+def test_max_active_requests_are_shared_through_redis(fake_redis):
+    rate_limit = RateLimit("app-1", max_active_requests=1)
+    fake_redis.setex(rate_limit.max_active_requests_key, 60, 2)
+    rate_limit.flush_cache()
+
+    rate_limit.enter("request-1")
+    assert rate_limit.enter("request-2") == "request-2"
+
+
+def test_disabled_rate_limit_admits_every_request(fake_redis):
+    rate_limit = RateLimit("app-1", max_active_requests=0)
+
+    assert rate_limit.enter() == RateLimit._UNLIMITED_REQUEST_ID
+    rate_limit.exit(RateLimit._UNLIMITED_REQUEST_ID)
+    assert fake_redis.keys() == []
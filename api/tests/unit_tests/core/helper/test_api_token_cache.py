@@ -0,0 +1,84 @@
+import json
+from unittest.mock import patch
+
+from celery import _state  # type: ignore
+
+from core.helper.api_token_cache import ApiTokenCache, ApiTokenUsageRecorder
+from dify_app import DifyApp
+from extensions import ext_celery
+from extensions.ext_redis import redis_client
+
+
+def test_api_token_is_served_locally_after_redis_hit():
+    cache = ApiTokenCache(ttl=600, local_ttl=10)
+    api_token = {"id": "token-id", "app_id": "app-id", "tenant_id": "tenant-id", "type": "app"}
+    redis_client.get.return_value = json.dumps(api_token).encode()
+
+    assert cache.get_api_token("app", "app-secret") == api_token
+    assert cache.get_api_token("app", "app-secret") == api_token
+
+    redis_client.get.assert_called_once()
+    key = redis_client.get.call_args.args[0]
+    assert key.startswith("api_token:app:")
+    assert "app-secret" not in key
+
+
+def test_api_token_miss():
+    cache = ApiTokenCache(ttl=600, local_ttl=10)
+
+    assert cache.get_api_token("app", "app-secret") is None
+
+
+def test_delete_api_token_invalidates_both_levels():
+    cache = ApiTokenCache(ttl=600, local_ttl=10)
+    cache.set_api_token("app", "app-secret", {"id": "token-id"})
+    key = redis_client.setex.call_args.args[0]
+
+    cache.delete_api_token("app", "app-secret")
+
+    redis_client.delete.assert_called_once_with(key)
+    assert cache.get_api_token("app", "app-secret") is None
+
+
+def test_tenant_owner_set_and_delete():
+    cache = ApiTokenCache(ttl=600, local_ttl=10)
+    cache.set_tenant_owner("tenant-id", {"account_id": "account-id"})
+
+    assert cache.get_tenant_owner("tenant-id") == {"account_id": "account-id"}
+    redis_client.get.assert_not_called()
+
+    cache.delete_tenant_owner("tenant-id")
+    assert cache.get_tenant_owner("tenant-id") is None
+
+
+def test_usage_recorder_dispatches_batches_once_per_interval():
+    recorder = ApiTokenUsageRecorder(interval=60)
+
+    with (
+        patch("core.helper.api_token_cache.time.monotonic") as mock_monotonic,
+        patch.object(ApiTokenUsageRecorder, "_dispatch") as mock_dispatch,
+    ):
+        mock_monotonic.return_value = recorder._dispatched_at + 1
+        for _ in range(100):
+            recorder.record("token-1")
+        recorder.record("token-2")
+        mock_dispatch.assert_not_called()
+
+        mock_monotonic.return_value = recorder._dispatched_at + 61
+        recorder.record("token-1")
+
+        mock_dispatch.assert_called_once()
+        batch = mock_dispatch.call_args.args[0]
+        assert sorted(batch) == ["token-1", "token-2"]
+
+        mock_monotonic.return_value += 1
+        recorder.record("token-1")
+        assert recorder._pending == {}
+
+
+def test_last_used_task_is_registered_on_the_celery_app():
+    # the worker loads the cache with the controllers and services, which registers the task
+    with patch.object(_state, "default_app"):
+        celery_app = ext_celery.init_app(DifyApp(__name__))
+
+        assert "tasks.update_api_tokens_last_used_task.update_api_tokens_last_used_task" in celery_app.tasks
@@ -0,0 +1,149 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.entities.provider_configuration import ProviderConfiguration, ProviderConfigurations
+from core.entities.provider_entities import CustomConfiguration, CustomProviderConfiguration, SystemConfiguration
+from core.helper.provider_configurations_cache import ProviderConfigurationsCache
+from core.model_runtime.entities.common_entities import I18nObject
+from core.model_runtime.entities.model_entities import ModelType
+from core.model_runtime.entities.provider_entities import ConfigurateMethod, ProviderEntity
+from core.provider_manager import ProviderManager
+from extensions.ext_redis import redis_client
+from models.provider import ProviderType
+
+
+@pytest.fixture
+def redis_versions():
+    versions: dict[str, bytes] = {}
+    redis_client.get.side_effect = versions.get
+    redis_client.setnx.side_effect = lambda key, value: versions.setdefault(key, value.encode())
+    redis_client.set.side_effect = lambda key, value: versions.__setitem__(key, value.encode())
+    yield versions
+    redis_client.get.side_effect = None
+    redis_client.setnx.side_effect = None
+    redis_client.set.side_effect = None
+
+
+@pytest.fixture
+def cache(redis_versions):
+    cache = ProviderConfigurationsCache(maxsize=10, ttl=60)
+    with patch("core.provider_manager.provider_configurations_cache", cache):
+        yield cache
+
+
+def _configurations(tenant_id: str, api_key: str) -> ProviderConfigurations:
+    configurations = ProviderConfigurations(tenant_id=tenant_id)
+    configurations["langgenius/openai/openai"] = ProviderConfiguration(
+        tenant_id=tenant_id,
+        provider=ProviderEntity(
+            provider="langgenius/openai/openai",
+            label=I18nObject(en_US="OpenAI"),
+            supported_model_types=[ModelType.LLM],
+            configurate_methods=[ConfigurateMethod.PREDEFINED_MODEL],
+        ),
+        preferred_provider_type=ProviderType.CUSTOM,
+        using_provider_type=ProviderType.CUSTOM,
+        system_configuration=SystemConfiguration(enabled=False),
+        custom_configuration=CustomConfiguration(
+            provider=CustomProviderConfiguration(credentials={"openai_api_key": api_key})
+        ),
+        model_settings=[],
+    )
+    return configurations
+
+
+def _api_key(configurations: ProviderConfigurations) -> str:
+    return configurations["openai"].custom_configuration.provider.credentials["openai_api_key"]
+
+
+def test_cached_configurations_are_copies(cache):
+    version = cache.get_version("tenant-1")
+    cache.set("tenant-1", version, _configurations("tenant-1", "key-1"))
+
+    cached = cache.get("tenant-1", version)
+    cached["openai"].custom_configuration.provider.credentials["openai_api_key"] = "changed"
+
+    assert _api_key(cache.get("tenant-1", version)) == "key-1"
+
+
+def test_invalidate_changes_the_version(cache):
+    version = cache.get_version("tenant-1")
+    cache.set("tenant-1", version, _configurations("tenant-1", "key-1"))
+
+    cache.invalidate("tenant-1")
+
+    assert cache.get_version("tenant-1") != version
+    assert cache.get("tenant-1", version) is None
+    assert cache.get("tenant-1", cache.get_version("tenant-1")) is None
+
+
+def test_configurations_built_at_an_outdated_version_are_not_used(cache):
+    version = cache.get_version("tenant-1")
+    # the records change while the configurations are built
+    cache.invalidate("tenant-1")
+    cache.set("tenant-1", version, _configurations("tenant-1", "key-1"))
+
+    assert cache.get("tenant-1", cache.get_version("tenant-1")) is None
+
+
+def test_cache_is_disabled_without_ttl(redis_versions):
+    cache = ProviderConfigurationsCache(maxsize=10, ttl=0)
+    cache.set("tenant-1", "version", _configurations("tenant-1", "key-1"))
+
+    assert not cache.enabled
+    assert cache.get("tenant-1", "version") is None
+
+
+def test_provider_manager_serves_cached_configurations(cache):
+    cache.set("tenant-1", cache.get_version("tenant-1"), _configurations("tenant-1", "key-1"))
+
+    with patch.object(ProviderManager, "_get_all_providers", side_effect=RuntimeError("queried")) as get_all_providers:
+        assert _api_key(ProviderManager().get_configurations("tenant-1")) == "key-1"
+        get_all_providers.assert_not_called()
+
+        # services changing provider records always build the configurations
+        with pytest.raises(RuntimeError, match="queried"):
+            ProviderManager(use_cache=False).get_configurations("tenant-1")
+
+        cache.invalidate("tenant-1")
+        with pytest.raises(RuntimeError, match="queried"):
+            ProviderManager().get_configurations("tenant-1")
+
+
+def test_provider_manager_rebuilds_configurations_without_the_provider(cache):
+    version = cache.get_version("tenant-1")
+    cache.set("tenant-1", version, ProviderConfigurations(tenant_id="tenant-1"))
+
+    # the provider may have been installed after the configurations were cached
+    with (
+        patch.object(
+            ProviderManager, "_build_configurations", return_value=_configurations("tenant-1", "key-1")
+        ) as build_configurations,
+        patch.object(ProviderConfiguration, "get_model_type_instance"),
+        patch("core.provider_manager.ProviderModelBundle") as provider_model_bundle,
+    ):
+        ProviderManager().get_provider_model_bundle("tenant-1", "openai", ModelType.LLM)
+
+    configuration = provider_model_bundle.call_args.kwargs["configuration"]
+    assert configuration.provider.provider == "langgenius/openai/openai"
+    build_configurations.assert_called_once_with("tenant-1")
+    # the rebuilt configurations are cached by this process, other processes keep theirs
+    assert cache.get_version("tenant-1") == version
+    assert _api_key(cache.get("tenant-1", version)) == "key-1"
+
+
+def test_provider_manager_rebuilds_configurations_once_for_a_missing_provider(cache):
+    version = cache.get_version("tenant-1")
+    cache.set("tenant-1", version, ProviderConfigurations(tenant_id="tenant-1"))
+
+    with (
+        patch.object(
+            ProviderManager, "_build_configurations", return_value=ProviderConfigurations(tenant_id="tenant-1")
+        ) as build_configurations,
+        pytest.raises(ValueError, match="does not exist"),
+    ):
+        ProviderManager().get_provider_model_bundle("tenant-1", "openai", ModelType.LLM)
+
+    build_configurations.assert_called_once_with("tenant-1")
+    assert cache.get_version("tenant-1") == version
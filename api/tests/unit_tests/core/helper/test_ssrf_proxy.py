@@ -1,9 +1,10 @@
 import secrets
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
-from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request
+from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, get_client, make_request
 
 
 @patch("httpx.Client.request")
@@ -50,3 +51,19 @@ def test_retry_logic_success(mock_request):
     assert response.status_code == 200
     assert mock_request.call_count == SSRF_DEFAULT_MAX_RETRIES + 1
     assert mock_request.call_args_list[0][1].get("method") == "GET"
+
+
+def test_client_is_reused_per_configuration():
+    assert get_client(ssl_verify=True) is get_client(ssl_verify=True)
+    assert get_client(ssl_verify=True) is not get_client(ssl_verify=False)
+
+
+def test_client_does_not_keep_cookies():
+    client = get_client(ssl_verify=True)
+    response = httpx.Response(
+        200, headers={"set-cookie": "session=secret; Path=/"}, request=httpx.Request("GET", "http://example.com")
+    )
+
+    client.cookies.extract_cookies(response)
+
+    assert not client.cookies
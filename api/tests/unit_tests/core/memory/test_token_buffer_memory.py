@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.memory.token_buffer_memory import TokenBufferMemory
+from core.model_runtime.entities import AssistantPromptMessage, UserPromptMessage
+
+
+def _create_memory(token_counter) -> TokenBufferMemory:
+    model_instance = MagicMock()
+    model_instance.get_llm_num_tokens.side_effect = token_counter
+    return TokenBufferMemory(conversation=MagicMock(), model_instance=model_instance)
+
+
+def _count_tokens(prompt_messages) -> int:
+    return sum(len(str(m.content)) + 3 for m in prompt_messages) + 3
+
+
+def _prune_one_by_one(prompt_messages, max_token_limit):
+    prompt_messages = list(prompt_messages)
+    while _count_tokens(prompt_messages) > max_token_limit and len(prompt_messages) > 1:
+        prompt_messages.pop(0)
+    return prompt_messages
+
+
+def _history(size: int):
+    messages = []
+    for i in range(size):
+        messages.append(UserPromptMessage(content="q" * (i % 7 + 1)))
+        messages.append(AssistantPromptMessage(content="a" * (i % 13 + 5)))
+    return messages
+
+
+@pytest.mark.parametrize("max_token_limit", [0, 1, 20, 100, 1000, 10**6])
+@pytest.mark.parametrize("size", [1, 2, 50, 500])
+def test_prune_prompt_messages_matches_one_by_one_pruning(size, max_token_limit):
+    prompt_messages = _history(size)
+    memory = _create_memory(_count_tokens)
+
+    pruned = memory._prune_prompt_messages(prompt_messages, max_token_limit)
+
+    assert pruned == _prune_one_by_one(prompt_messages, max_token_limit)
+
+
+def test_prune_prompt_messages_counts_tokens_logarithmically():
+    prompt_messages = _history(500)
+    memory = _create_memory(_count_tokens)
+
+    memory._prune_prompt_messages(prompt_messages, 2000)
+
+    assert memory.model_instance.get_llm_num_tokens.call_count <= 12
+
+
+def test_prune_prompt_messages_keeps_single_message():
+    prompt_messages = [UserPromptMessage(content="a very long message")]
+    memory = _create_memory(_count_tokens)
+
+    assert memory._prune_prompt_messages(prompt_messages, 1) == prompt_messages
@@ -0,0 +1,124 @@
+import gzip
+import json
+import queue
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import BaseModel
+
+from core.ops.entities.config_entity import OPS_FILE_PATH
+from core.ops.ops_trace_manager import OpsTraceManager, TraceQueueManager
+from tasks.ops_trace_task import process_trace_tasks
+
+
+class _TraceInfo(BaseModel):
+    message_id: str
+
+
+def _trace_task(app_id: str, message_id: str) -> MagicMock:
+    task = MagicMock(app_id=app_id)
+    task.execute.return_value = _TraceInfo(message_id=message_id)
+    return task
+
+
+def _serialized_trace(app_id: str, message_id: str) -> str:
+    return json.dumps({"app_id": app_id, "trace_info_type": "_TraceInfo", "trace_info": {"message_id": message_id}})
+
+
+@pytest.fixture
+def manager(app):
+    manager = TraceQueueManager.__new__(TraceQueueManager)
+    manager.app_id = "app-1"
+    manager.user_id = None
+    manager.trace_instance = MagicMock()
+    manager.flask_app = app
+    with patch.object(TraceQueueManager, "start_timer"):
+        yield manager
+
+
+@pytest.fixture
+def trace_instances():
+    instances = {"app-1": MagicMock(), "app-2": MagicMock()}
+
+    def get_ops_trace_instance(app_id):
+        if app_id not in instances:
+            raise ValueError(f"app {app_id} not found")
+        return instances[app_id]
+
+    with patch.object(OpsTraceManager, "get_ops_trace_instance", side_effect=get_ops_trace_instance):
+        yield instances
+
+
+def test_small_batches_are_sent_inline(manager):
+    with (
+        patch("core.ops.ops_trace_manager.process_trace_tasks") as task,
+        patch("core.ops.ops_trace_manager.storage") as storage,
+    ):
+        manager.send_to_celery([_trace_task("app-1", "message-1"), _trace_task("app-1", "message-2")])
+
+    traces = task.delay.call_args.args[0]["traces"]
+    assert [json.loads(trace)["trace_info"]["message_id"] for trace in traces] == ["message-1", "message-2"]
+    task.delay.assert_called_once()
+    storage.save.assert_not_called()
+
+
+def test_large_batches_are_spooled_to_one_compressed_file(manager):
+    with (
+        patch("core.ops.ops_trace_manager.trace_manager_inline_payload_limit", 10),
+        patch("core.ops.ops_trace_manager.process_trace_tasks") as task,
+        patch("core.ops.ops_trace_manager.storage") as storage,
+    ):
+        manager.send_to_celery([_trace_task("app-1", "message-1"), _trace_task("app-1", "message-2")])
+
+    file_path, content = storage.save.call_args.args
+    assert file_path.startswith(f"{OPS_FILE_PATH}batches/")
+    assert file_path.endswith(".jsonl.gz")
+    lines = gzip.decompress(content).decode().splitlines()
+    assert [json.loads(line)["trace_info"]["message_id"] for line in lines] == ["message-1", "message-2"]
+    task.delay.assert_called_once_with({"batch_file_path": file_path})
+
+
+def test_traces_are_dropped_when_the_queue_is_full(manager):
+    with patch("core.ops.ops_trace_manager.trace_manager_queue", queue.Queue(maxsize=1)) as trace_queue:
+        manager.add_trace_task(_trace_task("app-1", "message-1"))
+        manager.add_trace_task(_trace_task("app-1", "message-2"))
+
+        assert trace_queue.qsize() == 1
+
+
+def test_inline_traces_are_processed(trace_instances):
+    process_trace_tasks({"traces": [_serialized_trace("app-1", "message-1"), _serialized_trace("app-2", "message-2")]})
+
+    assert trace_instances["app-1"].trace.call_args.args[0] == {"message_id": "message-1"}
+    assert trace_instances["app-2"].trace.call_args.args[0] == {"message_id": "message-2"}
+
+
+def test_batch_files_are_processed_and_deleted(trace_instances):
+    lines = "\n".join([_serialized_trace("app-1", "message-1"), _serialized_trace("app-1", "message-2")])
+    with patch("tasks.ops_trace_task.storage") as storage:
+        storage.load.return_value = gzip.compress(lines.encode())
+
+        process_trace_tasks({"batch_file_path": f"{OPS_FILE_PATH}batches/batch.jsonl.gz"})
+
+    storage.load.assert_called_once_with(f"{OPS_FILE_PATH}batches/batch.jsonl.gz")
+    storage.delete.assert_called_once_with(f"{OPS_FILE_PATH}batches/batch.jsonl.gz")
+    assert trace_instances["app-1"].trace.call_count == 2
+
+
+def test_single_trace_files_of_earlier_versions_are_processed(trace_instances):
+    with patch("tasks.ops_trace_task.storage") as storage:
+        storage.load.return_value = _serialized_trace("app-1", "message-1").encode()
+
+        process_trace_tasks({"app_id": "app-1", "file_id": "file-1"})
+
+    storage.load.assert_called_once_with(f"{OPS_FILE_PATH}app-1/file-1.json")
+    storage.delete.assert_called_once_with(f"{OPS_FILE_PATH}app-1/file-1.json")
+    trace_instances["app-1"].trace.assert_called_once()
+
+
+def test_a_failing_app_does_not_abort_the_batch(trace_instances):
+    process_trace_tasks(
+        {"traces": [_serialized_trace("deleted-app", "message-1"), _serialized_trace("app-1", "message-2")]}
+    )
+
+    trace_instances["app-1"].trace.assert_called_once()
@@ -0,0 +1,40 @@
+from unittest.mock import MagicMock, patch
+
+from core.plugin.impl import base
+from core.plugin.impl.base import BasePluginClient, PluginDaemonClientStats
+
+
+def test_endpoint_replaces_id_segments():
+    endpoint = PluginDaemonClientStats.endpoint(
+        "post", "plugin/0f6a1a9e-3c9b-4b8e-9a5e-1f2d3c4b5a6e/dispatch/llm/invoke"
+    )
+
+    assert endpoint == "POST /plugin/{id}/dispatch/llm/invoke"
+
+
+def test_session_is_shared_and_reset_after_fork():
+    base._reset_plugin_daemon_session()
+    session = base._get_plugin_daemon_session()
+
+    assert base._get_plugin_daemon_session() is session
+
+    base._reset_plugin_daemon_session()
+    assert base._get_plugin_daemon_session() is not session
+
+
+def test_request_uses_pooled_session_and_records_stats():
+    stats = PluginDaemonClientStats()
+    session = MagicMock()
+    session.request.return_value = MagicMock(ok=True)
+    with (
+        patch.object(base, "_get_plugin_daemon_session", return_value=session),
+        patch.object(base, "plugin_daemon_client_stats", stats),
+    ):
+        BasePluginClient()._request("GET", "plugin/tenant/management/list")
+        BasePluginClient()._request("GET", "plugin/tenant/management/list")
+
+    assert session.request.call_count == 2
+    endpoint_stats = stats.snapshot()["GET /plugin/tenant/management/list"]
+    assert endpoint_stats["requests"] == 2
+    assert endpoint_stats["in_flight"] == 0
+    assert endpoint_stats["errors"] == 0
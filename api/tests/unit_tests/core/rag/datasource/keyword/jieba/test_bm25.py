@@ -0,0 +1,82 @@
+import math
+import random
+
+import pytest
+
+from core.rag.datasource.keyword.jieba.bm25 import bm25_top_k
+
+
+def test_nodes_matching_more_keywords_rank_higher():
+    postings = {
+        "apple": {"node-1": 5, "node-2": 5, "node-3": 5},
+        "pear": {"node-2": 5},
+    }
+
+    assert bm25_top_k(postings, node_count=100, avg_node_length=5, k=3)[0] == "node-2"
+
+
+def test_rare_keywords_weigh_more_than_common_ones():
+    postings = {
+        "common": {f"node-{i}": 5 for i in range(50)},
+        "rare": {"node-rare": 5},
+    }
+
+    assert bm25_top_k(postings, node_count=100, avg_node_length=5, k=1) == ["node-rare"]
+
+
+def test_shorter_nodes_rank_higher_for_the_same_keywords():
+    postings = {"apple": {"node-long": 10, "node-short": 2}}
+
+    assert bm25_top_k(postings, node_count=100, avg_node_length=5, k=2) == ["node-short", "node-long"]
+
+
+def test_returns_at_most_k_nodes():
+    postings = {"apple": {f"node-{i}": 5 for i in range(10)}}
+
+    assert len(bm25_top_k(postings, node_count=100, avg_node_length=5, k=4)) == 4
+    assert bm25_top_k(postings, node_count=100, avg_node_length=5, k=0) == []
+    assert bm25_top_k({}, node_count=100, avg_node_length=5, k=4) == []
+
+
+def test_stale_index_stats_do_not_break_scoring():
+    # the cached stats may lag behind the index
+    postings = {"apple": {"node-1": 0, "node-2": 3}}
+
+    assert sorted(bm25_top_k(postings, node_count=0, avg_node_length=0, k=2)) == ["node-1", "node-2"]
+
+
+def _exhaustive_bm25_scores(postings, node_count, avg_node_length, k1=1.2, b=0.75):
+    scores = {}
+    for node_lengths in postings.values():
+        idf = math.log(1 + (node_count - len(node_lengths) + 0.5) / (len(node_lengths) + 0.5))
+        for node_id, node_length in node_lengths.items():
+            weight = idf * (k1 + 1) / (1 + k1 * (1 - b + b * node_length / avg_node_length))
+            scores[node_id] = scores.get(node_id, 0.0) + weight
+    return scores
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_pruned_ranking_matches_exhaustive_scoring(seed):
+    rng = random.Random(seed)  # noqa: S311
+    vocabulary = [f"keyword{i}" for i in range(30)]
+    node_keywords = {
+        f"node-{i}": set(rng.choices(vocabulary, weights=[1 / (r + 1) for r in range(30)], k=rng.randint(1, 8)))
+        for i in range(300)
+    }
+    avg_node_length = sum(len(keywords) for keywords in node_keywords.values()) / len(node_keywords)
+    query_keywords = rng.sample(vocabulary, rng.randint(1, 6))
+    postings = {
+        keyword: {node_id: len(keywords) for node_id, keywords in node_keywords.items() if keyword in keywords}
+        for keyword in query_keywords
+    }
+    k = rng.randint(1, 10)
+
+    ranked = bm25_top_k(postings, len(node_keywords), avg_node_length, k)
+
+    scores = _exhaustive_bm25_scores(
+        {keyword: node_lengths for keyword, node_lengths in postings.items() if node_lengths},
+        len(node_keywords),
+        avg_node_length,
+    )
+    expected = sorted(scores.values(), reverse=True)[:k]
+    assert [scores[node_id] for node_id in ranked] == pytest.approx(expected)
@@ -0,0 +1,196 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from core.rag.datasource.keyword.jieba import jieba as jieba_module
+from core.rag.datasource.keyword.jieba.jieba import KEYWORD_INDEX_DATA_SOURCE_TYPE, Jieba
+from core.rag.datasource.keyword.jieba.keyword_postings_cache import KeywordPostingsCache, keyword_postings_cache
+from core.rag.models.document import Document
+from models.dataset import Dataset, DatasetKeywordTable, DocumentSegment
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def _keyword_table(data_source_type: str = KEYWORD_INDEX_DATA_SOURCE_TYPE, keyword_table: str = ""):
+    return DatasetKeywordTable(dataset_id="dataset-1", keyword_table=keyword_table, data_source_type=data_source_type)
+
+
+def _dataset(keyword_table=None) -> Dataset:
+    dataset = MagicMock(spec=Dataset)
+    dataset.id = "dataset-1"
+    dataset.tenant_id = "tenant-1"
+    dataset.dataset_keyword_table = keyword_table
+    return dataset
+
+
+@pytest.fixture(autouse=True)
+def _reset_module_state():
+    jieba_module._keyword_index_dataset_ids.clear()
+    keyword_postings_cache.clear()
+    yield
+    jieba_module._keyword_index_dataset_ids.clear()
+    keyword_postings_cache.clear()
+
+
+@pytest.fixture
+def mock_db():
+    with patch.object(jieba_module, "db") as mock_db:
+        mock_db.session.query.return_value.filter.return_value.first.return_value = None
+        yield mock_db
+
+
+def _executed_sql(mock_db) -> list[str]:
+    return [_compile(call.args[0]) for call in mock_db.session.execute.call_args_list]
+
+
+class TestKeywordPostingsCache:
+    def test_entries_are_only_valid_for_their_version(self):
+        cache = KeywordPostingsCache(max_postings=100)
+        cache.set_many("dataset-1", "v1", {"apple": {"node-1": 3}})
+
+        assert cache.get_many("dataset-1", "v1", ["apple", "pear"]) == ({"apple": {"node-1": 3}}, ["pear"])
+        assert cache.get_many("dataset-1", "v2", ["apple"]) == ({}, ["apple"])
+
+    def test_posting_lists_larger_than_the_cache_are_not_cached(self):
+        cache = KeywordPostingsCache(max_postings=3)
+        cache.set_many("dataset-1", "v1", {"apple": {"node-1": 1, "node-2": 1, "node-3": 1}})
+
+        assert cache.get_many("dataset-1", "v1", ["apple"]) == ({}, ["apple"])
+
+
+class TestJiebaIncrementalIndex:
+    def test_add_texts_inserts_only_the_new_postings(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+        texts = [
+            Document(page_content="apple pear", metadata={"doc_id": "node-1"}),
+            Document(page_content="apple", metadata={"doc_id": "node-2"}),
+        ]
+
+        with patch.object(keyword_postings_cache, "bump_version") as bump_version:
+            jieba.add_texts(texts, keywords_list=[["apple", "pear"], ["apple"]])
+
+        insert_stmt, update_stmt = (call.args[0] for call in mock_db.session.execute.call_args_list)
+        insert_sql = _compile(insert_stmt)
+        assert insert_sql.startswith("INSERT INTO dataset_keywords")
+        assert "ON CONFLICT (dataset_id, keyword, index_node_id) DO NOTHING" in insert_sql
+        inserted = insert_stmt.compile(dialect=postgresql.dialect()).params
+        assert sorted(v for k, v in inserted.items() if k.startswith("keyword")) == ["apple", "apple", "pear"]
+        # keyword counts of the nodes are counted again, they may have had keywords before
+        assert _compile(update_stmt).startswith("UPDATE dataset_keywords SET node_keyword_count")
+        bump_version.assert_called_once_with("dataset-1")
+
+    def test_delete_by_ids_deletes_only_the_rows_of_the_nodes(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+
+        jieba.delete_by_ids(["node-1", "node-2"])
+
+        (delete_sql,) = _executed_sql(mock_db)
+        assert delete_sql.startswith("DELETE FROM dataset_keywords")
+        assert "index_node_id IN" in delete_sql
+        mock_db.session.commit.assert_called_once()
+
+    def test_search_reads_posting_lists_of_the_query_keywords_through_the_cache(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+        mock_db.session.execute.return_value = [("apple", "node-1", 2), ("apple", "node-2", 2), ("pear", "node-2", 2)]
+
+        with (
+            patch.object(jieba_module.JiebaKeywordTableHandler, "extract_keywords", return_value={"apple", "pear"}),
+            patch.object(Jieba, "_get_index_stats", return_value=(10, 2.0)),
+        ):
+            assert jieba._retrieve_ids_by_query("apple pear", k=1) == ["node-2"]
+            assert mock_db.session.execute.call_count == 1
+            assert "dataset_keywords.keyword IN" in _executed_sql(mock_db)[0]
+
+            assert jieba._retrieve_ids_by_query("apple pear", k=2)[0] == "node-2"
+            assert mock_db.session.execute.call_count == 1
+
+    def test_search_loads_the_segments_of_all_hits_at_once(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+        segments = [
+            DocumentSegment(index_node_id=node_id, content=node_id, document_id="document-1", dataset_id="dataset-1")
+            for node_id in ("node-1", "node-3")
+        ]
+        mock_db.session.query.return_value.filter.return_value.all.return_value = segments
+
+        with patch.object(Jieba, "_retrieve_ids_by_query", return_value=["node-3", "node-2", "node-1"]):
+            documents = jieba.search("apple pear", top_k=3)
+
+        assert [document.metadata["doc_id"] for document in documents] == ["node-3", "node-1"]
+        mock_db.session.query.return_value.filter.assert_called_once()
+        (in_clause,) = (
+            condition
+            for condition in mock_db.session.query.return_value.filter.call_args.args
+            if "IN" in _compile(condition)
+        )
+        assert in_clause.right.value == ["node-3", "node-2", "node-1"]
+
+    def test_search_without_hits_does_not_query_segments(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+
+        with patch.object(Jieba, "_retrieve_ids_by_query", return_value=[]):
+            assert jieba.search("apple") == []
+
+        mock_db.session.query.assert_not_called()
+
+    def test_delete_forgets_the_keyword_index_of_the_dataset(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+        jieba.delete_by_ids(["node-1"])
+        assert "dataset-1" in jieba_module._keyword_index_dataset_ids
+
+        jieba.delete()
+
+        assert "dataset-1" not in jieba_module._keyword_index_dataset_ids
+
+    def test_changed_index_version_invalidates_cached_posting_lists(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+        mock_db.session.execute.return_value = [("apple", "node-1", 1)]
+
+        with (
+            patch.object(jieba_module.JiebaKeywordTableHandler, "extract_keywords", return_value={"apple"}),
+            patch.object(Jieba, "_get_index_stats", return_value=(10, 2.0)),
+        ):
+            with patch.object(keyword_postings_cache, "get_version", return_value="v1"):
+                jieba._retrieve_ids_by_query("apple")
+            with patch.object(keyword_postings_cache, "get_version", return_value="v2"):
+                jieba._retrieve_ids_by_query("apple")
+
+        assert mock_db.session.execute.call_count == 2
+
+    def test_legacy_keyword_table_is_migrated_once(self, mock_db):
+        legacy_table = {
+            "__type__": "keyword_table",
+            "__data__": {"index_id": "dataset-1", "summary": None, "table": {"apple": ["node-1", "node-2"]}},
+        }
+        dataset_keyword_table = _keyword_table("database", json.dumps(legacy_table))
+        jieba = Jieba(_dataset(dataset_keyword_table))
+        # keyword_table_dict looks up the dataset
+        with patch("models.dataset.db") as models_db:
+            models_db.session.query.return_value.filter_by.return_value.first.return_value = jieba.dataset
+            jieba.delete_by_ids(["node-3"])
+            jieba.delete_by_ids(["node-4"])
+
+        migrated = mock_db.session.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect()).params
+        assert sorted(v for k, v in migrated.items() if k.startswith("node_keyword_count")) == [1, 1]
+        assert dataset_keyword_table.data_source_type == KEYWORD_INDEX_DATA_SOURCE_TYPE
+        assert dataset_keyword_table.keyword_table == ""
+        executed_sql = _executed_sql(mock_db)
+        assert [sql.split(" ")[0] for sql in executed_sql] == ["INSERT", "DELETE", "DELETE"]
+
+    def test_index_stats_are_cached_in_redis(self, mock_db):
+        jieba = Jieba(_dataset(_keyword_table()))
+        mock_db.session.execute.return_value.one.return_value = (4, 10)
+
+        with patch.object(jieba_module, "redis_client") as mock_redis:
+            mock_redis.get.return_value = None
+            assert jieba._get_index_stats() == (4, 2.5)
+            cache_key, _, data = mock_redis.setex.call_args.args
+
+            mock_redis.get.return_value = data
+            assert jieba._get_index_stats() == (4, 2.5)
+
+        assert cache_key == "keyword_index_stats:dataset-1"
+        assert mock_db.session.execute.call_count == 1
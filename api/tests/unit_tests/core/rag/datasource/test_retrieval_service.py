@@ -0,0 +1,172 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.datasource.segment_cache import SegmentCache
+from core.rag.index_processor.constant.index_type import IndexType
+from core.rag.models.document import Document
+from models.dataset import ChildChunk, DocumentSegment
+from models.dataset import Document as DatasetDocument
+
+
+def _segment(segment_id: str, dataset_id: str, index_node_id: str) -> DocumentSegment:
+    return DocumentSegment(
+        id=segment_id,
+        tenant_id="tenant-1",
+        dataset_id=dataset_id,
+        document_id=f"document-of-{segment_id}",
+        position=1,
+        content=f"content of {segment_id}",
+        answer=None,
+        word_count=3,
+        tokens=3,
+        index_node_id=index_node_id,
+        hit_count=0,
+        enabled=True,
+        status="completed",
+        created_by="account-1",
+    )
+
+
+def _child_chunk(chunk_id: str, segment_id: str, index_node_id: str, position: int) -> ChildChunk:
+    return ChildChunk(
+        id=chunk_id,
+        tenant_id="tenant-1",
+        dataset_id="dataset-2",
+        document_id="document-2",
+        segment_id=segment_id,
+        position=position,
+        content=f"content of {chunk_id}",
+        word_count=3,
+        index_node_id=index_node_id,
+        created_by="account-1",
+    )
+
+
+@pytest.fixture
+def database():
+    rows = {
+        DatasetDocument: [
+            DatasetDocument(id="document-1", dataset_id="dataset-1", doc_form=IndexType.PARAGRAPH_INDEX),
+            DatasetDocument(id="document-2", dataset_id="dataset-2", doc_form=IndexType.PARENT_CHILD_INDEX),
+        ],
+        ChildChunk: [
+            _child_chunk("chunk-1", "segment-3", "child-node-1", 1),
+            _child_chunk("chunk-2", "segment-3", "child-node-2", 2),
+        ],
+        DocumentSegment: [
+            _segment("segment-1", "dataset-1", "node-1"),
+            _segment("segment-2", "dataset-1", "node-2"),
+            _segment("segment-3", "dataset-2", "parent-node-1"),
+        ],
+    }
+
+    def query(model):
+        # every query of the model returns all of its rows, whatever its filters
+        chain = MagicMock()
+        chain.filter.return_value = chain
+        chain.options.return_value = chain
+        chain.all.return_value = rows[model]
+        return chain
+
+    with patch("core.rag.datasource.retrieval_service.db") as db:
+        db.session.query.side_effect = query
+        yield db
+
+
+@pytest.fixture
+def cache():
+    cache = SegmentCache(maxsize=100, ttl=60)
+    with patch("core.rag.datasource.retrieval_service.segment_cache", cache):
+        yield cache
+
+
+def _documents() -> list[Document]:
+    return [
+        Document(page_content="", metadata={"document_id": "document-1", "doc_id": "node-2", "score": 0.9}),
+        Document(page_content="", metadata={"document_id": "document-2", "doc_id": "child-node-1", "score": 0.5}),
+        Document(page_content="", metadata={"document_id": "document-1", "doc_id": "node-1", "score": 0.7}),
+        Document(page_content="", metadata={"document_id": "document-2", "doc_id": "child-node-2", "score": 0.8}),
+        Document(page_content="", metadata={"document_id": "document-1", "doc_id": "unknown-node", "score": 0.6}),
+        Document(page_content="", metadata={"document_id": "unknown-document", "doc_id": "node-1", "score": 0.6}),
+    ]
+
+
+def _summary(records) -> list[tuple]:
+    return [
+        (
+            record.segment.id,
+            record.score,
+            [(child_chunk.id, child_chunk.score) for child_chunk in record.child_chunks or []],
+        )
+        for record in records
+    ]
+
+
+def test_format_retrieval_documents_loads_segments_set_wise(database):
+    records = RetrievalService.format_retrieval_documents(_documents())
+
+    assert _summary(records) == [
+        ("segment-2", 0.9, []),
+        ("segment-3", 0.8, [("chunk-1", 0.5), ("chunk-2", 0.8)]),
+        ("segment-1", 0.7, []),
+    ]
+    # dataset documents, child chunks and segments
+    assert [call.args[0] for call in database.session.query.call_args_list] == [
+        DatasetDocument,
+        ChildChunk,
+        DocumentSegment,
+    ]
+
+
+def test_segments_of_other_datasets_are_ignored(database):
+    documents = [Document(page_content="", metadata={"document_id": "document-2", "doc_id": "node-1"})]
+    database.session.query.side_effect = None
+    chain = database.session.query.return_value
+    chain.filter.return_value = chain
+    chain.options.return_value = chain
+    chain.all.side_effect = [
+        [DatasetDocument(id="document-2", dataset_id="dataset-2", doc_form=IndexType.PARAGRAPH_INDEX)],
+        [_segment("segment-1", "dataset-1", "node-1")],
+    ]
+
+    assert RetrievalService.format_retrieval_documents(documents) == []
+
+
+def test_cached_segments_skip_the_database(database, cache):
+    documents = _documents()[:4]
+    first = RetrievalService.format_retrieval_documents(documents)
+    database.session.query.reset_mock()
+
+    second = RetrievalService.format_retrieval_documents(documents)
+
+    assert _summary(second) == _summary(first)
+    assert [record.segment.content for record in second] == [record.segment.content for record in first]
+    # only the dataset documents are queried
+    assert [call.args[0] for call in database.session.query.call_args_list] == [DatasetDocument]
+
+    # chunks without a segment are not cached
+    database.session.query.reset_mock()
+    RetrievalService.format_retrieval_documents(_documents())
+    assert [call.args[0] for call in database.session.query.call_args_list] == [DatasetDocument, DocumentSegment]
+
+
+def test_cached_segments_are_copies(cache):
+    segment = _segment("segment-1", "dataset-1", "node-1")
+    cache.set_many({("dataset-1", "node-1"): (segment, None)})
+
+    cached_segment, child_chunk = cache.get_many([("dataset-1", "node-1")])[("dataset-1", "node-1")]
+    cached_segment.content = "changed"
+
+    assert child_chunk is None
+    assert cached_segment is not segment
+    assert cache.get_many([("dataset-1", "node-1")])[("dataset-1", "node-1")][0].content == "content of segment-1"
+
+
+def test_cache_is_disabled_without_ttl():
+    cache = SegmentCache(maxsize=100, ttl=0)
+    cache.set_many({("dataset-1", "node-1"): (_segment("segment-1", "dataset-1", "node-1"), None)})
+
+    assert not cache.enabled
+    assert cache.get_many([("dataset-1", "node-1")]) == {}
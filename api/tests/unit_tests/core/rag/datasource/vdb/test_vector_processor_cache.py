@@ -0,0 +1,171 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import pytest
+from psycopg2.pool import PoolError
+
+from core.rag.datasource.vdb.analyticdb.analyticdb_vector_sql import AnalyticdbVectorBySql, AnalyticdbVectorBySqlConfig
+from core.rag.datasource.vdb.connection_pool import BlockingConnectionPool, get_connection_pool
+from core.rag.datasource.vdb.opengauss.opengauss import OpenGauss
+from core.rag.datasource.vdb.pgvector.pgvector import PGVector
+from core.rag.datasource.vdb.pyvastbase.vastbase_vector import VastbaseVector
+from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.datasource.vdb.vector_processor_cache import VectorProcessorCache
+from models.dataset import Dataset
+
+
+@pytest.fixture
+def cache():
+    cache = VectorProcessorCache(maxsize=10, idle_ttl=60)
+    with patch("core.rag.datasource.vdb.vector_factory.vector_processor_cache", cache):
+        yield cache
+
+
+@pytest.fixture
+def vector_factory():
+    factory = MagicMock()
+    factory.return_value.init_vector.side_effect = lambda *args: MagicMock()
+    with (
+        patch.object(Vector, "_get_embeddings"),
+        patch.object(Vector, "get_vector_factory", return_value=factory),
+    ):
+        yield factory.return_value
+
+
+def _dataset(embedding_model: str = "text-embedding-3-small", index_struct: bool = True) -> Dataset:
+    return Dataset(
+        id="dataset-1",
+        tenant_id="tenant-1",
+        embedding_model_provider="openai",
+        embedding_model=embedding_model,
+        index_struct=json.dumps({"type": "qdrant", "vector_store": {"class_prefix": "Vector_index_1_Node"}})
+        if index_struct
+        else None,
+    )
+
+
+def test_processors_are_cached_per_settings(cache):
+    create = MagicMock(side_effect=lambda: MagicMock())
+
+    processor = cache.get_or_create("dataset-1", ("index-struct", "model-1"), create)
+
+    assert cache.get_or_create("dataset-1", ("index-struct", "model-1"), create) is processor
+    assert cache.get_or_create("dataset-1", ("index-struct", "model-2"), create) is not processor
+    assert cache.get_or_create("dataset-2", ("index-struct", "model-1"), create) is not processor
+    assert create.call_count == 3
+
+
+def test_invalidate_drops_the_processors_of_the_dataset(cache):
+    create = MagicMock(side_effect=lambda: MagicMock())
+    processor = cache.get_or_create("dataset-1", ("index-struct", "model-1"), create)
+    other_processor = cache.get_or_create("dataset-2", ("index-struct", "model-1"), create)
+
+    cache.invalidate("dataset-1")
+
+    assert cache.get_or_create("dataset-1", ("index-struct", "model-1"), create) is not processor
+    assert cache.get_or_create("dataset-2", ("index-struct", "model-1"), create) is other_processor
+
+
+def test_cache_is_bounded():
+    cache = VectorProcessorCache(maxsize=2, idle_ttl=60)
+    create = MagicMock(side_effect=lambda: MagicMock())
+
+    for dataset_id in ("dataset-1", "dataset-2", "dataset-3"):
+        cache.get_or_create(dataset_id, "settings", create)
+    cache.get_or_create("dataset-3", "settings", create)
+
+    assert create.call_count == 3
+    cache.get_or_create("dataset-1", "settings", create)
+    assert create.call_count == 4
+
+
+def test_cache_is_disabled_without_idle_ttl():
+    cache = VectorProcessorCache(maxsize=10, idle_ttl=0)
+    create = MagicMock(side_effect=lambda: MagicMock())
+
+    assert not cache.enabled
+    assert cache.get_or_create("dataset-1", "settings", create) is not cache.get_or_create(
+        "dataset-1", "settings", create
+    )
+
+
+def test_vector_reuses_the_processor_of_the_dataset(cache, vector_factory):
+    vector = Vector(_dataset())
+
+    assert Vector(_dataset())._vector_processor is vector._vector_processor
+    assert vector_factory.init_vector.call_count == 1
+
+    # the embedding model of the dataset changed
+    assert Vector(_dataset(embedding_model="text-embedding-3-large"))._vector_processor is not vector._vector_processor
+
+    vector.delete()
+    assert Vector(_dataset())._vector_processor is not vector._vector_processor
+
+
+def test_vector_of_a_dataset_without_index_struct_is_not_cached(cache, vector_factory):
+    with patch("core.rag.datasource.vdb.vector_factory.dify_config.VECTOR_STORE", "qdrant"):
+        Vector(_dataset(index_struct=False))
+        Vector(_dataset(index_struct=False))
+
+    assert vector_factory.init_vector.call_count == 2
+
+
+def test_connection_pool_is_shared_and_waits_for_a_free_connection():
+    with patch("psycopg2.pool.psycopg2.connect", side_effect=lambda *args, **kwargs: MagicMock()):
+        pool = get_connection_pool(0, 1, host="vector-store-1", port=5432)
+        assert get_connection_pool(0, 1, host="vector-store-1", port=5432) is pool
+        assert get_connection_pool(0, 1, host="vector-store-2", port=5432) is not pool
+
+        conn = pool.getconn()
+        acquired = threading.Event()
+
+        def use_connection():
+            pool.putconn(pool.getconn())
+            acquired.set()
+
+        thread = threading.Thread(target=use_connection)
+        thread.start()
+        assert not acquired.wait(0.1)
+
+        pool.putconn(conn)
+        assert acquired.wait(5)
+        thread.join()
+
+
+def test_connection_pool_gives_up_after_the_timeout():
+    with patch("psycopg2.pool.psycopg2.connect", side_effect=lambda *args, **kwargs: MagicMock()):
+        pool = BlockingConnectionPool(0, 1, timeout=0.1)
+        pool.getconn()
+
+        with pytest.raises(PoolError):
+            pool.getconn()
+
+
+@pytest.mark.parametrize("vector_class", [PGVector, OpenGauss, VastbaseVector, AnalyticdbVectorBySql])
+def test_failed_commit_returns_the_connection_to_the_pool(vector_class):
+    connection = MagicMock()
+    connection.commit.side_effect = psycopg2.OperationalError("server closed the connection unexpectedly")
+    with patch("psycopg2.pool.psycopg2.connect", return_value=connection):
+        vector = vector_class.__new__(vector_class)
+        vector.pool = BlockingConnectionPool(0, 1, timeout=0.1)
+
+        with pytest.raises(psycopg2.OperationalError), vector._get_cursor():
+            pass
+
+        assert vector.pool.getconn() is connection
+
+
+def test_analyticdb_sql_vectors_share_the_connection_pool():
+    config = AnalyticdbVectorBySqlConfig(
+        host="analyticdb", port=5432, account="dify", account_password="secret", min_connection=1, max_connection=5
+    )
+    with (
+        patch("psycopg2.pool.psycopg2.connect", side_effect=lambda *args, **kwargs: MagicMock()),
+        patch.object(AnalyticdbVectorBySql, "_initialize"),
+    ):
+        vector = AnalyticdbVectorBySql("collection_1", config)
+
+        assert isinstance(vector.pool, BlockingConnectionPool)
+        assert AnalyticdbVectorBySql("collection_2", config).pool is vector.pool
@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock, patch
+
+from core.rag.embedding.cached_embedding import CacheEmbedding
+from libs import helper
+from models.dataset import Embedding
+
+
+def _create_model_instance(vectors: list[list[float]]) -> MagicMock:
+    model_instance = MagicMock(provider="openai", model="text-embedding-3-small")
+    model_instance.model_type_instance.get_model_schema.return_value = None
+    model_instance.invoke_text_embedding.side_effect = [MagicMock(embeddings=[vector]) for vector in vectors]
+    return model_instance
+
+
+def _cached(text: str, vector: list[float]) -> Embedding:
+    embedding = Embedding(
+        model_name="text-embedding-3-small", hash=helper.generate_text_hash(text), provider_name="openai"
+    )
+    embedding.set_embedding(vector)
+    return embedding
+
+
+def test_embed_documents_looks_up_cache_in_one_query_and_bulk_inserts_misses():
+    model_instance = _create_model_instance([[3.0, 4.0]])
+    with patch("core.rag.embedding.cached_embedding.db") as mock_db:
+        mock_db.session.query.return_value.filter.return_value.all.return_value = [_cached("hit", [1.0, 0.0])]
+
+        result = CacheEmbedding(model_instance).embed_documents(["hit", "miss", "hit"])
+
+    assert result == [[1.0, 0.0], [0.6, 0.8], [1.0, 0.0]]
+    assert mock_db.session.query.call_count == 1
+    model_instance.invoke_text_embedding.assert_called_once()
+    assert model_instance.invoke_text_embedding.call_args.kwargs["texts"] == ["miss"]
+    assert mock_db.session.execute.call_count == 1
+    mock_db.session.commit.assert_called_once()
+
+
+def test_embed_documents_skips_insert_when_everything_is_cached():
+    model_instance = _create_model_instance([])
+    with patch("core.rag.embedding.cached_embedding.db") as mock_db:
+        mock_db.session.query.return_value.filter.return_value.all.return_value = [
+            _cached("a", [1.0]),
+            _cached("b", [0.5]),
+        ]
+
+        result = CacheEmbedding(model_instance).embed_documents(["a", "b"])
+
+    assert result == [[1.0], [0.5]]
+    model_instance.invoke_text_embedding.assert_not_called()
+    mock_db.session.execute.assert_not_called()
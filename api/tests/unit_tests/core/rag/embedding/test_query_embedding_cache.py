@@ -0,0 +1,67 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from core.rag.embedding.query_embedding_cache import QueryEmbeddingCache
+
+
+@pytest.fixture
+def mock_redis():
+    with patch("core.rag.embedding.query_embedding_cache.redis_client") as mock_redis:
+        pipeline = MagicMock()
+        pipeline.execute.return_value = [None, False]
+        mock_redis.pipeline.return_value = pipeline
+        yield mock_redis
+
+
+def test_set_then_get_is_served_locally(mock_redis):
+    cache = QueryEmbeddingCache(max_bytes=1024, ttl=600)
+    cache.set("openai", "text-embedding-3-small", "hash", [0.6, 0.8])
+
+    mock_redis.setex.assert_called_once_with(
+        "query_embedding:openai:text-embedding-3-small:hash", 600, np.array([0.6, 0.8]).tobytes()
+    )
+    assert cache.get("openai", "text-embedding-3-small", "hash").tolist() == [0.6, 0.8]
+    mock_redis.pipeline.assert_not_called()
+    assert cache.stats()["local_hits"] == 1
+    assert cache.stats()["local_bytes"] == 16
+
+
+def test_get_falls_back_to_redis_and_fills_local_cache(mock_redis):
+    mock_redis.pipeline.return_value.execute.return_value = [np.array([1.0, 0.0]).tobytes(), True]
+    cache = QueryEmbeddingCache(max_bytes=1024, ttl=600)
+
+    assert cache.get("openai", "model", "hash").tolist() == [1.0, 0.0]
+    assert cache.get("openai", "model", "hash").tolist() == [1.0, 0.0]
+    assert mock_redis.pipeline.call_count == 1
+    assert cache.stats()["redis_hits"] == 1
+    assert cache.stats()["local_hits"] == 1
+
+
+def test_get_miss(mock_redis):
+    cache = QueryEmbeddingCache(max_bytes=1024, ttl=600)
+
+    assert cache.get("openai", "model", "hash") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_local_cache_evicts_by_byte_budget(mock_redis):
+    cache = QueryEmbeddingCache(max_bytes=32, ttl=600)
+    cache.set("openai", "model", "a", [1.0, 2.0])
+    cache.set("openai", "model", "b", [3.0, 4.0])
+    cache.set("openai", "model", "c", [5.0, 6.0])
+    # a vector larger than the whole budget is only stored in redis
+    cache.set("openai", "model", "d", [0.0] * 8)
+
+    assert cache.stats()["local_bytes"] <= 32
+    assert cache.get("openai", "model", "c").tolist() == [5.0, 6.0]
+    assert cache.get("openai", "model", "d") is None
+
+
+def test_local_cache_disabled(mock_redis):
+    cache = QueryEmbeddingCache(max_bytes=0, ttl=600)
+    cache.set("openai", "model", "hash", [1.0])
+
+    assert cache.get("openai", "model", "hash") is None
+    assert cache.stats()["local_size"] == 0
@@ -0,0 +1,104 @@
+import math
+from collections import Counter
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from core.rag.models.document import Document
+from core.rag.rerank.entity.weight import KeywordSetting, VectorSetting, Weights
+from core.rag.rerank.weight_rerank import WeightRerankRunner
+
+
+def _reference_tfidf_similarity(query_keywords, document_keywords, documents_keywords):
+    total_documents = len(documents_keywords)
+
+    def idf(keyword):
+        doc_count = sum(1 for keywords in documents_keywords if keyword in keywords)
+        return math.log((1 + total_documents) / (1 + doc_count)) + 1 if doc_count else 0
+
+    query_tfidf = {k: c * idf(k) for k, c in Counter(query_keywords).items()}
+    document_tfidf = {k: c * idf(k) for k, c in Counter(document_keywords).items()}
+    numerator = sum(query_tfidf[k] * document_tfidf[k] for k in set(query_tfidf) & set(document_tfidf))
+    denominator = math.sqrt(sum(v**2 for v in query_tfidf.values())) * math.sqrt(
+        sum(v**2 for v in document_tfidf.values())
+    )
+    return numerator / denominator if denominator else 0.0
+
+
+def test_tfidf_similarities_match_reference():
+    query_keywords = {"dify", "workflow", "rag", "unknown"}
+    documents_keywords = [
+        {"dify", "workflow", "agent"},
+        {"rag", "retrieval", "dify"},
+        {"unrelated", "words"},
+        set(),
+        ["dify", "dify", "workflow"],
+    ]
+
+    similarities = WeightRerankRunner._calculate_tfidf_similarities(query_keywords, documents_keywords)
+
+    expected = [_reference_tfidf_similarity(query_keywords, d, documents_keywords) for d in documents_keywords]
+    assert similarities == pytest.approx(expected)
+    assert similarities[2] == 0.0
+    assert similarities[3] == 0.0
+
+
+def test_tfidf_similarities_empty():
+    assert WeightRerankRunner._calculate_tfidf_similarities({"dify"}, []) == []
+    assert WeightRerankRunner._calculate_tfidf_similarities(set(), [set(), set()]) == [0.0, 0.0]
+
+
+def test_calculate_cosine_keeps_existing_scores():
+    runner = WeightRerankRunner(
+        "tenant_id",
+        Weights(
+            vector_setting=VectorSetting(vector_weight=0.7, embedding_provider_name="openai", embedding_model_name="m"),
+            keyword_setting=KeywordSetting(keyword_weight=0.3),
+        ),
+    )
+    documents = [
+        Document(page_content="a", vector=[1.0, 0.0], metadata={"doc_id": "1"}),
+        Document(page_content="b", vector=[0.0, 1.0], metadata={"doc_id": "2", "score": 0.42}),
+        Document(page_content="c", vector=[3.0, 4.0], metadata={"doc_id": "3"}),
+    ]
+    with (
+        patch("core.rag.rerank.weight_rerank.ModelManager"),
+        patch("core.rag.rerank.weight_rerank.CacheEmbedding") as mock_cache_embedding,
+    ):
+        mock_cache_embedding.return_value = MagicMock(embed_query=MagicMock(return_value=[2.0, 0.0]))
+        scores = runner._calculate_cosine("tenant_id", "query", documents, runner.weights.vector_setting)
+
+    assert scores == pytest.approx([1.0, 0.42, 0.6])
+    assert np.isscalar(scores[0])
+
+
+def test_keyword_score_reuses_stored_segment_keywords_and_cached_extractions():
+    runner = WeightRerankRunner(
+        "tenant_id",
+        Weights(
+            vector_setting=VectorSetting(vector_weight=0.7, embedding_provider_name="openai", embedding_model_name="m"),
+            keyword_setting=KeywordSetting(keyword_weight=0.3),
+        ),
+    )
+    documents = [
+        Document(page_content="stored content", metadata={"doc_id": "node-1", "dataset_id": "dataset"}),
+        Document(page_content="unindexed content for rerank cache", metadata={"doc_id": "node-2"}),
+    ]
+    handler = MagicMock()
+    handler.extract_keywords.side_effect = lambda text, _: {"query"} if text == "query" else {"extracted"}
+    with (
+        patch("core.rag.rerank.weight_rerank.JiebaKeywordTableHandler", return_value=handler),
+        patch("core.rag.rerank.weight_rerank.db") as mock_db,
+    ):
+        mock_db.session.query.return_value.filter.return_value.filter.return_value.all.return_value = [
+            ("node-1", ["stored", "query"]),
+        ]
+        runner._calculate_keyword_score("query", documents)
+        runner._calculate_keyword_score("query", documents)
+
+    assert documents[0].metadata["keywords"] == {"stored", "query"}
+    assert documents[1].metadata["keywords"] == {"extracted"}
+    extracted_texts = [call.args[0] for call in handler.extract_keywords.call_args_list]
+    assert extracted_texts.count("stored content") == 0
+    assert extracted_texts.count("unindexed content for rerank cache") == 1
@@ -0,0 +1,153 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from redis.exceptions import ResponseError
+from sqlalchemy.dialects import postgresql
+
+from core.rag.models.document import Document
+from core.rag.retrieval.dataset_retrieval import DatasetRetrieval
+from core.rag.retrieval.retrieval_analytics import (
+    DATASET_QUERIES_KEY,
+    SEGMENT_HITS_KEY,
+    RetrievalAnalytics,
+)
+
+
+@pytest.fixture
+def redis():
+    redis = MagicMock()
+    redis.exists.return_value = 0
+    redis.hgetall.return_value = {}
+    redis.lrange.return_value = []
+    with patch("core.rag.retrieval.retrieval_analytics.redis_client", redis):
+        yield redis
+
+
+@pytest.fixture
+def database():
+    with patch("core.rag.retrieval.retrieval_analytics.db") as db:
+        yield db
+
+
+def test_record_hits_increments_chunks_of_dify_documents(redis):
+    RetrievalAnalytics.record_hits(
+        [
+            Document(page_content="", metadata={"document_id": "document-1", "doc_id": "node-1"}),
+            Document(page_content="", metadata={"document_id": "document-1", "doc_id": "node:2"}),
+            Document(page_content="", metadata={"title": "external"}, provider="external"),
+        ]
+    )
+
+    pipeline = redis.pipeline.return_value
+    assert [call.args for call in pipeline.hincrby.call_args_list] == [
+        (SEGMENT_HITS_KEY, "document-1:node-1", 1),
+        (SEGMENT_HITS_KEY, "document-1:node:2", 1),
+    ]
+    pipeline.execute.assert_called_once()
+
+
+def test_record_queries_appends_one_record_per_dataset(redis):
+    RetrievalAnalytics.record_queries("what is dify", ["dataset-1", "dataset-2"], "app-1", "end_user", "user-1")
+
+    key, *records = redis.rpush.call_args.args
+    records = [json.loads(record) for record in records]
+    assert key == DATASET_QUERIES_KEY
+    assert [record["dataset_id"] for record in records] == ["dataset-1", "dataset-2"]
+    assert records[0]["id"] != records[1]["id"]
+    assert {record["content"] for record in records} == {"what is dify"}
+    assert {record["created_by_role"] for record in records} == {"end_user"}
+
+
+def test_flush_writes_and_deletes_accumulated_data(redis, database):
+    redis.hgetall.return_value = {b"document-1:node-1": b"3", b"document-1:node:2": b"1"}
+    redis.lrange.return_value = [
+        json.dumps(
+            {
+                "id": "query-1",
+                "dataset_id": "dataset-1",
+                "content": "what is dify",
+                "source": "app",
+                "source_app_id": "app-1",
+                "created_by_role": "end_user",
+                "created_by": "user-1",
+                "created_at": "2025-07-01T10:00:00",
+            }
+        ).encode()
+    ]
+
+    assert RetrievalAnalytics.flush() == (2, 1)
+
+    assert [call.args for call in redis.rename.call_args_list] == [
+        (SEGMENT_HITS_KEY, f"{SEGMENT_HITS_KEY}:flushing"),
+        (DATASET_QUERIES_KEY, f"{DATASET_QUERIES_KEY}:flushing"),
+    ]
+    update, insert = (call.args[0] for call in database.session.execute.call_args_list)
+    assert str(update.compile(dialect=postgresql.dialect())).startswith("WITH chunk_hits AS")
+    assert "ON CONFLICT (id) DO NOTHING" in str(insert.compile(dialect=postgresql.dialect()))
+    assert database.session.commit.call_count == 2
+    assert [call.args for call in redis.delete.call_args_list] == [
+        (f"{SEGMENT_HITS_KEY}:flushing",),
+        (f"{DATASET_QUERIES_KEY}:flushing",),
+    ]
+
+
+def test_flush_without_accumulated_data(redis, database):
+    redis.rename.side_effect = ResponseError("no such key")
+
+    assert RetrievalAnalytics.flush() == (0, 0)
+
+    database.session.execute.assert_not_called()
+
+
+def test_failed_flush_is_retried(redis, database):
+    redis.hgetall.return_value = {b"document-1:node-1": b"3"}
+    database.session.execute.side_effect = Exception("database is down")
+
+    with pytest.raises(Exception, match="database is down"):
+        RetrievalAnalytics.flush()
+    redis.delete.assert_not_called()
+    redis.lock.return_value.release.assert_called_once()
+
+    # the next flush writes what was left at the flushing key
+    redis.exists.return_value = 1
+    redis.rename.reset_mock()
+    database.session.execute.side_effect = None
+
+    assert RetrievalAnalytics.flush()[0] == 1
+    redis.rename.assert_not_called()
+    redis.delete.assert_any_call(f"{SEGMENT_HITS_KEY}:flushing")
+
+
+def test_flush_is_skipped_while_another_worker_flushes(redis, database):
+    redis.lock.return_value.acquire.return_value = False
+
+    assert RetrievalAnalytics.flush() == (0, 0)
+
+    redis.rename.assert_not_called()
+
+
+def test_increment_hit_counts_statement_sums_hits_per_segment():
+    statement = RetrievalAnalytics._increment_hit_counts_statement([("document-1", "node-1", 3)])
+
+    sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+    assert "UPDATE document_segments SET hit_count=(document_segments.hit_count + totals.hits)" in sql
+    assert "JOIN child_chunks ON" in sql
+    assert "GROUP BY segment_hits.segment_id" in sql
+
+
+def test_dataset_retrieval_accumulates_when_enabled(database):
+    retrieval = DatasetRetrieval()
+    documents = [Document(page_content="", metadata={"document_id": "document-1", "doc_id": "node-1"})]
+
+    with (
+        patch("core.rag.retrieval.dataset_retrieval.dify_config.RETRIEVAL_ANALYTICS_ASYNC_ENABLED", True),
+        patch("core.rag.retrieval.dataset_retrieval.RetrievalAnalytics") as analytics,
+        patch("core.rag.retrieval.dataset_retrieval.db") as db,
+    ):
+        retrieval._on_query("what is dify", ["dataset-1"], "app-1", "end_user", "user-1")
+        retrieval._on_retrieval_end(documents)
+
+    analytics.record_queries.assert_called_once_with("what is dify", ["dataset-1"], "app-1", "end_user", "user-1")
+    analytics.record_hits.assert_called_once_with(documents)
+    db.session.commit.assert_not_called()
@@ -0,0 +1,63 @@
+from hypothesis import given
+from hypothesis import strategies as st
+
+from core.rag.splitter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from tests.benchmarks.core.rag.splitter.legacy_text_splitter import LegacyFixedRecursiveCharacterTextSplitter
+
+
+def _character_lengths(texts: list[str]) -> list[int]:
+    return [len(text) for text in texts]
+
+
+def _byte_lengths(texts: list[str]) -> list[int]:
+    return [len(text.encode()) for text in texts]
+
+
+_texts = st.text(alphabet=["a", "b", "中", " ", "\n", "。"], max_size=400)
+
+
+@st.composite
+def _splitter_settings(draw):
+    chunk_size = draw(st.integers(min_value=1, max_value=60))
+    return {
+        "chunk_size": chunk_size,
+        "chunk_overlap": draw(st.integers(min_value=0, max_value=chunk_size)),
+        "fixed_separator": draw(st.sampled_from(["\n\n", "\n", ""])),
+        "separators": draw(st.sampled_from([None, ["\n", "。", " ", ""], ["。", ""], [""]])),
+        "keep_separator": draw(st.booleans()),
+        "length_function": draw(st.sampled_from([_character_lengths, _byte_lengths])),
+    }
+
+
+@given(_texts, _splitter_settings())
+def test_split_text_matches_the_previous_merging(text, settings):
+    splitter = FixedRecursiveCharacterTextSplitter(**settings)
+    legacy_splitter = LegacyFixedRecursiveCharacterTextSplitter(**settings)
+
+    assert splitter.split_text(text) == legacy_splitter.split_text(text)
+
+
+@given(st.lists(st.text(alphabet=["a", "中", " "], max_size=12), max_size=60), _splitter_settings())
+def test_merge_splits_matches_the_previous_merging(splits, settings):
+    splitter = FixedRecursiveCharacterTextSplitter(**settings)
+    legacy_splitter = LegacyFixedRecursiveCharacterTextSplitter(**settings)
+    lengths = settings["length_function"](splits)
+
+    assert splitter._merge_splits(splits, " ", lengths) == legacy_splitter._merge_splits(splits, " ", lengths)
+
+
+def test_merge_splits_measures_every_piece_once():
+    measured: list[str] = []
+
+    def length_function(texts: list[str]) -> list[int]:
+        measured.extend(texts)
+        return [len(text) for text in texts]
+
+    splitter = FixedRecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=4, length_function=length_function)
+    splits = [f"w{i}" for i in range(100)]
+
+    chunks = splitter._merge_splits(splits, " ", [len(split) for split in splits])
+
+    assert chunks[:2] == ["w0 w1 w2", "w2 w3 w4"]
+    # only the separator is measured, the lengths of the pieces are passed in
+    assert measured == [" "]
@@ -1,3 +1,5 @@
+import queue
+from concurrent.futures import Future
 from unittest.mock import patch
 
 import pytest
@@ -17,10 +19,11 @@ from core.workflow.graph_engine.entities.event import (
     NodeRunStartedEvent,
     NodeRunStreamChunkEvent,
     NodeRunSucceededEvent,
+    ParallelBranchRunFailedEvent,
 )
 from core.workflow.graph_engine.entities.graph import Graph
 from core.workflow.graph_engine.entities.runtime_route_state import RouteNodeState
-from core.workflow.graph_engine.graph_engine import GraphEngine
+from core.workflow.graph_engine.graph_engine import GraphEngine, GraphEngineThreadPool
 from core.workflow.nodes.code.code_node import CodeNode
 from core.workflow.nodes.event import RunCompletedEvent, RunStreamChunkEvent
 from core.workflow.nodes.llm.node import LLMNode
@@ -873,3 +876,55 @@ def test_condition_parallel_correct_output(mock_close, mock_remove, app):
                         assert item.outputs is not None
                         answer = item.outputs["answer"]
                         assert all(rc not in answer for rc in wrong_content)
+
+
+def test_thread_pool_stats():
+    thread_pool = GraphEngineThreadPool(max_workers=2, max_submit_count=10)
+    try:
+        futures = [thread_pool.submit(lambda value: value * 2, value) for value in range(4)]
+        for future in futures:
+            future.add_done_callback(thread_pool.task_done_callback)
+        assert [future.result() for future in futures] == [0, 2, 4, 6]
+    finally:
+        thread_pool.shutdown(wait=True)
+
+    stats = thread_pool.stats()
+    assert stats["submitted"] == 4
+    assert stats["completed"] == 4
+    assert stats["in_flight"] == 0
+    assert 1 <= stats["peak_submit_count"] <= 4
+    assert stats["max_workers"] == 2
+    assert stats["avg_queue_wait_time"] >= 0
+    assert 0 <= stats["worker_utilization"] <= 1
+
+
+def test_thread_pool_max_submit_count():
+    thread_pool = GraphEngineThreadPool(max_workers=1, max_submit_count=1)
+    try:
+        thread_pool.submit(lambda: None)
+        with pytest.raises(ValueError):
+            thread_pool.submit(lambda: None)
+    finally:
+        thread_pool.shutdown(wait=True)
+
+
+def test_aborted_parallel_node_publishes_failed_event():
+    graph_engine = GraphEngine.__new__(GraphEngine)
+    q: queue.Queue = queue.Queue()
+
+    succeeded: Future = Future()
+    succeeded.set_result(None)
+    graph_engine._handle_parallel_node_aborted(
+        future=succeeded, q=q, parallel_id="parallel", parallel_start_node_id="node"
+    )
+    assert q.empty()
+
+    aborted: Future = Future()
+    aborted.set_exception(SystemExit("worker exited"))
+    graph_engine._handle_parallel_node_aborted(
+        future=aborted, q=q, parallel_id="parallel", parallel_start_node_id="node"
+    )
+    event = q.get_nowait()
+    assert isinstance(event, ParallelBranchRunFailedEvent)
+    assert event.parallel_id == "parallel"
+    assert event.error == "worker exited"
@@ -83,3 +83,46 @@ class TestVariablePool:
     def test_constructor_with_invalid_system_variable_key(self):
         with pytest.raises(ValidationError):
             VariablePool(system_variables={"invalid_key": "value"})  # type: ignore
+
+
+class TestVariablePoolFork:
+    def test_fork_shares_variables(self, pool):
+        pool.add(("node_1", "output"), StringSegment(value="value"))
+
+        forked = pool.fork()
+
+        assert forked.get(("node_1", "output")).value == "value"
+        assert forked.variable_dictionary["node_1"] is pool.variable_dictionary["node_1"]
+
+    def test_writes_to_fork_do_not_leak_into_parent(self, pool):
+        pool.add(("node_1", "output"), StringSegment(value="value"))
+
+        forked = pool.fork()
+        forked.add(("node_1", "output"), StringSegment(value="changed"))
+        forked.add(("node_1", "other"), StringSegment(value="other"))
+        forked.add(("node_2", "output"), StringSegment(value="new"))
+
+        assert pool.get(("node_1", "output")).value == "value"
+        assert pool.get(("node_1", "other")) is None
+        assert pool.get(("node_2", "output")) is None
+        assert forked.get(("node_1", "output")).value == "changed"
+
+    def test_writes_to_parent_do_not_leak_into_fork(self, pool):
+        pool.add(("node_1", "output"), StringSegment(value="value"))
+
+        forked = pool.fork()
+        pool.add(("node_1", "output"), StringSegment(value="changed"))
+        pool.remove(("node_1",))
+
+        assert forked.get(("node_1", "output")).value == "value"
+
+    def test_remove_from_fork_does_not_leak_into_siblings(self, pool):
+        pool.add(("node_1", "output"), StringSegment(value="value"))
+
+        first = pool.fork()
+        second = pool.fork()
+        first.remove(("node_1", "output"))
+
+        assert first.get(("node_1", "output")) is None
+        assert second.get(("node_1", "output")).value == "value"
+        assert pool.get(("node_1", "output")).value == "value"
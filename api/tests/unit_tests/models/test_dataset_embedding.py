@@ -0,0 +1,50 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from models.dataset import Embedding
+
+
+def test_set_embedding_uses_compact_format():
+    vector = [0.1 * i for i in range(1536)]
+    embedding = Embedding()
+    embedding.set_embedding(vector)
+
+    assert embedding.is_compact_format
+    assert len(embedding.embedding) == Embedding.COMPACT_FORMAT_HEADER.size + 1536 * 4
+    assert len(embedding.embedding) < len(pickle.dumps(vector, protocol=pickle.HIGHEST_PROTOCOL))
+    np.testing.assert_allclose(embedding.get_embedding(), vector, rtol=1e-6)
+
+
+def test_get_embedding_array_does_not_copy():
+    embedding = Embedding()
+    embedding.set_embedding([1.0, 2.0, 3.0])
+
+    array = embedding.get_embedding_array()
+
+    assert array.dtype == np.dtype("<f4")
+    assert not array.flags.owndata
+    assert array.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_set_embedding_float16():
+    embedding = Embedding()
+    embedding.set_embedding([0.5, -0.25, 1.0], dtype="float16")
+
+    assert len(embedding.embedding) == Embedding.COMPACT_FORMAT_HEADER.size + 3 * 2
+    assert embedding.get_embedding_array().dtype == np.dtype("<f2")
+    assert embedding.get_embedding() == [0.5, -0.25, 1.0]
+
+
+def test_set_embedding_rejects_unsupported_dtype():
+    with pytest.raises(ValueError):
+        Embedding().set_embedding([1.0], dtype="int8")
+
+
+def test_get_embedding_reads_legacy_pickle_rows():
+    vector = [0.123456789, -0.987654321]
+    embedding = Embedding(embedding=pickle.dumps(vector, protocol=pickle.HIGHEST_PROTOCOL))
+
+    assert not embedding.is_compact_format
+    assert embedding.get_embedding() == vector
@@ -9,8 +9,10 @@ from unittest.mock import MagicMock, PropertyMock
 
 import pytest
 from pytest_mock import MockerFixture
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session, sessionmaker
 
+from configs import dify_config
 from core.model_runtime.utils.encoders import jsonable_encoder
 from core.repositories import SQLAlchemyWorkflowNodeExecutionRepository
 from core.workflow.entities.workflow_node_execution import (
@@ -400,3 +402,118 @@ def test_to_domain_model(repository):
     assert domain_model.metadata == metadata_dict
     assert domain_model.created_at == db_model.created_at
     assert domain_model.finished_at == db_model.finished_at
+
+
+def _node_execution(id: str, index: int, status: WorkflowNodeExecutionStatus) -> WorkflowNodeExecution:
+    return WorkflowNodeExecution(
+        id=id,
+        workflow_id="test-workflow-id",
+        node_execution_id=f"node-execution-{id}",
+        workflow_execution_id="test-workflow-run-id",
+        index=index,
+        node_id=f"node-{id}",
+        node_type=NodeType.CODE,
+        title="Code",
+        status=status,
+        created_at=datetime.now(),
+    )
+
+
+@pytest.fixture
+def write_behind_repository(session, mock_user, monkeypatch):
+    monkeypatch.setattr(dify_config, "WORKFLOW_NODE_EXECUTION_WRITE_MODE", "write-behind")
+    monkeypatch.setattr(dify_config, "WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL", 3600)
+    monkeypatch.setattr(dify_config, "WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE", 10)
+    _, session_factory = session
+    return SQLAlchemyWorkflowNodeExecutionRepository(
+        session_factory=session_factory,
+        user=mock_user,
+        app_id="test-app",
+        triggered_from=WorkflowNodeExecutionTriggeredFrom.WORKFLOW_RUN,
+    )
+
+
+def test_write_behind_coalesces_saves_until_flush(write_behind_repository, session):
+    session_obj, _ = session
+    write_behind_repository.save(_node_execution("1", 1, WorkflowNodeExecutionStatus.RUNNING))
+    write_behind_repository.save(_node_execution("1", 1, WorkflowNodeExecutionStatus.SUCCEEDED))
+    write_behind_repository.save(_node_execution("2", 2, WorkflowNodeExecutionStatus.RUNNING))
+
+    session_obj.execute.assert_not_called()
+    cached = write_behind_repository.get_by_node_execution_id("node-execution-1")
+    assert cached is not None
+    assert cached.status == WorkflowNodeExecutionStatus.SUCCEEDED
+
+    write_behind_repository.flush()
+
+    session_obj.execute.assert_called_once()
+    session_obj.commit.assert_called_once()
+    stmt = session_obj.execute.call_args.args[0]
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    assert "ON CONFLICT (id) DO UPDATE" in str(compiled)
+    assert compiled.params["id_m0"] == "1"
+    assert compiled.params["status_m0"] == WorkflowNodeExecutionStatus.SUCCEEDED
+    assert compiled.params["id_m1"] == "2"
+
+    write_behind_repository.flush()
+    session_obj.execute.assert_called_once()
+
+
+def test_write_behind_flushes_when_batch_is_full(write_behind_repository, session):
+    session_obj, _ = session
+    for i in range(10):
+        write_behind_repository.save(_node_execution(str(i), i, WorkflowNodeExecutionStatus.RUNNING))
+
+    session_obj.execute.assert_called_once()
+    assert write_behind_repository._pending_db_models == {}
+
+
+def test_write_behind_keeps_executions_buffered_when_flush_fails(write_behind_repository, session):
+    session_obj, _ = session
+    session_obj.execute.side_effect = RuntimeError("database unavailable")
+    write_behind_repository.save(_node_execution("1", 1, WorkflowNodeExecutionStatus.RUNNING))
+
+    with pytest.raises(RuntimeError):
+        write_behind_repository.flush()
+
+    assert list(write_behind_repository._pending_db_models) == ["1"]
+
+
+def test_write_behind_reads_include_buffered_executions(write_behind_repository, session, mocker: MockerFixture):
+    session_obj, _ = session
+    mock_select = mocker.patch("core.repositories.sqlalchemy_workflow_node_execution_repository.select")
+    mock_stmt = mocker.MagicMock()
+    mock_select.return_value = mock_stmt
+    mock_stmt.where.return_value = mock_stmt
+    mock_stmt.order_by.return_value = mock_stmt
+
+    stored = write_behind_repository.to_db_model(_node_execution("1", 1, WorkflowNodeExecutionStatus.RUNNING))
+    session_obj.scalars.return_value.all.return_value = [stored]
+    write_behind_repository.save(_node_execution("1", 1, WorkflowNodeExecutionStatus.SUCCEEDED))
+    write_behind_repository.save(_node_execution("2", 2, WorkflowNodeExecutionStatus.RUNNING))
+
+    executions = write_behind_repository.get_by_workflow_run(
+        "test-workflow-run-id", OrderConfig(order_by=["index"], order_direction="desc")
+    )
+    assert [(e.id, e.status) for e in executions] == [
+        ("2", WorkflowNodeExecutionStatus.RUNNING),
+        ("1", WorkflowNodeExecutionStatus.SUCCEEDED),
+    ]
+
+    running = write_behind_repository.get_running_executions("test-workflow-run-id")
+    assert [e.id for e in running] == ["2"]
+
+
+def test_single_step_executions_are_saved_synchronously(session, mock_user, monkeypatch):
+    monkeypatch.setattr(dify_config, "WORKFLOW_NODE_EXECUTION_WRITE_MODE", "write-behind")
+    session_obj, session_factory = session
+    repository = SQLAlchemyWorkflowNodeExecutionRepository(
+        session_factory=session_factory,
+        user=mock_user,
+        app_id="test-app",
+        triggered_from=WorkflowNodeExecutionTriggeredFrom.SINGLE_STEP,
+    )
+
+    repository.save(_node_execution("1", 1, WorkflowNodeExecutionStatus.SUCCEEDED))
+
+    session_obj.merge.assert_called_once()
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from services.billing_service import BillingService, TenantBillingCache
+from services.feature_service import FeatureService
+
+
+class _BillingStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            plan = server.plan
+        body = json.dumps({"subscription": {"plan": plan}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def billing_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BillingStubHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.plan = "sandbox"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def billing_service(billing_server):
+    info_cache = TenantBillingCache("billing_info", ttl=60, stale_ttl=600)
+    with (
+        patch.object(BillingService, "base_url", f"http://127.0.0.1:{billing_server.server_port}"),
+        patch.object(BillingService, "info_cache", info_cache),
+        patch.object(BillingService, "_client", None),
+    ):
+        yield BillingService
+        if BillingService._client is not None:
+            BillingService._client.close()
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_get_info_is_served_from_cache_within_ttl(billing_service, billing_server):
+    assert billing_service.get_info("tenant-1")["subscription"]["plan"] == "sandbox"
+    assert billing_service.get_info("tenant-1")["subscription"]["plan"] == "sandbox"
+
+    assert billing_server.requests == ["/subscription/info?tenant_id=tenant-1"]
+
+
+def test_requests_reuse_the_pooled_client(billing_service, billing_server):
+    billing_service.get_info("tenant-1")
+    client = billing_service._client
+    billing_service.get_info("tenant-2")
+
+    assert client is not None
+    assert billing_service._client is client
+    assert len(billing_server.requests) == 2
+
+
+def test_stale_info_is_returned_and_refreshed_in_background(billing_service, billing_server):
+    billing_service.get_info("tenant-1")
+    billing_server.plan = "team"
+
+    with patch("services.billing_service.time.time", return_value=time.time() + 120):
+        # stale, but within the stale ttl: served immediately and refreshed in the background
+        assert billing_service.get_info("tenant-1")["subscription"]["plan"] == "sandbox"
+        _wait_for(lambda: len(billing_server.requests) == 2)
+        _wait_for(lambda: billing_service.get_info("tenant-1")["subscription"]["plan"] == "team")
+
+
+def test_expired_info_is_fetched_synchronously(billing_service, billing_server):
+    billing_service.get_info("tenant-1")
+    billing_server.plan = "team"
+
+    with patch("services.billing_service.time.time", return_value=time.time() + 3600):
+        assert billing_service.get_info("tenant-1")["subscription"]["plan"] == "team"
+
+
+def test_clear_info_cache(billing_service, billing_server):
+    billing_service.get_info("tenant-1")
+    billing_server.plan = "team"
+
+    billing_service.clear_info_cache("tenant-1")
+
+    assert billing_service.get_info("tenant-1")["subscription"]["plan"] == "team"
+    assert len(billing_server.requests) == 2
+
+
+def test_failed_background_refresh_keeps_the_stale_value():
+    cache = TenantBillingCache("billing_info", ttl=60, stale_ttl=600)
+    cache.get("tenant-1", lambda tenant_id: {"plan": "sandbox"})
+    refreshed = threading.Event()
+
+    def fail(tenant_id):
+        refreshed.set()
+        raise ValueError("billing API is unavailable")
+
+    with patch("services.billing_service.time.time", return_value=time.time() + 120):
+        assert cache.get("tenant-1", fail) == {"plan": "sandbox"}
+        assert refreshed.wait(5)
+        _wait_for(lambda: not cache._refreshing)
+        assert cache.get("tenant-1", lambda tenant_id: {"plan": "team"}) == {"plan": "sandbox"}
+
+
+def test_fresh_info_is_fetched_and_stored(billing_service, billing_server):
+    billing_service.get_info("tenant-1")
+    billing_server.plan = "team"
+
+    # quota checks see a plan upgrade at once, and so does the cache
+    assert billing_service.get_info("tenant-1", fresh=True)["subscription"]["plan"] == "team"
+    assert billing_service.get_info("tenant-1")["subscription"]["plan"] == "team"
+    assert len(billing_server.requests) == 2
+
+
+def test_quota_checks_read_fresh_features():
+    billing_info = {"enabled": True, "subscription": {"plan": "team", "interval": "month"}}
+    with (
+        patch("services.feature_service.dify_config.BILLING_ENABLED", True),
+        patch("services.feature_service.BillingService.get_info", return_value=billing_info) as get_info,
+    ):
+        FeatureService.get_features("tenant-1")
+        FeatureService.get_features("tenant-1", fresh=True)
+
+    assert [call.kwargs["fresh"] for call in get_info.call_args_list] == [False, True]
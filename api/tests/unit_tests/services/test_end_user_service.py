@@ -0,0 +1,129 @@
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+from models.model import App
+from services.end_user_service import EndUserService
+
+
+def _app() -> App:
+    app = MagicMock(spec=App)
+    app.id = "app-1"
+    app.tenant_id = "tenant-1"
+    return app
+
+
+def _row(**kwargs) -> dict:
+    row = {
+        "id": "end-user-1",
+        "tenant_id": "tenant-1",
+        "app_id": "app-1",
+        "type": "service_api",
+        "external_user_id": None,
+        "name": None,
+        "is_anonymous": False,
+        "session_id": "user-1",
+        "created_at": datetime(2025, 1, 1, 12, 0, 0),
+        "updated_at": datetime(2025, 1, 1, 12, 0, 0),
+    }
+    row.update(kwargs)
+    return row
+
+
+@pytest.fixture(autouse=True)
+def _clear_local_cache():
+    EndUserService._local_cache.clear()
+    yield
+    EndUserService._local_cache.clear()
+
+
+@pytest.fixture
+def mock_db():
+    with patch("services.end_user_service.db") as mock_db:
+        yield mock_db
+
+
+@pytest.fixture
+def mock_redis():
+    with patch("services.end_user_service.redis_client") as mock_redis:
+        mock_redis.get.return_value = None
+        yield mock_redis
+
+
+class TestGetOrCreateEndUser:
+    def test_miss_upserts_in_a_single_statement_and_caches(self, mock_db, mock_redis):
+        mock_db.session.execute.return_value.mappings.return_value.one.return_value = _row()
+
+        end_user = EndUserService.get_or_create_end_user(_app(), "user-1", type="service_api")
+
+        assert end_user.id == "end-user-1"
+        assert end_user.session_id == "user-1"
+        assert inspect(end_user).detached
+        # advisory lock, then the upsert
+        assert mock_db.session.execute.call_count == 2
+        mock_db.session.commit.assert_called_once()
+
+        upsert_sql = str(mock_db.session.execute.call_args_list[1].args[0].compile(dialect=postgresql.dialect()))
+        assert "INSERT INTO end_users" in upsert_sql
+        assert "NOT (EXISTS" in upsert_sql
+        assert "RETURNING" in upsert_sql
+        assert "UNION ALL" in upsert_sql
+
+        cache_key, ttl, data = mock_redis.setex.call_args.args
+        assert cache_key == "end_user:app-1:service_api:user-1"
+        assert json.loads(data)["created_at"] == "2025-01-01T12:00:00"
+
+    def test_local_hit_costs_no_queries(self, mock_db, mock_redis):
+        mock_db.session.execute.return_value.mappings.return_value.one.return_value = _row()
+        EndUserService.get_or_create_end_user(_app(), "user-1", type="service_api")
+        mock_db.reset_mock()
+        mock_redis.reset_mock()
+
+        end_user = EndUserService.get_or_create_end_user(_app(), "user-1", type="service_api")
+
+        assert end_user.id == "end-user-1"
+        mock_db.session.execute.assert_not_called()
+        mock_redis.get.assert_not_called()
+
+    def test_redis_hit_costs_no_queries(self, mock_db, mock_redis):
+        cached = _row(created_at="2025-01-01T12:00:00", updated_at="2025-01-01T12:00:00")
+        mock_redis.get.return_value = json.dumps(cached).encode()
+
+        end_user = EndUserService.get_or_create_end_user(_app(), "user-1", type="service_api")
+
+        assert end_user.id == "end-user-1"
+        assert end_user.created_at == datetime(2025, 1, 1, 12, 0, 0)
+        mock_db.session.execute.assert_not_called()
+
+    def test_match_any_type_uses_separate_cache_key(self, mock_db, mock_redis):
+        mock_db.session.execute.return_value.mappings.return_value.one.return_value = _row(type="browser")
+
+        EndUserService.get_or_create_end_user(_app(), "user-1", type="browser", match_any_type=True)
+
+        assert mock_redis.setex.call_args.args[0] == "end_user:app-1:*:user-1"
+        upsert_sql = str(mock_db.session.execute.call_args_list[1].args[0].compile(dialect=postgresql.dialect()))
+        existing_sql = upsert_sql[: upsert_sql.index("inserted AS")]
+        assert "end_users.type =" not in existing_sql
+
+
+class TestGetEndUser:
+    def test_returns_none_when_missing(self, mock_db, mock_redis):
+        mock_db.session.execute.return_value.mappings.return_value.first.return_value = None
+
+        assert EndUserService.get_end_user(_app(), "user-1") is None
+        mock_redis.setex.assert_not_called()
+
+    def test_caches_found_end_user(self, mock_db, mock_redis):
+        mock_db.session.execute.return_value.mappings.return_value.first.return_value = _row(type="browser")
+
+        end_user = EndUserService.get_end_user(_app(), "user-1")
+        assert end_user is not None
+        assert end_user.type == "browser"
+
+        mock_db.reset_mock()
+        assert EndUserService.get_end_user(_app(), "user-1").id == "end-user-1"
+        mock_db.session.execute.assert_not_called()
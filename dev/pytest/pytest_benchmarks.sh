@@ -0,0 +1,8 @@
+#!/bin/bash
+set -x
+
+SCRIPT_DIR="$(dirname "$(realpath "$0")")"
+cd "$SCRIPT_DIR/../.."
+
+# performance benchmarks, not part of the default test runs
+pytest api/tests/benchmarks --benchmark-only "$@"